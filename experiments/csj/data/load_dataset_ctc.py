@@ -11,10 +11,13 @@ from __future__ import division
 from __future__ import print_function
 
 from os.path import join
-import pickle
 import numpy as np
 
 from experiments.utils.data.dataset_loader.each_load.ctc_each_load import DatasetBase
+from experiments.utils.data.dataset_loader.sampler import Sampler, skip_frame_nums
+from experiments.utils.data.dataset_loader.padding import PaddingCounter
+from experiments.utils.data.dataset_loader.manifest import load_manifest, label_key
+from experiments.utils.data.dataset_loader.filtering import filter_manifest
 
 import tensorflow as tf
 
@@ -25,7 +28,8 @@ class Dataset(DatasetBase):
                  num_stack=None, num_skip=None,
                  sort_utt=True, sorta_grad=False,
                  progressbar=False, num_gpu=1, is_gpu=True,
-                 divide_by_space=False):
+                 divide_by_space=False, max_frames_per_batch=None,
+                 num_buckets=None, max_frames=None, max_label_len=None):
         """A class for loading dataset.
         Args:
             data_type: string, train, dev, eval1, eval2, eval3
@@ -47,10 +51,20 @@ class Dataset(DatasetBase):
                 dataset at once. Then, you should put dataset on the GPU server
                 you will use to reduce data-communication time between servers.
             divide_by_space: if True, each subword will be diveded by space
+            max_frames_per_batch: int, if set, utterances are packed into
+                each mini-batch until the number of padded frames after frame
+                skipping reaches this value, instead of batch_size
+            num_buckets: int, if set, mini-batches are made in each bucket of
+                utterances with similar lengths to reduce padding
+            max_frames: int, if set, utterances with more frames than this
+                are dropped from the training set
+            max_label_len: int, if set, utterances with more labels than
+                this are dropped from the training set
         """
         if data_type not in ['train', 'dev', 'eval1', 'eval2', 'eval3']:
             raise ValueError(
                 'data_type is "train" or "dev", "eval1" "eval2" "eval3".')
+        self.is_training = True if data_type == 'train' else False
 
         self.data_type = data_type
         self.train_data_size = train_data_size
@@ -87,29 +101,38 @@ class Dataset(DatasetBase):
                     '/n/sd8/inaguma/corpus/csj/dataset/labels/ctc',
                     train_data_size, label_type, data_type)
 
-        # Load the frame number dictionary
-        with open(join(input_path, 'frame_num.pickle'), 'rb') as f:
-            self.frame_num_dict = pickle.load(f)
-
-        # Sort paths to input & label by frame num
-        frame_num_tuple_sorted = sorted(self.frame_num_dict.items(),
-                                        key=lambda x: x[1])
-        input_paths, label_paths = [], []
-        for input_name, frame_num in frame_num_tuple_sorted:
-            speaker_name = input_name.split('_')[0]
-            input_paths.append(
-                join(input_path, speaker_name, input_name + '.npy'))
-            label_paths.append(
-                join(label_path, speaker_name, input_name + '.npy'))
-        self.input_paths = np.array(input_paths)
-        self.label_paths = np.array(label_paths)
+        # Load the manifest sorted by frame num
+        manifest = load_manifest(
+            [input_path],
+            speaker_fn=lambda input_name: input_name.split('_')[0])
+        if self.is_training:
+            # Drop utterances which are invalid for CTC or too long
+            key = label_key('ctc_divide' if divide_by_space else 'ctc',
+                            label_type)
+            manifest, _ = filter_manifest(
+                manifest, ctc_label_keys=[key], label_keys=[key],
+                num_stack=num_stack, num_skip=num_skip,
+                max_frames=max_frames,
+                max_label_len=max_label_len)
+        self.frame_num_dict = manifest.frame_num_dict
+        self.input_paths = manifest.paths([input_path])
+        self.label_paths = manifest.paths([label_path])
         self.data_num = len(self.input_paths)
 
         if (self.num_stack is not None) and (self.num_skip is not None):
             self.input_size = self.input_size * num_stack
         # NOTE: Not load dataset yet
 
-        self.rest = set(range(0, self.data_num, 1))
+        self.sampler = Sampler(self.data_num, self.batch_size,
+                               sort_utt=sort_utt or sorta_grad,
+                               sort_stop_epoch=1 if sorta_grad else None,
+                               shuffle_batch=not sorta_grad,
+                               frame_nums=skip_frame_nums(
+                                   manifest.frame_nums, num_stack, num_skip),
+                               max_frames_per_batch=max_frames_per_batch,
+                               min_batch_size=num_gpu,
+                               num_buckets=num_buckets)
+        self.padding_counter = PaddingCounter()
 
         if data_type in ['eval1', 'eval2', 'eval3'] and label_type != 'phone':
             self.is_test = True
@@ -15,6 +15,7 @@ import yaml
 sys.path.append('../../../')
 from experiments.csj.data.load_dataset_ctc import Dataset
 from experiments.csj.metrics.ctc import do_eval_cer
+from experiments.utils.data.inputs.cmvn import split_cmvn
 from models.ctc.load_model import load
 
 
@@ -45,6 +46,20 @@ def do_eval(network, params, epoch=None):
                          num_skip=params['num_skip'],
                          sort_utt=False, progressbar=True, is_gpu=False)
 
+    # Normalize input data by statistics of the training set, or by
+    # statistics of each speaker of each evaluation set
+    if params.get('cmvn_path') is not None:
+        per_speaker = params.get('cmvn_per_speaker', False)
+        for data_type, dataset in [('eval1', eval1_data),
+                                   ('eval2', eval2_data),
+                                   ('eval3', eval3_data)]:
+            cmvn_path = params['cmvn_path']
+            if per_speaker:
+                cmvn_path = split_cmvn(cmvn_path, dataset.input_paths,
+                                       data_type,
+                                       store_path=dataset.input_store_path)
+            dataset.set_cmvn(cmvn_path, per_speaker=per_speaker)
+
     # Define placeholders
     network.create_placeholders(gpu_index=None)
 
@@ -19,6 +19,7 @@ sys.path.append('../../../')
 from experiments.csj.data.load_dataset_ctc import Dataset
 from experiments.csj.metrics.ctc import do_eval_cer
 from experiments.utils.data.sparsetensor import list2sparsetensor
+from experiments.utils.data.inputs.cmvn import split_cmvn
 from experiments.utils.training.learning_rate_controller.epoch import Controller
 
 from experiments.utils.directory import mkdir, mkdir_join
@@ -56,6 +57,20 @@ def do_train(network, params):
                              num_skip=params['num_skip'],
                              sort_utt=False)
 
+    # Normalize input data by statistics of the training set, or by
+    # statistics of each speaker of each set
+    if params.get('cmvn_path') is not None:
+        per_speaker = params.get('cmvn_per_speaker', False)
+        for data_type, dataset in [('train', train_data),
+                                   ('dev', dev_data_step),
+                                   ('dev', dev_data_epoch)]:
+            cmvn_path = params['cmvn_path']
+            if per_speaker:
+                cmvn_path = split_cmvn(cmvn_path, dataset.input_paths,
+                                       data_type,
+                                       store_path=dataset.input_store_path)
+            dataset.set_cmvn(cmvn_path, per_speaker=per_speaker)
+
     # Tell TensorFlow that the model will be built into the default graph
     with tf.Graph().as_default():
 
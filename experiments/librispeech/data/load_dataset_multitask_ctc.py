@@ -10,11 +10,14 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
-from os.path import join, isfile
-import pickle
+from os.path import join
 import numpy as np
 
 from experiments.utils.data.dataset_loader.each_load.multitask_ctc_each_load import DatasetBase
+from experiments.utils.data.dataset_loader.sampler import Sampler, skip_frame_nums
+from experiments.utils.data.dataset_loader.padding import PaddingCounter
+from experiments.utils.data.dataset_loader.manifest import load_manifest, label_key
+from experiments.utils.data.dataset_loader.filtering import filter_manifest
 
 
 class Dataset(DatasetBase):
@@ -22,7 +25,9 @@ class Dataset(DatasetBase):
     def __init__(self, data_type, train_data_size, label_type_main,
                  label_type_sub, batch_size, num_stack=1, num_skip=1,
                  sort_utt=True, sort_stop_epoch=None,
-                 progressbar=False, num_gpu=1, is_gpu=False):
+                 progressbar=False, num_gpu=1, is_gpu=False,
+                 max_frames_per_batch=None, num_buckets=None,
+                 max_frames=None, max_label_len=None):
         """A class for loading dataset.
         Args:
             data_type: string, train_clean100 or train_clean360 or
@@ -45,6 +50,15 @@ class Dataset(DatasetBase):
                 useful when data size is very large and you cannot load all
                 dataset at once. Then, you should put dataset on the GPU server
                 you will use to reduce data-communication time between servers.
+            max_frames_per_batch: int, if set, utterances are packed into
+                each mini-batch until the number of padded frames after frame
+                skipping reaches this value, instead of batch_size
+            num_buckets: int, if set, mini-batches are made in each bucket of
+                utterances with similar lengths to reduce padding
+            max_frames: int, if set, utterances with more frames than this
+                are dropped from the training set
+            max_label_len: int, if set, utterances with more labels than
+                this are dropped from the training set
         """
         if data_type not in ['train_clean100', 'train_clean360',
                              'train_other500', 'train_all',
@@ -73,7 +87,6 @@ class Dataset(DatasetBase):
         self.num_skip = num_skip
         self.sort_utt = sort_utt
         self.sort_stop_epoch = sort_stop_epoch
-        self.epoch = 0
         self.progressbar = progressbar
         self.num_gpu = num_gpu
         self.input_size = None
@@ -141,38 +154,25 @@ class Dataset(DatasetBase):
                     join('/n/sd8/inaguma/corpus/librispeech/dataset/labels/ctc',
                          train_data_size, label_type_sub, data_type)]
 
-        # Load the frame number dictionary
-        if data_type == 'train_all':
-            self.frame_num_dict = {}
-            for input_path in input_path_list:
-                with open(join(input_path, 'frame_num.pickle'), 'rb') as f:
-                    self.frame_num_dict.update(pickle.load(f))
-        else:
-            with open(join(input_path_list[0], 'frame_num.pickle'), 'rb') as f:
-                self.frame_num_dict = pickle.load(f)
-
-        # Sort paths to input & label by frame num
-        frame_num_tuple_sorted = sorted(self.frame_num_dict.items(),
-                                        key=lambda x: x[1])
-        input_paths, label_main_paths, label_sub_paths = [], [], []
-        for input_name, frame_num in frame_num_tuple_sorted:
-            speaker_name = input_name.split('-')[0]
-            for input_path in input_path_list:
-                if isfile(join(input_path, speaker_name, input_name + '.npy')):
-                    input_paths.append(
-                        join(input_path, speaker_name, input_name + '.npy'))
-                    break
-            for label_main_path, label_sub_path in zip(label_main_path_list, label_sub_path_list):
-                if isfile(join(label_main_path, speaker_name, input_name + '.npy')):
-                    label_main_paths.append(
-                        join(label_main_path, speaker_name, input_name + '.npy'))
-                    label_sub_paths.append(
-                        join(label_sub_path, speaker_name, input_name + '.npy'))
-                    break
-
-        self.input_paths = np.array(input_paths)
-        self.label_main_paths = np.array(label_main_paths)
-        self.label_sub_paths = np.array(label_sub_paths)
+        # Load the manifest sorted by frame num
+        manifest = load_manifest(
+            input_path_list,
+            speaker_fn=lambda input_name: input_name.split('-')[0])
+        if self.is_training:
+            # Drop utterances which are invalid for CTC or too long
+            manifest, _ = filter_manifest(
+                manifest,
+                ctc_label_keys=[label_key('ctc', label_type_main),
+                                label_key('ctc', label_type_sub)],
+                label_keys=[label_key('ctc', label_type_main),
+                            label_key('ctc', label_type_sub)],
+                num_stack=num_stack, num_skip=num_skip,
+                max_frames=max_frames,
+                max_label_len=max_label_len)
+        self.frame_num_dict = manifest.frame_num_dict
+        self.input_paths = manifest.paths(input_path_list)
+        self.label_main_paths = manifest.paths(label_main_path_list)
+        self.label_sub_paths = manifest.paths(label_sub_path_list)
         self.data_num = len(self.input_paths)
         # NOTE: Not load dataset yet
 
@@ -181,4 +181,12 @@ class Dataset(DatasetBase):
         assert len(self.input_paths) == len(self.label_sub_paths), "Inputs and labels must have the same number of files (inputs: {0}, labels: {1}).".format(
             len(self.input_paths), len(self.label_sub_paths))
 
-        self.rest = set(range(0, self.data_num, 1))
+        self.sampler = Sampler(self.data_num, self.batch_size,
+                               sort_utt=sort_utt,
+                               sort_stop_epoch=sort_stop_epoch,
+                               frame_nums=skip_frame_nums(
+                                   manifest.frame_nums, num_stack, num_skip),
+                               max_frames_per_batch=max_frames_per_batch,
+                               min_batch_size=num_gpu,
+                               num_buckets=num_buckets)
+        self.padding_counter = PaddingCounter()
@@ -15,6 +15,7 @@ import yaml
 sys.path.append('../../../')
 from experiments.librispeech.data.load_dataset_ctc import Dataset
 from experiments.librispeech.metrics.ctc import do_eval_cer, do_eval_wer
+from experiments.utils.data.inputs.cmvn import split_cmvn
 from models.ctc.load_model import load
 
 
@@ -37,6 +38,19 @@ def do_eval(network, params, epoch=None):
         num_stack=params['num_stack'], num_skip=params['num_skip'],
         sort_utt=False)
 
+    # Normalize input data by statistics of the training set, or by
+    # statistics of each speaker of each evaluation set
+    if params.get('cmvn_path') is not None:
+        per_speaker = params.get('cmvn_per_speaker', False)
+        for data_type, dataset in [('test_clean', test_clean_data),
+                                   ('test_other', test_other_data)]:
+            cmvn_path = params['cmvn_path']
+            if per_speaker:
+                cmvn_path = split_cmvn(cmvn_path, dataset.input_paths,
+                                       data_type,
+                                       store_path=dataset.input_store_path)
+            dataset.set_cmvn(cmvn_path, per_speaker=per_speaker)
+
     with tf.name_scope('tower_gpu0'):
         # Define placeholders
         network.create_placeholders()
@@ -19,7 +19,9 @@ sys.path.append('../../../')
 from experiments.librispeech.data.load_dataset_ctc import Dataset
 from experiments.librispeech.metrics.ctc import do_eval_cer, do_eval_wer
 from experiments.utils.data.sparsetensor import list2sparsetensor
+from experiments.utils.data.inputs.cmvn import split_cmvn
 from experiments.utils.training.learning_rate_controller import Controller
+from experiments.utils.training.resume import save_train_state, load_train_state
 from experiments.utils.training.plot import plot_loss, plot_ler
 from experiments.utils.training.multi_gpu import average_gradients
 from experiments.utils.directory import mkdir, mkdir_join
@@ -27,12 +29,14 @@ from experiments.utils.parameter import count_total_parameters
 from models.ctc.load_model import load
 
 
-def do_train(network, params, gpu_indices):
+def do_train(network, params, gpu_indices, resume=False):
     """Run CTC training.
     Args:
         network: network to train
         params: A dictionary of parameters
         gpu_indices: list of GPU index
+        resume: if True, restore the latest checkpoint and the state of
+            training, and continue training from there
     """
     # Load dataset
     if params['train_data_size'] in ['train_clean100', 'train_clean360']:
@@ -46,12 +50,28 @@ def do_train(network, params, gpu_indices):
         num_stack=params['num_stack'], num_skip=params['num_skip'],
         sort_utt=True, sort_stop_epoch=None,
         num_gpu=len(gpu_indices), is_gpu=True)
+    train_data.set_sparse_labels()
+    # Mini-batches for training are not kept after each step
+    train_data.set_buffer_pool()
     dev_data = Dataset(
         data_type=dev, train_data_size=params['train_data_size'],
         label_type=params['label_type'], batch_size=params['batch_size'],
         num_stack=params['num_stack'], num_skip=params['num_skip'],
         sort_utt=False, num_gpu=len(gpu_indices), is_gpu=True)
 
+    # Normalize input data by statistics of the training set, or by
+    # statistics of each speaker of each set
+    if params.get('cmvn_path') is not None:
+        per_speaker = params.get('cmvn_per_speaker', False)
+        for data_type, dataset in [(params['train_data_size'], train_data),
+                                   (dev, dev_data)]:
+            cmvn_path = params['cmvn_path']
+            if per_speaker:
+                cmvn_path = split_cmvn(cmvn_path, dataset.input_paths,
+                                       data_type,
+                                       store_path=dataset.input_store_path)
+            dataset.set_cmvn(cmvn_path, per_speaker=per_speaker)
+
     # Tell TensorFlow that the model will be built into the default graph
     with tf.Graph().as_default(), tf.device('/cpu:0'):
 
@@ -150,6 +170,9 @@ def do_train(network, params, gpu_indices):
 
         # Create a saver for writing training checkpoints
         saver = tf.train.Saver(max_to_keep=None)
+        # NOTE: checkpoints in the middle of an epoch are only for resuming
+        save_step = params.get('save_step')
+        saver_resume = tf.train.Saver(max_to_keep=1)
 
         # Count total parameters
         parameters_dict, total_parameters = count_total_parameters(
@@ -183,7 +206,35 @@ def do_train(network, params, gpu_indices):
             ler_dev_best = 1
             learning_rate = float(params['learning_rate'])
             epoch = 1
-            for step, (data, next_epoch_flag) in enumerate(train_data()):
+            step_init = 0
+
+            def train_state(step, epoch):
+                return {'step': step,
+                        'epoch': epoch,
+                        'learning_rate': learning_rate,
+                        'ler_dev_best': ler_dev_best,
+                        'train_data': train_data.state_dict(),
+                        'lr_controller': lr_controller.state_dict(),
+                        'csv': [csv_steps, csv_loss_train, csv_loss_dev,
+                                csv_ler_train, csv_ler_dev]}
+
+            if resume:
+                # Restore parameters and the state of training
+                checkpoint_path, state = load_train_state(network.model_dir)
+                saver.restore(sess, checkpoint_path)
+                train_data.load_state_dict(state['train_data'])
+                lr_controller.load_state_dict(state['lr_controller'])
+                step_init = state['step']
+                epoch = state['epoch']
+                learning_rate = state['learning_rate']
+                ler_dev_best = state['ler_dev_best']
+                (csv_steps, csv_loss_train, csv_loss_dev,
+                 csv_ler_train, csv_ler_dev) = state['csv']
+                print("Model restored from %s (epoch %d, step %d)" %
+                      (checkpoint_path, epoch, step_init))
+
+            for step, (data, next_epoch_flag) in enumerate(train_data(),
+                                                           step_init):
 
                 # Create feed dictionary for next mini batch (train)
                 inputs, labels, inputs_seq_len, _ = data
@@ -191,8 +242,8 @@ def do_train(network, params, gpu_indices):
                 for i_gpu in range(len(gpu_indices)):
                     feed_dict_train[network.inputs_pl_list[i_gpu]
                                     ] = inputs[i_gpu]
-                    feed_dict_train[network.labels_pl_list[i_gpu]] = list2sparsetensor(
-                        labels[i_gpu], padded_value=train_data.padded_value)
+                    feed_dict_train[network.labels_pl_list[i_gpu]
+                                    ] = labels[i_gpu]
                     feed_dict_train[network.inputs_seq_len_pl_list[i_gpu]
                                     ] = inputs_seq_len[i_gpu]
                     feed_dict_train[network.keep_prob_input_pl_list[i_gpu]
@@ -253,6 +304,15 @@ def do_train(network, params, gpu_indices):
                     sys.stdout.flush()
                     start_time_step = time.time()
 
+                # Save checkpoint to resume training in the middle of epoch
+                if (save_step is not None and (step + 1) % save_step == 0 and
+                        not next_epoch_flag):
+                    save_path = saver_resume.save(
+                        sess, join(network.model_dir, 'resume.ckpt'),
+                        global_step=step + 1)
+                    save_train_state(network.model_dir, save_path,
+                                     train_state(step + 1, epoch))
+
                 # Save checkpoint and evaluate model per epoch
                 if next_epoch_flag:
                     duration_epoch = time.time() - start_time_epoch
@@ -319,6 +379,8 @@ def do_train(network, params, gpu_indices):
                             break
 
                     epoch += 1
+                    save_train_state(network.model_dir, save_path,
+                                     train_state(step + 1, epoch))
                     start_time_epoch = time.time()
 
             duration_train = time.time() - start_time_train
@@ -329,7 +391,7 @@ def do_train(network, params, gpu_indices):
                 f.write('')
 
 
-def main(config_path, model_save_path, gpu_indices):
+def main(config_path, model_save_path, gpu_indices, resume=False):
 
     # Load a config file (.yml)
     with open(config_path, "r") as f:
@@ -392,12 +454,12 @@ def main(config_path, model_save_path, gpu_indices):
         network.model_dir, params['train_data_size'])
     network.model_dir = mkdir_join(network.model_dir, network.model_name)
 
-    # Reset model directory
-    if not isfile(join(network.model_dir, 'complete.txt')):
+    # Reset model directory unless training is resumed
+    if isfile(join(network.model_dir, 'complete.txt')):
+        raise ValueError('File exists.')
+    if not resume:
         tf.gfile.DeleteRecursively(network.model_dir)
         tf.gfile.MakeDirs(network.model_dir)
-    else:
-        raise ValueError('File exists.')
 
     # Set process name
     setproctitle('libri_ctc_' + params['label_type'])
@@ -405,14 +467,19 @@ def main(config_path, model_save_path, gpu_indices):
     # Save config file
     shutil.copyfile(config_path, join(network.model_dir, 'config.yml'))
 
-    sys.stdout = open(join(network.model_dir, 'train.log'), 'w')
-    do_train(network=network, params=params, gpu_indices=gpu_indices)
+    sys.stdout = open(join(network.model_dir, 'train.log'),
+                      'a' if resume else 'w')
+    do_train(network=network, params=params, gpu_indices=gpu_indices,
+             resume=resume)
 
 
 if __name__ == '__main__':
 
     args = sys.argv
+    resume = '--resume' in args
+    if resume:
+        args.remove('--resume')
     if len(args) != 3 and len(args) != 4:
         raise ValueError
     main(config_path=args[1], model_save_path=args[2],
-         gpu_indices=list(map(int, args[3].split(','))))
+         gpu_indices=list(map(int, args[3].split(','))), resume=resume)
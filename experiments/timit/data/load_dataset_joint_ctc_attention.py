@@ -10,17 +10,26 @@ from __future__ import division
 from __future__ import print_function
 
 from os.path import join
-import pickle
 import numpy as np
 
 from experiments.utils.progressbar import wrap_iterator
 from experiments.utils.data.dataset_loader.all_load.joint_ctc_attention_all_load import DatasetBase
+from experiments.utils.data.dataset_loader.sampler import Sampler
+from experiments.utils.data.dataset_loader.padding import PaddingCounter
+from experiments.utils.data.dataset_loader.manifest import load_manifest, label_key
+from experiments.utils.data.dataset_loader.filtering import filter_manifest
+from experiments.utils.data.labels.label_store import pack_label_list
+from experiments.utils.data.inputs.packed_inputs import pack_inputs
+from experiments.utils.data.inputs.quantization import Float16Converter
 
 
 class Dataset(DatasetBase):
 
     def __init__(self, data_type, label_type, batch_size, eos_index,
-                 sort_utt=True, sort_stop_epoch=None, progressbar=False):
+                 sort_utt=True, sort_stop_epoch=None, progressbar=False,
+                 max_frames_per_batch=None, num_buckets=None,
+                 max_frames=None, max_label_len=None,
+                 lean=False, input_store_path=None, float16=False):
         """A class for loading dataset.
         Args:
             data_type: string, train or dev or test
@@ -32,6 +41,22 @@ class Dataset(DatasetBase):
         sort_stop_epoch: Aftersort_stop_epoch, training will revert back
                 to a random order
             progressbar: if True, visualize progressbar
+            max_frames_per_batch: int, if set, utterances are packed into
+                each mini-batch until the number of padded frames after frame
+                skipping reaches this value, instead of batch_size
+            num_buckets: int, if set, mini-batches are made in each bucket of
+                utterances with similar lengths to reduce padding
+            max_frames: int, if set, utterances with more frames than this
+                are dropped from the training set
+            max_label_len: int, if set, utterances with more labels than
+                this are dropped from the training set
+            lean: if True, inputs are read through memory mapping and packed
+                into one contiguous buffer instead of a list of arrays
+            input_store_path: path to the feature store to read inputs from.
+                If set, lean is set to True.
+            float16: if True, inputs are held in memory as float16 and upcast
+                to float32 when each mini-batch is made. If set, lean is set
+                to True.
         """
         if data_type not in ['train', 'dev', 'test']:
             raise ValueError('data_type is "train" or "dev" or "test".')
@@ -43,7 +68,6 @@ class Dataset(DatasetBase):
         self.eos_index = eos_index
         self.sort_utt = sort_utt
         self.sort_stop_epoch = sort_stop_epoch
-        self.epoch = 0
         self.progressbar = progressbar
 
         input_path = join(
@@ -55,33 +79,54 @@ class Dataset(DatasetBase):
             '/n/sd8/inaguma/corpus/timit/dataset/labels/attention',
             label_type, data_type)
 
-        # Load the frame number dictionary
-        with open(join(input_path, 'frame_num.pickle'), 'rb') as f:
-            self.frame_num_dict = pickle.load(f)
-
-        # Sort paths to input & label by frame num
-        frame_num_tuple_sorted = sorted(self.frame_num_dict.items(),
-                                        key=lambda x: x[1])
-        input_paths, att_label_paths, ctc_label_paths = [], [], []
-        for input_name, frame_num in frame_num_tuple_sorted:
-            input_paths.append(join(input_path, input_name + '.npy'))
-            att_label_paths.append(join(att_label_path, input_name + '.npy'))
-            ctc_label_paths.append(join(ctc_label_path, input_name + '.npy'))
-        self.input_paths = np.array(input_paths)
-        self.att_label_paths = np.array(att_label_paths)
-        self.ctc_label_paths = np.array(ctc_label_paths)
+        # Load the manifest sorted by frame num
+        manifest = load_manifest([input_path])
+        if self.is_training:
+            # Drop utterances which are invalid for CTC or too long
+            manifest, _ = filter_manifest(
+                manifest, ctc_label_keys=[label_key('ctc', label_type)],
+                label_keys=[label_key('attention', label_type),
+                            label_key('ctc', label_type)],
+                max_frames=max_frames,
+                max_label_len=max_label_len)
+        self.frame_num_dict = manifest.frame_num_dict
+        self.input_paths = manifest.paths([input_path])
+        self.att_label_paths = manifest.paths([att_label_path])
+        self.ctc_label_paths = manifest.paths([ctc_label_path])
         self.data_num = len(self.input_paths)
 
         # Load all dataset in advance
         print('=> Loading dataset (%s, %s)...' % (data_type, label_type))
+        lean = lean or input_store_path is not None or float16
         input_list, att_label_list, ctc_label_list = [], [], []
         for i in wrap_iterator(range(self.data_num), self.progressbar):
-            input_list.append(np.load(self.input_paths[i]))
+            if not lean:
+                input_list.append(np.load(self.input_paths[i]))
             att_label_list.append(np.load(self.att_label_paths[i]))
             ctc_label_list.append(np.load(self.ctc_label_paths[i]))
-        self.input_list = np.array(input_list)
-        self.att_label_list = np.array(att_label_list)
-        self.ctc_label_list = np.array(ctc_label_list)
-        self.input_size = self.input_list[0].shape[1]
+        self.att_label_store = pack_label_list(att_label_list)
+        self.ctc_label_store = pack_label_list(ctc_label_list)
+
+        if lean:
+            # Copy inputs of each utterance directly into one buffer
+            print('=> Packing inputs...')
+            converter = Float16Converter() if float16 else None
+            self.input_list = pack_inputs(self.input_paths,
+                                          self.frame_num_dict,
+                                          store_path=input_store_path,
+                                          progressbar=progressbar,
+                                          converter=converter)
+            if converter is not None:
+                print('float16: %s' % converter.summary())
+            self.input_size = self.input_list.buffer.shape[1]
+        else:
+            self.input_list = np.array(input_list)
+            self.input_size = self.input_list[0].shape[1]
 
-        self.rest = set(range(0, self.data_num, 1))
+        self.sampler = Sampler(self.data_num, self.batch_size,
+                               sort_utt=sort_utt,
+                               sort_stop_epoch=sort_stop_epoch,
+                               frame_nums=manifest.frame_nums,
+                               max_frames_per_batch=max_frames_per_batch,
+                               num_buckets=num_buckets)
+        self.padding_counter = PaddingCounter()
@@ -0,0 +1,182 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Load dataset with any number of target streams (TIMIT corpus).
+   Each target stream is a pair of the model type (ctc or attention) and the
+   label type, e.g. `[('ctc', 'character'), ('ctc', 'phone61'),
+   ('attention', 'phone61')]`. Input data are loaded once for all targets.
+   In addition, frame stacking and skipping are used.
+   You can use only the single GPU version.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from os.path import join
+import numpy as np
+
+from experiments.utils.progressbar import wrap_iterator
+from experiments.utils.data.dataset_loader.all_load.multi_target_all_load import DatasetBase
+from experiments.utils.data.dataset_loader.sampler import Sampler, skip_frame_nums
+from experiments.utils.data.dataset_loader.padding import PaddingCounter
+from experiments.utils.data.dataset_loader.manifest import load_manifest, label_key
+from experiments.utils.data.dataset_loader.filtering import filter_manifest
+from experiments.utils.data.labels.label_store import pack_label_list
+from experiments.utils.data.inputs.packed_inputs import pack_inputs
+from experiments.utils.data.inputs.quantization import Float16Converter
+from experiments.utils.data.inputs.frame_stacking import stack_frame
+
+
+class Dataset(DatasetBase):
+
+    def __init__(self, data_type, targets, batch_size, eos_index=None,
+                 splice=1, num_stack=1, num_skip=1,
+                 sort_utt=False, sort_stop_epoch=None, progressbar=False,
+                 max_frames_per_batch=None, num_buckets=None,
+                 max_frames=None, max_label_len=None,
+                 lean=False, input_store_path=None, float16=False):
+        """A class for loading dataset.
+        Args:
+            data_type: string, train or dev or test
+            targets: list of `(model_type, label_type)`. Labels are yielded
+                in this order. Lengths of labels for Attention are yielded
+                after inputs_seq_len.
+                model_type: string, ctc or attention
+                label_type: string, phone39 or phone48 or phone61 or
+                    character or character_capital_divide
+            batch_size: int, the size of mini-batch
+            eos_index: int, the index of <EOS> class. This is necessary when
+                targets for Attention are included.
+            splice: int, frames to splice. Default is 1 frame.
+            num_stack: int, the number of frames to stack
+            num_skip: int, the number of frames to skip
+            sort_utt: if True, sort all utterances by the number of frames and
+                utteraces in each mini-batch are shuffled
+            sort_stop_epoch: After sort_stop_epoch, training will revert back
+                to a random order
+            progressbar: if True, visualize progressbar
+            max_frames_per_batch: int, if set, utterances are packed into
+                each mini-batch until the number of padded frames after frame
+                skipping reaches this value, instead of batch_size
+            num_buckets: int, if set, mini-batches are made in each bucket of
+                utterances with similar lengths to reduce padding
+            max_frames: int, if set, utterances with more frames than this
+                are dropped from the training set
+            max_label_len: int, if set, utterances with more labels than
+                this are dropped from the training set
+            lean: if True, inputs are read through memory mapping and packed
+                into one contiguous buffer instead of a list of arrays
+            input_store_path: path to the feature store to read inputs from.
+                If set, lean is set to True.
+            float16: if True, inputs are held in memory as float16 and upcast
+                to float32 when each mini-batch is made. If set, lean is set
+                to True.
+        """
+        if data_type not in ['train', 'dev', 'test']:
+            raise ValueError('data_type is "train" or "dev" or "test".')
+        for model_type, _ in targets:
+            if model_type not in ['ctc', 'attention']:
+                raise ValueError('model_type is "ctc" or "attention".')
+            if model_type == 'attention' and eos_index is None:
+                raise ValueError('Set eos_index for targets for Attention.')
+        self.is_training = True if data_type == 'train' else False
+
+        self.data_type = data_type
+        self.targets = targets
+        self.batch_size = batch_size
+        self.eos_index = eos_index
+        self.splice = splice
+        self.num_stack = num_stack
+        self.num_skip = num_skip
+        self.sort_utt = sort_utt
+        self.sort_stop_epoch = sort_stop_epoch
+        self.progressbar = progressbar
+
+        self.target_names = [model_type + '_' + label_type
+                             for model_type, label_type in targets]
+        self.seq_len_names = [
+            name for name, (model_type, _) in zip(self.target_names, targets)
+            if model_type == 'attention']
+        self.padded_value_dict = dict(
+            (name, eos_index) for name in self.seq_len_names)
+
+        input_path = join(
+            '/n/sd8/inaguma/corpus/timit/dataset/inputs', data_type)
+        label_path_list = [
+            join('/n/sd8/inaguma/corpus/timit/dataset/labels', model_type,
+                 label_type, data_type)
+            for model_type, label_type in targets]
+
+        # Load the manifest sorted by frame num
+        manifest = load_manifest([input_path])
+        if self.is_training:
+            # Drop utterances which are invalid for CTC or too long
+            manifest, _ = filter_manifest(
+                manifest,
+                ctc_label_keys=[label_key(model_type, label_type)
+                                for model_type, label_type in targets
+                                if model_type == 'ctc'],
+                label_keys=[label_key(model_type, label_type)
+                            for model_type, label_type in targets],
+                num_stack=num_stack, num_skip=num_skip,
+                max_frames=max_frames,
+                max_label_len=max_label_len)
+        self.frame_num_dict = manifest.frame_num_dict
+        self.input_paths = manifest.paths([input_path])
+        self.label_paths_dict = dict(
+            (name, manifest.paths([label_path]))
+            for name, label_path in zip(self.target_names, label_path_list))
+        self.data_num = len(self.input_paths)
+
+        # Load all dataset in advance
+        print('=> Loading dataset (%s, %s)...' %
+              (data_type, ', '.join(self.target_names)))
+        lean = lean or input_store_path is not None or float16
+        input_list = []
+        label_list_dict = dict((name, []) for name in self.target_names)
+        for i in wrap_iterator(range(self.data_num), self.progressbar):
+            if not lean:
+                input_list.append(np.load(self.input_paths[i]))
+            for name in self.target_names:
+                label_list_dict[name].append(
+                    np.load(self.label_paths_dict[name][i]))
+        self.label_store_dict = dict(
+            (name, pack_label_list(label_list_dict[name]))
+            for name in self.target_names)
+
+        if lean:
+            # Stack frames of each utterance directly into one buffer
+            print('=> Packing inputs...')
+            converter = Float16Converter() if float16 else None
+            self.input_list = pack_inputs(self.input_paths,
+                                          self.frame_num_dict,
+                                          num_stack,
+                                          num_skip,
+                                          input_store_path,
+                                          progressbar,
+                                          converter)
+            if converter is not None:
+                print('float16: %s' % converter.summary())
+            self.input_size = self.input_list.buffer.shape[1]
+        else:
+            self.input_list = np.array(input_list)
+            self.input_size = self.input_list[0].shape[1] * num_stack
+
+            # Frame stacking
+            print('=> Stacking frames...')
+            self.input_list = stack_frame(self.input_list,
+                                          self.input_paths,
+                                          self.frame_num_dict,
+                                          num_stack,
+                                          num_skip,
+                                          progressbar)
+
+        self.sampler = Sampler(self.data_num, self.batch_size,
+                               sort_utt=sort_utt,
+                               sort_stop_epoch=sort_stop_epoch,
+                               frame_nums=skip_frame_nums(
+                                   manifest.frame_nums, num_stack, num_skip),
+                               max_frames_per_batch=max_frames_per_batch,
+                               num_buckets=num_buckets)
+        self.padding_counter = PaddingCounter()
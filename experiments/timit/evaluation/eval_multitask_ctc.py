@@ -14,7 +14,7 @@ import yaml
 
 sys.path.append('../../../')
 from experiments.timit.data.load_dataset_multitask_ctc import Dataset
-from experiments.timit.metrics.ctc import do_eval_per, do_eval_cer
+from experiments.timit.metrics.ctc import do_eval_multitask
 from models.ctc.load_model import load
 
 
@@ -73,27 +73,17 @@ def do_eval(network, params, epoch=None):
             raise ValueError('There are not any checkpoints.')
 
         print('=== Test Data Evaluation ===')
-        cer_test = do_eval_cer(
+        cer_test, per_test = do_eval_multitask(
             session=sess,
-            decode_op=decode_op_main,
+            decode_op_main=decode_op_main,
+            decode_op_sub=decode_op_sub,
             network=network,
             dataset=test_data,
-            label_type=params['label_type_main'],
+            label_type_main=params['label_type_main'],
+            label_type_sub=params['label_type_sub'],
             eval_batch_size=1,
-            progressbar=True,
-            is_multitask=True)
+            progressbar=True)
         print('  CER: %f %%' % (cer_test * 100))
-
-        per_test = do_eval_per(
-            session=sess,
-            decode_op=decode_op_sub,
-            per_op=per_op,
-            network=network,
-            dataset=test_data,
-            label_type=params['label_type_sub'],
-            eval_batch_size=1,
-            progressbar=True,
-            is_multitask=True)
         print('  PER: %f %%' % (per_test * 100))
 
 
@@ -40,15 +40,8 @@ def do_eval_per(session, decode_op, per_op, network, dataset, label_type,
     dataset.reset()
 
     batch_size = dataset.batch_size if eval_batch_size is None else eval_batch_size
-    train_label_type = label_type
     eval_label_type = dataset.label_type_sub if is_multitask else dataset.label_type
 
-    train_phone2num_map_file_path = '../metrics/mapping_files/ctc/' + \
-        train_label_type + '_to_num.txt'
-    eval_phone2num_map_file_path = '../metrics/mapping_files/ctc/' + \
-        eval_label_type + '_to_num.txt'
-    phone2num_39_map_file_path = '../metrics/mapping_files/ctc/phone39_to_num.txt'
-    phone2phone_map_file_path = '../metrics/mapping_files/phone2phone.txt'
     per_mean = 0
     total_step = int(dataset.data_num / batch_size)
     if (dataset.data_num / batch_size) != dataset.data_num // batch_size:
@@ -75,53 +68,9 @@ def do_eval_per(session, decode_op, per_op, network, dataset, label_type,
         # Evaluate by 39 phones
         labels_pred_st = session.run(decode_op, feed_dict=feed_dict)
         labels_pred = sparsetensor2list(labels_pred_st, batch_size_each)
-
-        labels_pred_mapped, labels_true_mapped = [], []
-        for i_batch in range(batch_size_each):
-            ###############
-            # Hypothesis
-            ###############
-            # Convert from num to phone (-> list of phone strings)
-            phone_pred_list = num2phone(
-                labels_pred[i_batch],
-                train_phone2num_map_file_path).split(' ')
-
-            # Mapping to 39 phones (-> list of phone strings)
-            phone_pred_list = map_to_39phone(phone_pred_list,
-                                             train_label_type,
-                                             phone2phone_map_file_path)
-
-            # Convert from phone to num (-> list of phone indices)
-            phone_pred_list = phone2num(phone_pred_list,
-                                        phone2num_39_map_file_path)
-            labels_pred_mapped.append(phone_pred_list)
-
-            ###############
-            # Reference
-            ###############
-            # Convert from num to phone (-> list of phone strings)
-            phone_true_list = num2phone(
-                labels_true[i_batch],
-                eval_phone2num_map_file_path).split(' ')
-
-            # Mapping to 39 phones (-> list of phone strings)
-            phone_true_list = map_to_39phone(phone_true_list,
-                                             eval_label_type,
-                                             phone2phone_map_file_path)
-
-            # Convert from phone to num (-> list of phone indices)
-            phone_true_list = phone2num(phone_true_list,
-                                        phone2num_39_map_file_path)
-            labels_true_mapped.append(phone_true_list)
-
-        # Compute edit distance
-        labels_true_st = list2sparsetensor(labels_true_mapped,
-                                           padded_value=dataset.padded_value)
-        labels_pred_st = list2sparsetensor(labels_pred_mapped,
-                                           padded_value=dataset.padded_value)
-        per_list = compute_edit_distance(session, labels_true_st,
-                                         labels_pred_st)
-        per_mean += np.sum(per_list)
+        per_mean += _compute_per(session, labels_true, labels_pred,
+                                 label_type, eval_label_type,
+                                 dataset.padded_value)
 
         if next_epoch_flag:
             break
@@ -151,7 +100,6 @@ def do_eval_cer(session, decode_op, network, dataset, label_type,
 
     batch_size = dataset.batch_size if eval_batch_size is None else eval_batch_size
 
-    map_file_path = '../metrics/mapping_files/ctc/' + label_type + '_to_num.txt'
     cer_mean = 0
     total_step = int(dataset.data_num / batch_size)
     if (dataset.data_num / batch_size) != dataset.data_num // batch_size:
@@ -177,28 +125,178 @@ def do_eval_cer(session, decode_op, network, dataset, label_type,
 
         labels_pred_st = session.run(decode_op, feed_dict=feed_dict)
         labels_pred = sparsetensor2list(labels_pred_st, batch_size_each)
-        for i_batch in range(batch_size_each):
+        cer_mean += _compute_cer(labels_true, labels_pred, label_type)
 
-            # Convert from list to string
-            str_true = num2char(labels_true[i_batch], map_file_path)
-            str_pred = num2char(labels_pred[i_batch], map_file_path)
+        if next_epoch_flag:
+            break
+
+    cer_mean /= dataset.data_num
+
+    return cer_mean
+
+
+def do_eval_multitask(session, decode_op_main, decode_op_sub, network,
+                      dataset, label_type_main, label_type_sub,
+                      eval_batch_size=None, progressbar=False):
+    """Evaluate trained multitask model by Character Error Rate in the main
+       task and Phone Error Rate in the sub task. Each mini-batch is loaded
+       and decoded once for both tasks.
+    Args:
+        session: session of training model
+        decode_op_main: operation for decoding in the main task
+        decode_op_sub: operation for decoding in the sub task
+        network: network to evaluate
+        dataset: An instance of a `Dataset` class
+        label_type_main: string, character or character_capital_divide
+        label_type_sub: string, phone39 or phone48 or phone61
+        eval_batch_size: int, the batch size when evaluating the model
+        progressbar: if True, visualize the progressbar
+    Returns:
+        cer_mean: An average of CER
+        per_mean: An average of PER
+    """
+    # Reset data counter
+    dataset.reset()
+
+    batch_size = dataset.batch_size if eval_batch_size is None else eval_batch_size
+
+    cer_mean, per_mean = 0, 0
+    total_step = int(dataset.data_num / batch_size)
+    if (dataset.data_num / batch_size) != dataset.data_num // batch_size:
+        total_step += 1
+    for data, next_epoch_flag in wrap_generator(dataset(batch_size),
+                                                progressbar,
+                                                total=total_step):
+        # Create feed dictionary for next mini batch
+        inputs, labels_true_main, labels_true_sub, inputs_seq_len, _ = data
 
-            # Remove silence(_) labels
-            str_true = re.sub(r'[_\'\":;!?,.-]+', "", str_true)
-            str_pred = re.sub(r'[_\'\":;!?,.-]+', "", str_pred)
+        feed_dict = {
+            network.inputs_pl_list[0]: inputs,
+            network.inputs_seq_len_pl_list[0]: inputs_seq_len,
+            network.keep_prob_input_pl_list[0]: 1.0,
+            network.keep_prob_hidden_pl_list[0]: 1.0,
+            network.keep_prob_output_pl_list[0]: 1.0
+        }
 
-            # Convert to lower case
-            if label_type == 'character_capital_divide':
-                str_true = str_true.lower()
-                str_pred = str_pred.lower()
+        batch_size_each = len(inputs_seq_len)
 
-            # Compute edit distance
-            cer_mean += Levenshtein.distance(
-                str_pred, str_true) / len(list(str_true))
+        labels_pred_st_main, labels_pred_st_sub = session.run(
+            [decode_op_main, decode_op_sub], feed_dict=feed_dict)
+        labels_pred_main = sparsetensor2list(labels_pred_st_main,
+                                             batch_size_each)
+        labels_pred_sub = sparsetensor2list(labels_pred_st_sub,
+                                            batch_size_each)
+        cer_mean += _compute_cer(labels_true_main, labels_pred_main,
+                                 label_type_main)
+        per_mean += _compute_per(session, labels_true_sub, labels_pred_sub,
+                                 label_type_sub, dataset.label_type_sub,
+                                 dataset.padded_value)
 
         if next_epoch_flag:
             break
 
     cer_mean /= dataset.data_num
+    per_mean /= dataset.data_num
 
-    return cer_mean
+    return cer_mean, per_mean
+
+
+def _compute_per(session, labels_true, labels_pred, train_label_type,
+                 eval_label_type, padded_value):
+    """Compute the sum of PER of a mini-batch by 39 phones.
+    Args:
+        session: session of training model
+        labels_true: list of reference labels
+        labels_pred: list of predicted labels
+        train_label_type: string, the label type of predictions
+        eval_label_type: string, the label type of references
+        padded_value: int, the value used for padding labels
+    Returns:
+        The sum of PER in the mini-batch
+    """
+    train_phone2num_map_file_path = '../metrics/mapping_files/ctc/' + \
+        train_label_type + '_to_num.txt'
+    eval_phone2num_map_file_path = '../metrics/mapping_files/ctc/' + \
+        eval_label_type + '_to_num.txt'
+    phone2num_39_map_file_path = '../metrics/mapping_files/ctc/phone39_to_num.txt'
+    phone2phone_map_file_path = '../metrics/mapping_files/phone2phone.txt'
+
+    labels_pred_mapped, labels_true_mapped = [], []
+    for i_batch in range(len(labels_pred)):
+        ###############
+        # Hypothesis
+        ###############
+        # Convert from num to phone (-> list of phone strings)
+        phone_pred_list = num2phone(
+            labels_pred[i_batch],
+            train_phone2num_map_file_path).split(' ')
+
+        # Mapping to 39 phones (-> list of phone strings)
+        phone_pred_list = map_to_39phone(phone_pred_list,
+                                         train_label_type,
+                                         phone2phone_map_file_path)
+
+        # Convert from phone to num (-> list of phone indices)
+        phone_pred_list = phone2num(phone_pred_list,
+                                    phone2num_39_map_file_path)
+        labels_pred_mapped.append(phone_pred_list)
+
+        ###############
+        # Reference
+        ###############
+        # Convert from num to phone (-> list of phone strings)
+        phone_true_list = num2phone(
+            labels_true[i_batch],
+            eval_phone2num_map_file_path).split(' ')
+
+        # Mapping to 39 phones (-> list of phone strings)
+        phone_true_list = map_to_39phone(phone_true_list,
+                                         eval_label_type,
+                                         phone2phone_map_file_path)
+
+        # Convert from phone to num (-> list of phone indices)
+        phone_true_list = phone2num(phone_true_list,
+                                    phone2num_39_map_file_path)
+        labels_true_mapped.append(phone_true_list)
+
+    # Compute edit distance
+    labels_true_st = list2sparsetensor(labels_true_mapped,
+                                       padded_value=padded_value)
+    labels_pred_st = list2sparsetensor(labels_pred_mapped,
+                                       padded_value=padded_value)
+    per_list = compute_edit_distance(session, labels_true_st,
+                                     labels_pred_st)
+    return np.sum(per_list)
+
+
+def _compute_cer(labels_true, labels_pred, label_type):
+    """Compute the sum of CER of a mini-batch.
+    Args:
+        labels_true: list of reference labels
+        labels_pred: list of predicted labels
+        label_type: string, character or character_capital_divide
+    Returns:
+        The sum of CER in the mini-batch
+    """
+    map_file_path = '../metrics/mapping_files/ctc/' + label_type + '_to_num.txt'
+
+    cer_sum = 0
+    for i_batch in range(len(labels_pred)):
+
+        # Convert from list to string
+        str_true = num2char(labels_true[i_batch], map_file_path)
+        str_pred = num2char(labels_pred[i_batch], map_file_path)
+
+        # Remove silence(_) labels
+        str_true = re.sub(r'[_\'\":;!?,.-]+', "", str_true)
+        str_pred = re.sub(r'[_\'\":;!?,.-]+', "", str_pred)
+
+        # Convert to lower case
+        if label_type == 'character_capital_divide':
+            str_true = str_true.lower()
+            str_pred = str_pred.lower()
+
+        # Compute edit distance
+        cer_sum += Levenshtein.distance(
+            str_pred, str_true) / len(list(str_true))
+    return cer_sum
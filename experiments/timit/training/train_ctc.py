@@ -19,49 +19,93 @@ sys.path.append('../../../')
 from experiments.timit.data.load_dataset_ctc import Dataset
 from experiments.timit.metrics.ctc import do_eval_per, do_eval_cer
 from experiments.utils.data.sparsetensor import list2sparsetensor
+from experiments.utils.data.dataset_loader.tfrecord import load_info, make_dataset, make_batch_tensors, StepCounter
 from experiments.utils.training.learning_rate_controller import Controller
+from experiments.utils.training.resume import save_train_state, load_train_state
 from experiments.utils.training.plot import plot_loss, plot_ler
 from experiments.utils.directory import mkdir, mkdir_join
 from experiments.utils.parameter import count_total_parameters
 from models.ctc.load_model import load
 
 
-def do_train(network, params):
+def do_train(network, params, resume=False):
     """Run training. If target labels are phone, the model is evaluated by PER
     with 39 phones.
     Args:
         network: network to train
         params: A dictionary of parameters
+        resume: if True, restore the latest checkpoint and the state of
+            training, and continue training from there
     """
+    # Read mini-batches for training from TFRecord files in the graph
+    # instead of feeding them
+    tfrecord_dir = params.get('tfrecord_dir')
+
+    # Splice and stack frames in the graph instead of on the host
+    preprocess_in_graph = params.get('preprocess_in_graph', False) or \
+        tfrecord_dir is not None
+    if preprocess_in_graph:
+        splice, num_stack, num_skip = 1, 1, 1
+    else:
+        splice = params['splice']
+        num_stack = params['num_stack']
+        num_skip = params['num_skip']
+
     # Load dataset
-    train_data = Dataset(
-        data_type='train', label_type=params['label_type'],
-        batch_size=params['batch_size'], splice=params['splice'],
-        num_stack=params['num_stack'], num_skip=params['num_skip'],
-        sort_utt=True, sort_stop_epoch=None)
+    if tfrecord_dir is not None:
+        data_num, _, _ = load_info(tfrecord_dir)
+        train_data = StepCounter(data_num, params['batch_size'])
+    else:
+        train_data = Dataset(
+            data_type='train', label_type=params['label_type'],
+            batch_size=params['batch_size'], splice=splice,
+            num_stack=num_stack, num_skip=num_skip,
+            sort_utt=True, sort_stop_epoch=None)
+        train_data.set_sparse_labels()
+        # Mini-batches for training are not kept after each step
+        train_data.set_buffer_pool()
     dev_data = Dataset(
         data_type='dev', label_type=params['label_type'],
-        batch_size=params['batch_size'], splice=params['splice'],
-        num_stack=params['num_stack'], num_skip=params['num_skip'],
+        batch_size=params['batch_size'], splice=splice,
+        num_stack=num_stack, num_skip=num_skip,
         sort_utt=False)
     if params['label_type'] in ['character', 'character_capital_divide']:
         test_data = Dataset(
             data_type='test', label_type=params['label_type'],
-            batch_size=1, splice=params['splice'],
-            num_stack=params['num_stack'], num_skip=params['num_skip'],
+            batch_size=1, splice=splice,
+            num_stack=num_stack, num_skip=num_skip,
             sort_utt=False)
     else:
         test_data = Dataset(
             data_type='test', label_type='phone39',
-            batch_size=1, splice=params['splice'],
-            num_stack=params['num_stack'], num_skip=params['num_skip'],
+            batch_size=1, splice=splice,
+            num_stack=num_stack, num_skip=num_skip,
             sort_utt=False)
 
     # Tell TensorFlow that the model will be built into the default graph
     with tf.Graph().as_default():
 
         # Define placeholders
-        network.create_placeholders()
+        if tfrecord_dir is not None:
+            # NOTE: placeholders of the training data are replaced with
+            # tensors of the iterator, and the others are still fed
+            inputs, labels, inputs_seq_len, _ = make_batch_tensors(
+                make_dataset(
+                    tfrecord_dir, params['batch_size'],
+                    shuffle_buffer_size=params.get('shuffle_buffer_size',
+                                                   1000),
+                    bucket_boundaries=params.get('bucket_boundaries')),
+                sparse_labels=True)
+            network.create_input_tensors(inputs, labels, inputs_seq_len,
+                                         raw_inputs=True,
+                                         num_stack=params['num_stack'],
+                                         num_skip=params['num_skip'])
+        elif preprocess_in_graph:
+            network.create_placeholders(raw_inputs=True,
+                                        num_stack=params['num_stack'],
+                                        num_skip=params['num_skip'])
+        else:
+            network.create_placeholders()
         learning_rate_pl = tf.placeholder(tf.float32, name='learning_rate')
 
         # Add to the graph each operation (including model definition)
@@ -100,6 +144,9 @@ def do_train(network, params):
 
         # Create a saver for writing training checkpoints
         saver = tf.train.Saver(max_to_keep=None)
+        # NOTE: checkpoints in the middle of an epoch are only for resuming
+        save_step = params.get('save_step')
+        saver_resume = tf.train.Saver(max_to_keep=1)
 
         # Count total parameters
         parameters_dict, total_parameters = count_total_parameters(
@@ -129,24 +176,60 @@ def do_train(network, params):
             ler_dev_best = 1
             learning_rate = float(params['learning_rate'])
             epoch = 1
-            for step, (data, next_epoch_flag) in enumerate(train_data()):
+            step_init = 0
+
+            def train_state(step, epoch):
+                return {'step': step,
+                        'epoch': epoch,
+                        'learning_rate': learning_rate,
+                        'ler_dev_best': ler_dev_best,
+                        'train_data': train_data.state_dict(),
+                        'lr_controller': lr_controller.state_dict(),
+                        'csv': [csv_steps, csv_loss_train, csv_loss_dev,
+                                csv_ler_train, csv_ler_dev]}
+
+            if resume:
+                # Restore parameters and the state of training
+                checkpoint_path, state = load_train_state(network.model_dir)
+                saver.restore(sess, checkpoint_path)
+                train_data.load_state_dict(state['train_data'])
+                lr_controller.load_state_dict(state['lr_controller'])
+                step_init = state['step']
+                epoch = state['epoch']
+                learning_rate = state['learning_rate']
+                ler_dev_best = state['ler_dev_best']
+                (csv_steps, csv_loss_train, csv_loss_dev,
+                 csv_ler_train, csv_ler_dev) = state['csv']
+                print("Model restored from %s (epoch %d, step %d)" %
+                      (checkpoint_path, epoch, step_init))
+
+            for step, (data, next_epoch_flag) in enumerate(train_data(),
+                                                           step_init):
 
                 # Create feed dictionary for next mini batch (train)
-                inputs, labels, inputs_seq_len, _ = data
                 feed_dict_train = {
-                    network.inputs_pl_list[0]: inputs,
-                    network.labels_pl_list[0]: list2sparsetensor(
-                        labels,
-                        padded_value=train_data.padded_value),
-                    network.inputs_seq_len_pl_list[0]: inputs_seq_len,
                     network.keep_prob_input_pl_list[0]: network.dropout_ratio_input,
                     network.keep_prob_hidden_pl_list[0]: network.dropout_ratio_hidden,
                     network.keep_prob_output_pl_list[0]: network.dropout_ratio_output,
                     learning_rate_pl: learning_rate
                 }
+                if data is not None:
+                    inputs, labels, inputs_seq_len, _ = data
+                    feed_dict_train[network.inputs_pl_list[0]] = inputs
+                    feed_dict_train[network.labels_pl_list[0]] = labels
+                    feed_dict_train[
+                        network.inputs_seq_len_pl_list[0]] = inputs_seq_len
 
                 # Update parameters
-                sess.run(train_op, feed_dict=feed_dict_train)
+                if data is None and (step + 1) % 10 == 0:
+                    # Mini-batches made in the graph advance on every run,
+                    # so compute loss & ler of the training mini-batch in
+                    # the same run as the update
+                    _, loss_train, ler_train, summary_str_train = sess.run(
+                        [train_op, loss_op, ler_op, summary_train],
+                        feed_dict=feed_dict_train)
+                else:
+                    sess.run(train_op, feed_dict=feed_dict_train)
 
                 if (step + 1) % 10 == 0:
 
@@ -164,20 +247,25 @@ def do_train(network, params):
                     }
 
                     # Compute loss
-                    loss_train = sess.run(loss_op, feed_dict=feed_dict_train)
+                    if data is not None:
+                        loss_train = sess.run(loss_op,
+                                              feed_dict=feed_dict_train)
                     loss_dev = sess.run(loss_op, feed_dict=feed_dict_dev)
                     csv_steps.append(step)
                     csv_loss_train.append(loss_train)
                     csv_loss_dev.append(loss_dev)
 
-                    # Change to evaluation mode
-                    feed_dict_train[network.keep_prob_input_pl_list[0]] = 1.0
-                    feed_dict_train[network.keep_prob_hidden_pl_list[0]] = 1.0
-                    feed_dict_train[network.keep_prob_output_pl_list[0]] = 1.0
+                    if data is not None:
+                        # Change to evaluation mode
+                        feed_dict_train[network.keep_prob_input_pl_list[0]] = 1.0
+                        feed_dict_train[network.keep_prob_hidden_pl_list[0]] = 1.0
+                        feed_dict_train[network.keep_prob_output_pl_list[0]] = 1.0
+
+                        # Compute accuracy
+                        ler_train, summary_str_train = sess.run(
+                            [ler_op, summary_train], feed_dict=feed_dict_train)
 
-                    # Compute accuracy & update event files
-                    ler_train, summary_str_train = sess.run(
-                        [ler_op, summary_train], feed_dict=feed_dict_train)
+                    # Update event files
                     ler_dev, summary_str_dev = sess.run(
                         [ler_op, summary_dev], feed_dict=feed_dict_dev)
                     csv_ler_train.append(ler_train)
@@ -193,6 +281,15 @@ def do_train(network, params):
                     sys.stdout.flush()
                     start_time_step = time.time()
 
+                # Save checkpoint to resume training in the middle of epoch
+                if (save_step is not None and (step + 1) % save_step == 0 and
+                        not next_epoch_flag):
+                    save_path = saver_resume.save(
+                        sess, join(network.model_dir, 'resume.ckpt'),
+                        global_step=step + 1)
+                    save_train_state(network.model_dir, save_path,
+                                     train_state(step + 1, epoch))
+
                 # Save checkpoint and evaluate model per epoch
                 if next_epoch_flag:
                     duration_epoch = time.time() - start_time_epoch
@@ -280,6 +377,8 @@ def do_train(network, params):
                             break
 
                     epoch += 1
+                    save_train_state(network.model_dir, save_path,
+                                     train_state(step + 1, epoch))
                     start_time_epoch = time.time()
 
             duration_train = time.time() - start_time_train
@@ -290,7 +389,7 @@ def do_train(network, params):
                 f.write('')
 
 
-def main(config_path, model_save_path):
+def main(config_path, model_save_path, resume=False):
 
     # Load a config file (.yml)
     with open(config_path, "r") as f:
@@ -349,12 +448,12 @@ def main(config_path, model_save_path):
     network.model_dir = mkdir_join(network.model_dir, params['label_type'])
     network.model_dir = mkdir_join(network.model_dir, network.model_name)
 
-    # Reset model directory
-    if not isfile(join(network.model_dir, 'complete.txt')):
+    # Reset model directory unless training is resumed
+    if isfile(join(network.model_dir, 'complete.txt')):
+        raise ValueError('File exists.')
+    if not resume:
         tf.gfile.DeleteRecursively(network.model_dir)
         tf.gfile.MakeDirs(network.model_dir)
-    else:
-        raise ValueError('File exists.')
 
     # Set process name
     setproctitle('timit_ctc_' + params['label_type'])
@@ -362,13 +461,17 @@ def main(config_path, model_save_path):
     # Save config file
     shutil.copyfile(config_path, join(network.model_dir, 'config.yml'))
 
-    sys.stdout = open(join(network.model_dir, 'train.log'), 'w')
-    do_train(network=network, params=params)
+    sys.stdout = open(join(network.model_dir, 'train.log'),
+                      'a' if resume else 'w')
+    do_train(network=network, params=params, resume=resume)
 
 
 if __name__ == '__main__':
 
     args = sys.argv
+    resume = '--resume' in args
+    if resume:
+        args.remove('--resume')
     if len(args) != 3:
         raise ValueError
-    main(config_path=args[1], model_save_path=args[2])
+    main(config_path=args[1], model_save_path=args[2], resume=resume)
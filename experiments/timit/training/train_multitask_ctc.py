@@ -17,7 +17,7 @@ import shutil
 
 sys.path.append('../../../')
 from experiments.timit.data.load_dataset_multitask_ctc import Dataset
-from experiments.timit.metrics.ctc import do_eval_per, do_eval_cer
+from experiments.timit.metrics.ctc import do_eval_multitask
 from experiments.utils.data.sparsetensor import list2sparsetensor
 from experiments.utils.training.learning_rate_controller import Controller
 from experiments.utils.training.plot import plot_loss, plot_ler
@@ -227,24 +227,16 @@ def do_train(network, params):
                     if epoch >= 20:
                         start_time_eval = time.time()
                         print('=== Dev Data Evaluation ===')
-                        cer_dev_epoch = do_eval_cer(
+                        cer_dev_epoch, per_dev_epoch = do_eval_multitask(
                             session=sess,
-                            decode_op=decode_op_character,
+                            decode_op_main=decode_op_character,
+                            decode_op_sub=decode_op_phone,
                             network=network,
                             dataset=dev_data,
-                            label_type=params['label_type_main'],
-                            eval_batch_size=1,
-                            is_multitask=True)
+                            label_type_main=params['label_type_main'],
+                            label_type_sub=params['label_type_sub'],
+                            eval_batch_size=1)
                         print('  CER: %f %%' % (cer_dev_epoch * 100))
-                        per_dev_epoch = do_eval_per(
-                            session=sess,
-                            decode_op=decode_op_phone,
-                            per_op=per_op,
-                            network=network,
-                            dataset=dev_data,
-                            label_type=params['label_type_sub'],
-                            eval_batch_size=1,
-                            is_multitask=True)
                         print('  PER: %f %%' % (per_dev_epoch * 100))
 
                         if cer_dev_epoch < cer_dev_best:
@@ -252,24 +244,16 @@ def do_train(network, params):
                             print('■■■ ↑Best Score (CER)↑ ■■■')
 
                             print('=== Test Data Evaluation ===')
-                            cer_test = do_eval_cer(
+                            cer_test, per_test = do_eval_multitask(
                                 session=sess,
-                                decode_op=decode_op_character,
+                                decode_op_main=decode_op_character,
+                                decode_op_sub=decode_op_phone,
                                 network=network,
                                 dataset=test_data,
-                                label_type=params['label_type_main'],
-                                eval_batch_size=1,
-                                is_multitask=True)
+                                label_type_main=params['label_type_main'],
+                                label_type_sub=params['label_type_sub'],
+                                eval_batch_size=1)
                             print('  CER: %f %%' % (cer_test * 100))
-                            per_test = do_eval_per(
-                                session=sess,
-                                decode_op=decode_op_phone,
-                                per_op=per_op,
-                                network=network,
-                                dataset=test_data,
-                                label_type=params['label_type_sub'],
-                                eval_batch_size=1,
-                                is_multitask=True)
                             print('  PER: %f %%' % (per_test * 100))
 
                         duration_eval = time.time() - start_time_eval
@@ -88,43 +88,15 @@ def decode_test_multitask(session, decode_op_main, decode_op_sub, network,
     if save_path is not None:
         sys.stdout = open(join(network.model_dir, 'decode.txt'), 'w')
 
-    # Decode character
-    print('===== ' + label_type_main + ' =====')
-    map_file_path = '../metrics/mapping_files/ctc/' + label_type_main + '_to_num.txt'
-    # Batch size is expected to be 1
-    for data, next_epoch_flag in dataset(batch_size=1):
-        # Create feed dictionary for next mini batch
-        inputs, labels_true, _, inputs_seq_len, input_names = data
-
-        feed_dict = {
-            network.inputs_pl_list[0]: inputs,
-            network.inputs_seq_len_pl_list[0]: inputs_seq_len,
-            network.keep_prob_input_pl_list[0]: 1.0,
-            network.keep_prob_hidden_pl_list[0]: 1.0,
-            network.keep_prob_output_pl_list[0]: 1.0
-        }
-
-        # Visualize
-        labels_pred_st = session.run(decode_op_main, feed_dict=feed_dict)
-        labels_pred = sparsetensor2list(labels_pred_st, batch_size=1)
-
-        print('----- wav: %s -----' % input_names[0])
-        print('True: %s' % num2char(
-            labels_true[0], map_file_path))
-        print('Pred: %s' % num2char(
-            labels_pred[0], map_file_path))
-
-        if next_epoch_flag:
-            break
-
-    # Decode phone
-    print('\n===== ' + label_type_sub + ' =====')
-    map_file_path = '../metrics/mapping_files/ctc/' + \
+    map_file_path_main = '../metrics/mapping_files/ctc/' + \
+        label_type_main + '_to_num.txt'
+    map_file_path_sub = '../metrics/mapping_files/ctc/' + \
         label_type_sub + '_to_num.txt'
+
     # Batch size is expected to be 1
     for data, next_epoch_flag in dataset(batch_size=1):
         # Create feed dictionary for next mini batch
-        inputs, _, labels_true, inputs_seq_len, input_names = data
+        inputs, labels_true_main, labels_true_sub, inputs_seq_len, input_names = data
 
         feed_dict = {
             network.inputs_pl_list[0]: inputs,
@@ -134,19 +106,29 @@ def decode_test_multitask(session, decode_op_main, decode_op_sub, network,
             network.keep_prob_output_pl_list[0]: 1.0
         }
 
-        # Visualize
-        labels_pred_st = session.run(decode_op_sub, feed_dict=feed_dict)
+        # Decode both tasks at once
+        labels_pred_st_main, labels_pred_st_sub = session.run(
+            [decode_op_main, decode_op_sub], feed_dict=feed_dict)
+        labels_pred_main = sparsetensor2list(labels_pred_st_main,
+                                             batch_size=1)
         try:
-            labels_pred = sparsetensor2list(labels_pred_st, batch_size=1)
+            labels_pred_sub = sparsetensor2list(labels_pred_st_sub,
+                                                batch_size=1)
         except IndexError:
             # no output
-            labels_pred = ['']
-        finally:
-            print('----- wav: %s -----' % input_names[0])
-            print('True: %s' % num2phone(
-                labels_true[0], map_file_path))
-            print('Pred: %s' % num2phone(
-                labels_pred[0], map_file_path))
+            labels_pred_sub = ['']
+
+        print('----- wav: %s -----' % input_names[0])
+        print('===== ' + label_type_main + ' =====')
+        print('True: %s' % num2char(
+            labels_true_main[0], map_file_path_main))
+        print('Pred: %s' % num2char(
+            labels_pred_main[0], map_file_path_main))
+        print('===== ' + label_type_sub + ' =====')
+        print('True: %s' % num2phone(
+            labels_true_sub[0], map_file_path_sub))
+        print('Pred: %s' % num2phone(
+            labels_pred_sub[0], map_file_path_sub))
 
         if next_epoch_flag:
             break
@@ -0,0 +1,213 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Base class for loading dataset with any number of target streams (e.g.
+   character and phone labels for CTC, labels with <SOS> & <EOS> for
+   Attention). Input data of each mini-batch are gathered once, and all
+   targets are attached.
+   In this class, all data will be loaded at once.
+   You can use only the single GPU version.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from os.path import basename
+import numpy as np
+
+from experiments.utils.data.inputs.splicing import do_splice
+from experiments.utils.data.sparsetensor import dense2sparsetensor
+from experiments.utils.data.inputs.packed_inputs import inputs_nbytes
+from experiments.utils.data.dataset_loader.buffer_pool import BufferPool, alloc_inputs
+
+
+class DatasetBase(object):
+    """Subclasses set the following attributes.
+        target_names: list of names of target streams. Labels are yielded in
+            this order.
+        label_store_dict:
+            key => the name of the target stream
+            value => LabelStore of target labels
+        padded_value_dict: (optional)
+            key => the name of the target stream
+            value => int, the value used for padding labels. Default is -1.
+    """
+
+    # Target labels are padded with -1 by default
+    padded_value_dict = None
+
+    # Lengths of target labels of these streams are yielded after
+    # inputs_seq_len
+    seq_len_names = ()
+
+    # Input data are not spliced by default
+    splice = 1
+
+    # Target labels are padded by default
+    sparse_labels = False
+    sparse_names = None
+
+    # Buffers of input data are allocated for each mini-batch by default
+    buffer_pool = None
+
+    def __init__(self, *args, **kwargs):
+        raise NotImplementedError
+
+    def __call__(self, batch_size=None):
+        return self.__next_mini_batch(batch_size)
+
+    def reset(self):
+        """Reset data counter. This is useful when you'd like to evaluate
+        overall data during training.
+        """
+        self.sampler.reset()
+        self.padding_counter.reset()
+
+    @property
+    def resident_bytes(self):
+        """The number of bytes of input data and target labels in memory."""
+        return inputs_nbytes(self.input_list) + sum(
+            self.label_store_dict[name].nbytes for name in self.target_names)
+
+    def state_dict(self):
+        """Return the state of the data iterator, which is the position just
+        after the last mini-batch yielded.
+        Returns:
+            A dictionary of the states of the sampler and the padding counter
+        """
+        return {'sampler': self.sampler.state_dict(),
+                'padding_counter': self.padding_counter.state_dict()}
+
+    def load_state_dict(self, state):
+        """Restore the state of the data iterator. Call this before making
+        the generator of mini-batches.
+        Args:
+            state: A dictionary returned by state_dict()
+        """
+        self.sampler.load_state_dict(state['sampler'])
+        self.padding_counter.load_state_dict(state['padding_counter'])
+
+    def set_sparse_labels(self, sparse_labels=True, target_names=None):
+        """Yield target labels as SparseTensor components
+        `(indices, values, dense_shape)` instead of padded labels.
+        Args:
+            sparse_labels: bool
+            target_names: list of names of target streams to convert. If
+                None, all target streams are converted.
+        """
+        self.sparse_labels = sparse_labels
+        self.sparse_names = target_names
+
+    def set_buffer_pool(self, reuse=True, frame_bucket=32, max_free=4):
+        """Reuse buffers of input data across mini-batches. The buffer of
+        each mini-batch is returned to the pool when the next mini-batch is
+        requested, so do not keep mini-batches (or views of them) after
+        that.
+        Args:
+            reuse: bool
+            frame_bucket: int, the max frame num is rounded up to a multiple
+                of this value to share buffers
+            max_free: int, the maximum number of free buffers kept per shape
+        """
+        if reuse:
+            self.buffer_pool = BufferPool(frame_bucket, max_free)
+        else:
+            self.buffer_pool = None
+
+    def __next_mini_batch(self, _batch_size):
+        """Generate each mini-batch.
+        Args:
+            _batch_size: int, the size of mini-batch
+        Returns:
+            A tuple of `(inputs, labels_1, ..., labels_n, inputs_seq_len, labels_seq_len_1, ..., input_names)`
+                inputs: list of input data of size `[B, T, input_dim]`
+                labels_i: list of target labels of the i-th target stream,
+                    of size `[B, T]`. Labels are
+                    `(indices, values, dense_shape)` if sparse_labels is True
+                inputs_seq_len: list of length of inputs of size `[B]`
+                labels_seq_len_i: list of length of target labels of size
+                    `[B]`, only of target streams in seq_len_names
+                input_names: list of file name of input data of size `[B]`
+            next_epoch_flag: If true, one epoch is finished
+        """
+        if _batch_size is None:
+            _batch_size = self.batch_size
+
+        # The default value used for padding labels
+        self.padded_value = -1
+
+        padded_value_dict = self.padded_value_dict or {}
+        label_store_list = [self.label_store_dict[name]
+                            for name in self.target_names]
+        padded_value_list = [padded_value_dict.get(name, -1)
+                             for name in self.target_names]
+
+        buffer_pool = self.buffer_pool
+
+        while True:
+            # Sample indices of the next mini-batch
+            data_indices, next_epoch_flag = self.sampler.sample(_batch_size)
+            if next_epoch_flag and self.is_training:
+                print('---Next epoch---')
+
+            # Compute max frame num in mini-batch
+            max_frame_num = max(map(lambda x: x.shape[0],
+                                    self.input_list[data_indices]))
+
+            # Gather target labels of all target streams in mini-batch
+            labels_list, labels_seq_len_list = [], []
+            for label_store, padded_value in zip(label_store_list,
+                                                 padded_value_list):
+                labels, labels_seq_len = label_store.gather(
+                    data_indices, padded_value)
+                labels_list.append(labels)
+                labels_seq_len_list.append(labels_seq_len)
+
+            # Initialization
+            inputs = alloc_inputs(buffer_pool, len(data_indices),
+                                  max_frame_num, self.input_size)
+            inputs_seq_len = np.empty((len(data_indices),), dtype=np.int32)
+            input_names = np.array(list(
+                map(lambda path: basename(path).split('.')[0],
+                    np.take(self.input_paths, data_indices, axis=0))))
+
+            # Set values of each data in mini-batch
+            for i_batch, x in enumerate(data_indices):
+                data_i = self.input_list[x]
+                frame_num = data_i.shape[0]
+                inputs[i_batch, :frame_num, :] = data_i
+                inputs[i_batch, frame_num:, :] = 0
+                inputs_seq_len[i_batch] = frame_num
+            batch_inputs = inputs
+
+            # Splicing
+            inputs = do_splice(inputs, splice=self.splice,
+                               inputs_seq_len=inputs_seq_len)
+
+            # Count padding
+            self.padding_counter.update('inputs', inputs_seq_len)
+            for name, labels_seq_len in zip(self.target_names,
+                                            labels_seq_len_list):
+                self.padding_counter.update('labels_' + name, labels_seq_len)
+            if next_epoch_flag:
+                self.padding_counter.next_epoch()
+
+            if self.sparse_labels:
+                for i, name in enumerate(self.target_names):
+                    if self.sparse_names is None or name in self.sparse_names:
+                        labels_list[i] = dense2sparsetensor(
+                            labels_list[i], labels_seq_len_list[i])
+
+            labels_seq_len_list = [
+                labels_seq_len for name, labels_seq_len
+                in zip(self.target_names, labels_seq_len_list)
+                if name in self.seq_len_names]
+
+            yield (tuple([inputs] + labels_list + [inputs_seq_len] +
+                         labels_seq_len_list + [input_names]),
+                   next_epoch_flag)
+
+            # The buffer is reused after the mini-batch is consumed
+            if buffer_pool is not None:
+                buffer_pool.release(batch_inputs)
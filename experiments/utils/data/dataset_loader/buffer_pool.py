@@ -0,0 +1,92 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Reuse buffers of padded input data across mini-batches instead of
+   allocating (and page-faulting) a new array for each mini-batch.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import threading
+import numpy as np
+
+
+class BufferPool(object):
+    """A pool of float32 buffers keyed by the bucketed shape of mini-batches.
+       The max frame num is rounded up to a multiple of frame_bucket, so that
+       mini-batches of similar lengths share buffers. Each mini-batch is a
+       contiguous view of the head of a buffer. This is thread-safe.
+    Args:
+        frame_bucket: int, the max frame num is rounded up to a multiple of
+            this value
+        max_free: int, the maximum number of free buffers kept per shape
+    """
+
+    def __init__(self, frame_bucket=32, max_free=4):
+        if frame_bucket < 1:
+            raise ValueError('frame_bucket must be positive.')
+        self.frame_bucket = frame_bucket
+        self.max_free = max_free
+        self.num_allocated = 0
+        self._free = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, batch_size, max_frame_num, input_size):
+        """Take a buffer out of the pool, or allocate it if there is no free
+           buffer of the bucketed shape.
+        Args:
+            batch_size: int, the size of mini-batch
+            max_frame_num: int, the max frame num in mini-batch
+            input_size: int, the dimensions of input vectors
+        Returns:
+            inputs: np.ndarray of size `[B, T, input_size]`. Values are not
+                initialized.
+        """
+        bucket_frame_num = -(-max_frame_num // self.frame_bucket) * \
+            self.frame_bucket
+        capacity = batch_size * bucket_frame_num * input_size
+
+        buffer = None
+        with self._lock:
+            if len(self._free.get(capacity, [])) > 0:
+                buffer = self._free[capacity].pop()
+            else:
+                self.num_allocated += 1
+        if buffer is None:
+            buffer = np.empty((capacity,), dtype=np.float32)
+
+        size = batch_size * max_frame_num * input_size
+        return buffer[:size].reshape((batch_size, max_frame_num, input_size))
+
+    def release(self, inputs):
+        """Return the buffer of inputs to the pool. Do not use inputs (and
+           any views of it) after this.
+        Args:
+            inputs: np.ndarray returned by acquire()
+        """
+        buffer = inputs.base
+        if buffer is None or buffer.ndim != 1 or buffer.dtype != np.float32:
+            raise ValueError('inputs is not taken out of the pool.')
+        with self._lock:
+            free = self._free.setdefault(buffer.size, [])
+            if len(free) < self.max_free:
+                free.append(buffer)
+
+
+def alloc_inputs(buffer_pool, batch_size, max_frame_num, input_size):
+    """Allocate padded input data of a mini-batch. Values are not
+       initialized, so zero the padding of each utterance after filling it.
+    Args:
+        buffer_pool: BufferPool. If None, a new array is allocated.
+        batch_size: int, the size of mini-batch
+        max_frame_num: int, the max frame num in mini-batch
+        input_size: int, the dimensions of input vectors
+    Returns:
+        inputs: np.ndarray of size `[B, T, input_size]`
+    """
+    if buffer_pool is None:
+        return np.empty((batch_size, max_frame_num, input_size),
+                        dtype=np.float32)
+    return buffer_pool.acquire(batch_size, max_frame_num, input_size)
@@ -9,146 +9,42 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
-from os.path import basename
-import random
-import numpy as np
+from experiments.utils.data.dataset_loader.each_load.multi_target_each_load import DatasetBase as MultiTargetDatasetBase
 
 
-class DatasetBase(object):
+class DatasetBase(MultiTargetDatasetBase):
+    """Mini-batches are yielded as a tuple of
+       `(inputs, labels, inputs_seq_len, labels_seq_len, input_names)`.
+       Target labels are padded with <EOS>.
+    """
 
-    def __init__(self, *args, **kwargs):
-        raise NotImplementedError
+    target_names = ['main']
+    seq_len_names = ('main',)
 
-    def __call__(self, batch_size=None):
-        return self.__next_mini_batch(batch_size)
+    # Frames are not stacked
+    num_stack = None
+    num_skip = None
 
-    def reset(self):
-        """Reset data counter. This is useful when you'd like to evaluate
-        overall data during training.
-        """
-        self.rest = set(range(0, self.data_num, 1))
-
-    def __next_mini_batch(self, batch_size=None):
-        """Generate each mini-batch.
-        Args:
-            batch_size: int, the size of mini-batch
-        Returns:
-            A tuple of `(inputs, labels, inputs_seq_len, labels_seq_len, input_names)`
-                inputs: list of input data of size `[num_gpu, B, T, input_dim]`
-                labels: list of target labels of size `[num_gpu, B, T]`
-                inputs_seq_len: list of length of inputs of size `[num_gpu, B]`
-                labels_seq_len: list of length of target labels of size `[num_gpu, B]`
-                input_names: list of file name of input data of size `[num_gpu, B]`
-            next_epoch_flag: If true, one epoch is finished
-        """
-        if batch_size is None:
-            batch_size = self.batch_size
-
-        next_epoch_flag = False
-
-        if not self.is_test:
-            self.padded_value = self.eos_index
-        else:
-            self.padded_value = None
-
-        while True:
-            if next_epoch_flag:
-                next_epoch_flag = False
-
-            # Sort all uttrances
-            if self.sort_utt:
-                if len(self.rest) > batch_size:
-                    data_indices = list(self.rest)[:batch_size]
-                    self.rest -= set(data_indices)
-                else:
-                    # Last mini-batch
-                    data_indices = list(self.rest)
-                    self.rest = set(range(0, self.data_num, 1))
-                    next_epoch_flag = True
-                    if self.is_training:
-                        print('---Next epoch---')
-                    self.epoch += 1
-                    if self.epoch == self.sort_stop_epoch:
-                        self.sort_utt = False
-
-                # Shuffle selected mini-batch
-                random.shuffle(data_indices)
+    # Each `.npy` file is loaded by default
+    label_store_path = None
 
-            else:
-                if len(self.rest) > batch_size:
-                    # Randomly sample mini-batch
-                    data_indices = random.sample(list(self.rest), batch_size)
-                    self.rest -= set(data_indices)
-                else:
-                    # Last mini-batch
-                    data_indices = list(self.rest)
-                    self.rest = set(range(0, self.data_num, 1))
-                    next_epoch_flag = True
-                    if self.is_training:
-                        print('---Next epoch---')
+    @property
+    def label_paths_dict(self):
+        return {'main': self.label_paths}
 
-                    # Shuffle selected mini-batch
-                    random.shuffle(data_indices)
+    @property
+    def label_store_path_dict(self):
+        return {'main': self.label_store_path}
 
-            # Load dataset in mini-batch
-            input_list = np.array(list(
-                map(lambda path: np.load(path),
-                    np.take(self.input_paths, data_indices, axis=0))))
-            label_list = np.array(list(
-                map(lambda path: np.load(path),
-                    np.take(self.label_paths, data_indices, axis=0))))
-            input_names = list(
-                map(lambda path: basename(path).split('.')[0],
-                    np.take(self.input_paths, data_indices, axis=0)))
+    @property
+    def padded_value_dict(self):
+        return {'main': self.eos_index}
 
-            if self.input_size is None:
-                self.input_size = input_list[0].shape[1]
-                if self.num_stack is not None and self.num_skip is not None:
-                    self.input_size *= self.num_stack
-
-            # Compute max frame num in mini-batch
-            max_frame_num = max(map(lambda x: x.shape[0], input_list))
-
-            # Compute max target label length in mini-batch
-            max_seq_len = max(map(len, label_list))
-
-            # Initialization
-            inputs = np.zeros(
-                (len(data_indices), max_frame_num, self.input_size),
-                dtype=np.float32)
-            labels = np.array(
-                [[self.padded_value] * max_seq_len] * len(data_indices))
-            inputs_seq_len = np.empty((len(data_indices),), dtype=np.int32)
-            labels_seq_len = np.zeros((len(data_indices),), dtype=np.int32)
-
-            # Set values of each data in mini-batch
-            for i_batch in range(len(data_indices)):
-                data_i = input_list[i_batch]
-                frame_num = data_i.shape[0]
-                inputs[i_batch, : frame_num, :] = data_i
-                labels[i_batch, :len(label_list[i_batch])
-                       ] = label_list[i_batch]
-                inputs_seq_len[i_batch] = frame_num
-                labels_seq_len[i_batch] = len(label_list[i_batch])
-
-            ###############
-            # Multi-GPUs
-            ###############
-            if self.num_gpu > 1:
-                # Now we split the mini-batch data by num_gpu
-                inputs = np.array_split(inputs, self.num_gpu, axis=0)
-                labels = np.array_split(labels, self.num_gpu, axis=0)
-                inputs_seq_len = np.array_split(
-                    inputs_seq_len, self.num_gpu, axis=0)
-                labels_seq_len = np.array_split(
-                    labels_seq_len, self.num_gpu, axis=0)
-                input_names = np.array_split(input_names, self.num_gpu, axis=0)
-            else:
-                inputs = inputs[np.newaxis, :, :, :]
-                labels = labels[np.newaxis, :, :]
-                inputs_seq_len = inputs_seq_len[np.newaxis, :]
-                labels_seq_len = labels_seq_len[np.newaxis, :]
-                input_names = np.array(input_names)[np.newaxis, :]
-
-            yield (inputs, labels, inputs_seq_len, labels_seq_len,
-                   input_names), next_epoch_flag
+    def set_label_store(self, store_path):
+        """Read target labels out of the label store instead of each `.npy`
+        file.
+        Args:
+            store_path: path to the directory made by
+                experiments.utils.data.labels.label_store.pack_labels
+        """
+        self.label_store_path = store_path
@@ -0,0 +1,109 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Load dataset for the CTC model from wav files instead of pre-extracted
+   input data. Features are extracted on first access and cached on disk,
+   so later epochs and other experiments with the same feature
+   configuration read them out of the cache.
+   You can use the multi-GPU version.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from os.path import basename
+import numpy as np
+
+from experiments.utils.data.dataset_loader.each_load.ctc_each_load import DatasetBase
+from experiments.utils.data.dataset_loader.sampler import Sampler, skip_frame_nums
+from experiments.utils.data.dataset_loader.padding import PaddingCounter
+from input_pipeline.feature_cache import FeatureCache, wav_frame_num
+
+
+class WavDataset(DatasetBase):
+
+    def __init__(self, wav_paths, label_paths, batch_size, cache_dir,
+                 max_cache_bytes=10 * 1024 ** 3, feature_type='logfbank',
+                 feature_dim=40, energy=True, delta1=True, delta2=True,
+                 is_training=True, is_test=False, num_stack=1, num_skip=1,
+                 sort_utt=True, sort_stop_epoch=None, progressbar=False,
+                 num_gpu=1, max_frames_per_batch=None, num_buckets=None):
+        """A class for loading dataset.
+        Args:
+            wav_paths: list of paths to wav files
+            label_paths: list of paths to target labels (`.npy` files) of
+                each wav file
+            batch_size: int, the size of mini-batch
+            cache_dir: path to the directory to cache features
+            max_cache_bytes: int, the approximate cap of the size of the
+                cache. The least recently used features are evicted.
+            feature_type: logfbank (logmelfbank) or fbank or mfcc
+            feature_dim: int, the demension of each feature
+            energy: if True, add energy
+            delta1: if True, add delta features
+            delta2: if True, add delta delta features
+            is_training: bool, whether this is a training set
+            is_test: bool, if True, labels are not padded
+            num_stack: int, the number of frames to stack
+            num_skip: int, the number of frames to skip
+            sort_utt: if True, sort all utterances by the number of frames and
+                utteraces in each mini-batch are shuffled
+            sort_stop_epoch: After sort_stop_epoch, training will revert back
+                to a random order
+            progressbar: if True, visualize progressbar
+            num_gpu: int, if more than 1, divide batch_size by num_gpu
+            max_frames_per_batch: int, if set, utterances are packed into
+                each mini-batch until the number of padded frames after frame
+                skipping reaches this value, instead of batch_size
+            num_buckets: int, if set, mini-batches are made in each bucket of
+                utterances with similar lengths to reduce padding
+        """
+        if len(wav_paths) != len(label_paths):
+            raise ValueError(
+                'wav_paths and label_paths must have the same length.')
+
+        self.is_training = is_training
+        self.is_test = is_test
+        self.batch_size = batch_size * num_gpu
+        self.num_stack = num_stack
+        self.num_skip = num_skip
+        self.sort_utt = sort_utt
+        self.sort_stop_epoch = sort_stop_epoch
+        self.progressbar = progressbar
+        self.num_gpu = num_gpu
+        self.input_size = None
+
+        self.feature_cache = FeatureCache(
+            cache_dir, max_bytes=max_cache_bytes,
+            feature_type=feature_type, feature_dim=feature_dim,
+            energy=energy, delta1=delta1, delta2=delta2)
+
+        # The number of frames is computed from the header of each wav file
+        frame_nums = np.array([wav_frame_num(path) for path in wav_paths],
+                              dtype=np.int64)
+        self.frame_num_dict = dict(
+            zip([basename(path).split('.')[0] for path in wav_paths],
+                frame_nums.tolist()))
+        if len(self.frame_num_dict) != len(wav_paths):
+            raise ValueError('Names of wav files must be unique.')
+
+        # Sort by frame num
+        order = np.argsort(frame_nums, kind='mergesort')
+        self.input_paths = np.array(wav_paths)[order]
+        self.label_paths = np.array(label_paths)[order]
+        self.data_num = len(self.input_paths)
+        # NOTE: Not load dataset yet
+
+        self.sampler = Sampler(self.data_num, self.batch_size,
+                               sort_utt=sort_utt,
+                               sort_stop_epoch=sort_stop_epoch,
+                               frame_nums=skip_frame_nums(
+                                   frame_nums[order], num_stack, num_skip),
+                               max_frames_per_batch=max_frames_per_batch,
+                               min_batch_size=num_gpu,
+                               num_buckets=num_buckets)
+        self.padding_counter = PaddingCounter()
+
+    def set_feature_store(self, store_path):
+        raise ValueError('Features of wav files are read through the cache.')
@@ -0,0 +1,443 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Load dataset with any number of target streams (e.g. character and phone
+   labels for CTC, labels with <SOS> & <EOS> for Attention). Input data of
+   each mini-batch are loaded and stacked once, and all targets are attached.
+   You can use the multi-GPU version.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from os.path import basename
+import numpy as np
+
+from experiments.utils.data.inputs.frame_stacking import stack_frame
+from experiments.utils.data.inputs.feature_store import load_inputs
+from experiments.utils.data.inputs.cmvn import open_cmvn
+from experiments.utils.data.labels.label_store import load_labels
+from experiments.utils.data.sparsetensor import dense2sparsetensor
+from experiments.utils.data.dataset_loader.prefetcher import prefetch
+from experiments.utils.data.dataset_loader.buffer_pool import BufferPool, alloc_inputs
+from experiments.utils.data.dataset_loader.tower import partition_towers, gather_towers
+
+
+class DatasetBase(object):
+    """Subclasses set the following attributes.
+        target_names: list of names of target streams. Labels are yielded in
+            this order.
+        label_paths_dict:
+            key => the name of the target stream
+            value => np.ndarray of paths to target labels
+        padded_value_dict: (optional)
+            key => the name of the target stream
+            value => int, the value used for padding labels. Default is -1.
+    """
+
+    # Prefetching is disabled by default
+    num_workers = 0
+    queue_size = 4
+    prefetch_backend = 'thread'
+
+    # Each `.npy` file is loaded by default
+    input_store_path = None
+    label_store_path_dict = None
+
+    # Target labels are padded with -1 by default
+    padded_value_dict = None
+
+    # Lengths of target labels of these streams are yielded after
+    # inputs_seq_len
+    seq_len_names = ()
+
+    # Target labels are padded by default
+    sparse_labels = False
+    sparse_names = None
+
+    # Input data are not normalized by default
+    cmvn_path = None
+    cmvn_per_speaker = False
+
+    # Buffers of input data are allocated for each mini-batch by default
+    buffer_pool = None
+
+    # Input data are not wav files by default
+    feature_cache = None
+
+    # The sampler state after the last mini-batch yielded
+    sampler_state = None
+
+    def __init__(self, *args, **kwargs):
+        raise NotImplementedError
+
+    def __call__(self, batch_size=None):
+        return self.__next_mini_batch(batch_size)
+
+    def reset(self):
+        """Reset data counter. This is useful when you'd like to evaluate
+        overall data during training.
+        """
+        self.sampler.reset()
+        self.padding_counter.reset()
+        self.sampler_state = None
+
+    def state_dict(self):
+        """Return the state of the data iterator. This is the position just
+        after the last mini-batch yielded, so mini-batches prefetched but not
+        yielded yet are loaded again after restoring.
+        Returns:
+            A dictionary of the states of the sampler and the padding counter
+        """
+        if self.sampler_state is None:
+            sampler_state = self.sampler.state_dict()
+        else:
+            sampler_state = self.sampler_state
+        return {'sampler': sampler_state,
+                'padding_counter': self.padding_counter.state_dict()}
+
+    def load_state_dict(self, state):
+        """Restore the state of the data iterator. Call this before making
+        the generator of mini-batches.
+        Args:
+            state: A dictionary returned by state_dict()
+        """
+        self.sampler.load_state_dict(state['sampler'])
+        self.padding_counter.load_state_dict(state['padding_counter'])
+        self.sampler_state = None
+
+    def set_prefetch(self, num_workers, queue_size=4, backend='thread'):
+        """Load mini-batches in background workers.
+        Args:
+            num_workers: int, the number of workers. If 0, mini-batches are
+                loaded in the calling thread.
+            queue_size: int, the maximum number of mini-batches in flight
+            backend: thread or process
+        """
+        if backend not in ['thread', 'process']:
+            raise ValueError('backend is "thread" or "process".')
+        self.num_workers = num_workers
+        self.queue_size = queue_size
+        self.prefetch_backend = backend
+
+    def set_feature_store(self, store_path):
+        """Read input data out of the feature store instead of each `.npy`
+        file.
+        Args:
+            store_path: path to the directory made by
+                experiments.utils.data.inputs.feature_store.pack_features
+        """
+        self.input_store_path = store_path
+
+    def set_label_store(self, store_path_dict):
+        """Read target labels out of the label stores instead of each `.npy`
+        file.
+        Args:
+            store_path_dict:
+                key => the name of the target stream
+                value => path to the label store made by
+                    experiments.utils.data.labels.label_store.pack_labels
+        """
+        self.label_store_path_dict = store_path_dict
+
+    def set_sparse_labels(self, sparse_labels=True, target_names=None):
+        """Yield target labels of each tower as SparseTensor components
+        `(indices, values, dense_shape)` instead of padded labels. This is
+        ignored for test data.
+        Args:
+            sparse_labels: bool
+            target_names: list of names of target streams to convert. If
+                None, all target streams are converted.
+        """
+        self.sparse_labels = sparse_labels
+        self.sparse_names = target_names
+
+    def set_cmvn(self, cmvn_path, per_speaker=False):
+        """Normalize input data of each mini-batch by mean & variance.
+        Args:
+            cmvn_path: path to the `.npz` file made by
+                experiments.utils.data.inputs.cmvn.save_cmvn
+            per_speaker: if True, use statistics of each speaker. The
+                statistics must include all speakers of this dataset (see
+                experiments.utils.data.inputs.cmvn.split_cmvn).
+        """
+        if per_speaker:
+            missing_speakers = open_cmvn(cmvn_path).missing_speakers(
+                self.input_paths)
+            if len(missing_speakers) > 0:
+                raise ValueError(
+                    'Statistics of %d speakers (e.g. %s) are not found in %s.'
+                    % (len(missing_speakers), missing_speakers[0], cmvn_path))
+        self.cmvn_path = cmvn_path
+        self.cmvn_per_speaker = per_speaker
+
+    def set_buffer_pool(self, reuse=True, frame_bucket=32, max_free=4):
+        """Reuse buffers of input data across mini-batches. The buffer of
+        each mini-batch is returned to the pool when the next mini-batch is
+        requested, so do not keep mini-batches (or views of them) after
+        that. This is ignored when mini-batches are loaded in processes.
+        Args:
+            reuse: bool
+            frame_bucket: int, the max frame num is rounded up to a multiple
+                of this value to share buffers
+            max_free: int, the maximum number of free buffers kept per shape
+        """
+        if reuse:
+            self.buffer_pool = BufferPool(frame_bucket, max_free)
+        else:
+            self.buffer_pool = None
+
+    def __sample_tasks(self, batch_size, buffer_pool=None):
+        """Generate arguments of _load_batch for each mini-batch.
+        Args:
+            batch_size: int, the size of mini-batch
+            buffer_pool: BufferPool to allocate input data from
+        Returns:
+            A tuple of `(args, (next_epoch_flag, sampler_state))`
+        """
+        label_paths_dict = self.label_paths_dict
+        label_store_path_dict = self.label_store_path_dict or {}
+        padded_value_dict = self.padded_value_dict or {}
+        padded_value_list = [padded_value_dict.get(name, -1)
+                             if not self.is_test else None
+                             for name in self.target_names]
+        label_store_path_list = [label_store_path_dict.get(name)
+                                 for name in self.target_names]
+
+        while True:
+            # Sample indices of the next mini-batch
+            data_indices, next_epoch_flag = self.sampler.sample(batch_size)
+            sampler_state = self.sampler.state_dict()
+
+            input_paths = self.input_paths[data_indices]
+            label_paths_list = [label_paths_dict[name][data_indices]
+                                for name in self.target_names]
+            frame_num_dict = {}
+            for path in input_paths:
+                input_name = basename(path).split('.')[0]
+                frame_num_dict[input_name] = self.frame_num_dict[input_name]
+
+            yield (input_paths, label_paths_list, padded_value_list,
+                   frame_num_dict, self.num_stack, self.num_skip,
+                   self.input_size, self.input_store_path,
+                   label_store_path_list, self.cmvn_path,
+                   self.cmvn_per_speaker,
+                   buffer_pool,
+                   self.feature_cache), (next_epoch_flag, sampler_state)
+
+    def __next_mini_batch(self, batch_size=None):
+        """Generate each mini-batch.
+        Args:
+            batch_size: int, the size of mini-batch
+        Returns:
+            A tuple of `(inputs, labels_1, ..., labels_n, inputs_seq_len, labels_seq_len_1, ..., input_names)`
+                inputs: list of input data of size `[num_gpu, B, T, input_dim]`
+                labels_i: list of target labels of the i-th target stream,
+                    of size `[num_gpu, B, T]`. Labels are list of
+                    `(indices, values, dense_shape)` of each tower if
+                    sparse_labels is True
+                inputs_seq_len: list of length of inputs of size `[num_gpu, B]`
+                labels_seq_len_i: list of length of target labels of size
+                    `[num_gpu, B]`, only of target streams in seq_len_names
+                input_names: list of file name of input data of size `[num_gpu, B]`
+            next_epoch_flag: If true, one epoch is finished
+        """
+        if batch_size is None:
+            batch_size = self.batch_size
+
+        # The default value used for padding labels
+        if not self.is_test:
+            self.padded_value = -1
+        else:
+            self.padded_value = None
+
+        # Buffers cannot be shared with worker processes
+        if self.num_workers > 0 and self.prefetch_backend == 'process':
+            buffer_pool = None
+        else:
+            buffer_pool = self.buffer_pool
+
+        if self.num_workers > 0:
+            batches = prefetch(_load_batch,
+                               self.__sample_tasks(batch_size, buffer_pool),
+                               num_workers=self.num_workers,
+                               queue_size=self.queue_size,
+                               backend=self.prefetch_backend)
+        else:
+            batches = ((_load_batch(*args), extra)
+                       for args, extra
+                       in self.__sample_tasks(batch_size, buffer_pool))
+
+        for data, (next_epoch_flag, sampler_state) in batches:
+            (inputs, labels_list, inputs_seq_len, labels_seq_len_list,
+             input_names, cache_counts) = data
+            # Counters of caches in worker processes are not shared
+            if cache_counts is not None:
+                self.feature_cache.add_counts(cache_counts)
+            if next_epoch_flag and self.is_training:
+                print('---Next epoch---')
+
+            if self.input_size is None:
+                self.input_size = inputs.shape[-1]
+
+            batch_inputs = inputs
+
+            # Count padding
+            self.padding_counter.update('inputs', inputs_seq_len)
+            for name, labels_seq_len in zip(self.target_names,
+                                            labels_seq_len_list):
+                self.padding_counter.update('labels_' + name, labels_seq_len)
+            if next_epoch_flag:
+                self.padding_counter.next_epoch()
+
+            ###############
+            # Multi-GPUs
+            ###############
+            if self.num_gpu > 1:
+                # Now we split the mini-batch data by num_gpu. Utterances are
+                # assigned to GPUs to balance the number of frames, and each
+                # GPU is padded only to its own max length
+                tower_indices = partition_towers(inputs_seq_len, self.num_gpu)
+                inputs = gather_towers(inputs, tower_indices, inputs_seq_len)
+                labels_list = [
+                    gather_towers(labels, tower_indices, labels_seq_len)
+                    for labels, labels_seq_len
+                    in zip(labels_list, labels_seq_len_list)]
+                labels_seq_len_list = [
+                    gather_towers(labels_seq_len, tower_indices)
+                    for labels_seq_len in labels_seq_len_list]
+                inputs_seq_len = gather_towers(inputs_seq_len, tower_indices)
+                input_names = gather_towers(input_names, tower_indices)
+            else:
+                inputs = inputs[np.newaxis, :, :, :]
+                labels_list = [labels[np.newaxis, :, :]
+                               for labels in labels_list]
+                labels_seq_len_list = [labels_seq_len[np.newaxis, :]
+                                       for labels_seq_len in labels_seq_len_list]
+                inputs_seq_len = inputs_seq_len[np.newaxis, :]
+                input_names = np.array(input_names)[np.newaxis, :]
+
+            if self.sparse_labels and not self.is_test:
+                for i, name in enumerate(self.target_names):
+                    if self.sparse_names is None or name in self.sparse_names:
+                        labels_list[i] = [
+                            dense2sparsetensor(labels_i, labels_seq_len_i)
+                            for labels_i, labels_seq_len_i
+                            in zip(labels_list[i], labels_seq_len_list[i])]
+
+            labels_seq_len_list = [
+                labels_seq_len for name, labels_seq_len
+                in zip(self.target_names, labels_seq_len_list)
+                if name in self.seq_len_names]
+
+            self.sampler_state = sampler_state
+            yield (tuple([inputs] + labels_list + [inputs_seq_len] +
+                         labels_seq_len_list + [input_names]),
+                   next_epoch_flag)
+
+            # The buffer is reused after the mini-batch is consumed
+            if buffer_pool is not None:
+                buffer_pool.release(batch_inputs)
+
+
+def _load_batch(input_paths, label_paths_list, padded_value_list,
+                frame_num_dict, num_stack, num_skip, input_size,
+                input_store_path=None, label_store_path_list=None,
+                cmvn_path=None, cmvn_per_speaker=False, buffer_pool=None,
+                feature_cache=None):
+    """Load, stack and pad each mini-batch. Input data are loaded once for
+       all target streams. This is a module-level function so that it can
+       run in worker processes.
+    Args:
+        input_paths: np.ndarray of paths to input data
+        label_paths_list: list of np.ndarray of paths to target labels of
+            each target stream
+        padded_value_list: list of the value used for padding labels of each
+            target stream
+        frame_num_dict:
+            key => utterance name
+            value => the number of frames
+        num_stack: int, the number of frames to stack
+        num_skip: int, the number of frames to skip
+        input_size: int, the dimensions of stacked input vectors. If None,
+            this is computed from input data.
+        input_store_path: path to the feature store. If None, each `.npy`
+            file is loaded.
+        label_store_path_list: list of paths to the label store of each
+            target stream. If None, each `.npy` file is loaded.
+        cmvn_path: path to CMVN statistics. If None, input data are not
+            normalized.
+        cmvn_per_speaker: if True, use statistics of each speaker
+        buffer_pool: BufferPool to allocate input data from. If None, a new
+            array is allocated.
+        feature_cache: FeatureCache to read features of wav files through.
+            If set, input_paths are paths to wav files.
+    Returns:
+        inputs: np.ndarray of size `[B, T, input_size]`
+        labels_list: list of np.ndarray of size `[B, T]`
+        inputs_seq_len: np.ndarray of size `[B]`
+        labels_seq_len_list: list of np.ndarray of size `[B]`
+        input_names: list of file name of input data of size `[B]`
+        cache_counts: list of the numbers of hits, misses and hashed wav
+            files of feature_cache, or None without feature_cache
+    """
+    if label_store_path_list is None:
+        label_store_path_list = [None] * len(label_paths_list)
+
+    # Load dataset in mini-batch
+    cache_counts = None
+    if feature_cache is not None:
+        input_list, cache_counts = feature_cache.load(input_paths)
+    else:
+        input_list = load_inputs(input_paths, input_store_path)
+    labels_list, labels_seq_len_list = [], []
+    for label_paths, padded_value, label_store_path in zip(
+            label_paths_list, padded_value_list, label_store_path_list):
+        labels, labels_seq_len = load_labels(
+            label_paths, padded_value, label_store_path)
+        labels_list.append(labels)
+        labels_seq_len_list.append(labels_seq_len)
+    input_names = list(
+        map(lambda path: basename(path).split('.')[0], input_paths))
+
+    if input_size is None:
+        input_size = input_list[0].shape[1]
+        if num_stack is not None and num_skip is not None:
+            input_size *= num_stack
+
+    # Frame stacking
+    input_list = stack_frame(input_list,
+                             input_paths,
+                             frame_num_dict,
+                             num_stack,
+                             num_skip,
+                             progressbar=False)
+
+    # Compute max frame num in mini-batch
+    max_frame_num = max(map(lambda x: x.shape[0], input_list))
+
+    # Initialization
+    inputs = alloc_inputs(buffer_pool, len(input_paths), max_frame_num,
+                          input_size)
+    inputs_seq_len = np.empty((len(input_paths),), dtype=np.int32)
+
+    # Set values of each data in mini-batch
+    for i_batch in range(len(input_paths)):
+        data_i = input_list[i_batch]
+        frame_num = data_i.shape[0]
+        inputs[i_batch, :frame_num, :] = data_i
+        inputs[i_batch, frame_num:, :] = 0
+        inputs_seq_len[i_batch] = frame_num
+
+    # Mean & variance normalization
+    if cmvn_path is not None:
+        open_cmvn(cmvn_path).normalize(
+            inputs, inputs_seq_len, input_paths,
+            per_speaker=cmvn_per_speaker,
+            frame_nums=np.array([frame_num_dict[input_name]
+                                 for input_name in input_names]),
+            num_stack=num_stack, num_skip=num_skip)
+
+    return (inputs, labels_list, inputs_seq_len, labels_seq_len_list,
+            input_names, cache_counts)
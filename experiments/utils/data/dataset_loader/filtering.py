@@ -0,0 +1,77 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Drop utterances which are invalid for CTC or too long from training sets
+   up front by the lengths in the manifest, so that no mini-batch makes the
+   loss inf or NaN and long outliers do not dominate padding.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from collections import OrderedDict
+import numpy as np
+
+from experiments.utils.data.dataset_loader.sampler import skip_frame_nums
+
+
+def filter_manifest(manifest, ctc_label_keys=(), label_keys=(),
+                    num_stack=None, num_skip=None, max_frames=None,
+                    max_label_len=None, verbose=True):
+    """Drop invalid and too long utterances. If the manifest has no lengths
+       of labels of a label key, the checks of the label key are skipped.
+    Args:
+        manifest: Manifest
+        ctc_label_keys: list of label keys (see manifest.label_key) of CTC.
+            Utterances with fewer frames after frame stacking and skipping
+            than labels (with repeats of the same label counted) are
+            dropped.
+        label_keys: list of label keys to check by max_label_len
+        num_stack: int, the number of frames to stack
+        num_skip: int, the number of frames to skip. Frames are skipped
+            only when num_stack > 1 as in stack_frame.
+        max_frames: int, utterances with more frames than this (before frame
+            skipping) are dropped
+        max_label_len: int, utterances with more labels than this are
+            dropped
+        verbose: if True, print the number of dropped utterances
+    Returns:
+        manifest: Manifest of the kept utterances
+        report: A dictionary of the number of dropped utterances
+            key => reason
+            value => the number of utterances
+    """
+    report = OrderedDict()
+    keep = np.ones((len(manifest),), dtype=bool)
+
+    def drop(reason, mask):
+        mask &= keep
+        report[reason] = report.get(reason, 0) + int(mask.sum())
+        keep[mask] = False
+
+    for key in sorted(set(ctc_label_keys) | set(label_keys)):
+        if manifest.has_labels(key):
+            drop('no labels', manifest.label_lens(key) < 0)
+
+    frame_nums = skip_frame_nums(manifest.frame_nums, num_stack, num_skip)
+    for key in ctc_label_keys:
+        if manifest.has_labels(key):
+            drop('too short for CTC', frame_nums < manifest.ctc_lens(key))
+
+    if max_frames is not None:
+        drop('too many frames', manifest.frame_nums > max_frames)
+
+    if max_label_len is not None:
+        for key in label_keys:
+            if manifest.has_labels(key):
+                drop('too many labels',
+                     manifest.label_lens(key) > max_label_len)
+
+    if verbose and not keep.all():
+        print('=> Dropped %d/%d utterances (%s)' %
+              (len(keep) - int(keep.sum()), len(keep),
+               ', '.join('%s: %d' % (reason, num)
+                         for reason, num in report.items() if num > 0)))
+
+    return manifest.select(np.flatnonzero(keep)), report
@@ -0,0 +1,326 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Columnar manifest of a split, which replaces frame_num.pickle and
+   per-utterance path joins when a Dataset is constructed.
+
+   Layout of a manifest (input_dir/manifest.npz), sorted by frame num:
+       name: utterance names
+       path: paths relative to input_dir (also used under label dirs)
+       frame_num: the number of frames
+       label_len_<label_key>: the number of labels (-1 if missing)
+       ctc_len_<label_key>: the number of labels plus repeats of the same
+           label, which is the minimum number of frames for CTC (-1 if
+           missing)
+   where label_key is `<label_kind>/<label_type>` (e.g. ctc/character,
+   attention/character), so that labels of the same label type in
+   different label directories do not share columns.
+       shard, offset: the location in the feature store (optional)
+
+   Usage (from the root of this repository):
+       python -m experiments.utils.data.dataset_loader.manifest \
+           path_to_input_dir [label_kind/label_type=path_to_label_dir ...] \
+           [store=path_to_feature_store]
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+from os.path import join, isfile, relpath
+import sys
+import pickle
+import numpy as np
+
+from experiments.utils.data.inputs.feature_store import open_store
+from experiments.utils.progressbar import wrap_iterator
+
+MANIFEST_NAME = 'manifest.npz'
+FRAME_NUM_NAME = 'frame_num.pickle'
+LABEL_LEN_PREFIX = 'label_len_'
+CTC_LEN_PREFIX = 'ctc_len_'
+
+
+def label_key(label_kind, label_type):
+    """
+    Args:
+        label_kind: string, the name of the kind of label directories
+            (e.g. ctc, ctc_divide, attention, attention_divide)
+        label_type: string, the type of labels
+    Returns:
+        string, the key of lengths of labels in the manifest
+    """
+    return '%s/%s' % (label_kind, label_type)
+
+
+def make_manifest(input_dir, label_dirs=None, store_path=None,
+                  progressbar=False):
+    """Make the manifest of a split and save it in input_dir.
+    Args:
+        input_dir: path to the directory of input data (`.npy` files)
+        label_dirs: A dictionary of paths to the directories of labels
+            key => label key made by label_key (e.g. ctc/character)
+            value => path to the directory of labels
+        store_path: path to the feature store of input data
+        progressbar: if True, visualize progressbar
+    Returns:
+        columns: A dictionary of the columns of the manifest
+    """
+    paths = []
+    for dir_path, _, file_names in os.walk(input_dir):
+        for file_name in file_names:
+            if file_name.endswith('.npy'):
+                paths.append(relpath(join(dir_path, file_name), input_dir))
+    paths = sorted(paths)
+    names = [os.path.basename(path).split('.')[0] for path in paths]
+
+    # Load the frame number dictionary if it exists
+    if isfile(join(input_dir, FRAME_NUM_NAME)):
+        with open(join(input_dir, FRAME_NUM_NAME), 'rb') as f:
+            frame_num_dict = pickle.load(f)
+        frame_nums = [frame_num_dict[name] for name in names]
+    else:
+        frame_nums = [np.load(join(input_dir, path), mmap_mode='r').shape[0]
+                      for path in wrap_iterator(paths, progressbar)]
+
+    extra_columns = None
+    if store_path is not None:
+        store = open_store(store_path)
+        rows = np.array([store.name2row[name] for name in names],
+                        dtype=np.int64)
+        extra_columns = {'shard': store.shards[rows],
+                         'offset': store.offsets[rows]}
+
+    return save_manifest(input_dir, names, paths, frame_nums, label_dirs,
+                         extra_columns=extra_columns, progressbar=progressbar)
+
+
+def save_manifest(save_dir, names, paths, frame_nums, label_dirs=None,
+                  extra_columns=None, progressbar=False):
+    """Sort columns by frame num and save them as the manifest of save_dir.
+    Args:
+        save_dir: path to the directory to save the manifest
+        names: list of utterance names
+        paths: list of paths relative to save_dir and label dirs
+        frame_nums: list of the number of frames
+        label_dirs: A dictionary of paths to the directories of labels
+            (see make_manifest)
+        extra_columns: A dictionary of other columns (e.g. shard, offset)
+        progressbar: if True, visualize progressbar
+    Returns:
+        columns: A dictionary of the columns of the manifest
+    """
+    columns = {'name': np.array(names),
+               'path': np.array(paths),
+               'frame_num': np.array(frame_nums, dtype=np.int32)}
+    if extra_columns is not None:
+        columns.update(extra_columns)
+
+    if label_dirs is not None:
+        for key, label_dir in sorted(label_dirs.items()):
+            if len(key.split('/')) != 2:
+                raise ValueError(
+                    'Keys of label_dirs are "label_kind/label_type".')
+            label_lens, ctc_lens = [], []
+            for path in wrap_iterator(paths, progressbar):
+                if isfile(join(label_dir, path)):
+                    label = np.load(join(label_dir, path))
+                    label_lens.append(len(label))
+                    ctc_lens.append(len(label) + int(
+                        np.count_nonzero(label[1:] == label[:-1])))
+                else:
+                    label_lens.append(-1)
+                    ctc_lens.append(-1)
+            columns[LABEL_LEN_PREFIX + key] = np.array(
+                label_lens, dtype=np.int32)
+            columns[CTC_LEN_PREFIX + key] = np.array(
+                ctc_lens, dtype=np.int32)
+
+    # Sort by frame num
+    order = np.argsort(columns['frame_num'], kind='mergesort')
+    for key in columns.keys():
+        columns[key] = columns[key][order]
+
+    np.savez(join(save_dir, MANIFEST_NAME), **columns)
+
+    return columns
+
+
+class Manifest(object):
+    """Columns of utterances in one or more input directories, sorted by
+       frame num.
+    Args:
+        columns: A dictionary of the columns of the manifest
+        roots: np.ndarray of the index of the input directory of each
+            utterance
+    """
+
+    def __init__(self, columns, roots):
+        self.columns = columns
+        self.roots = roots
+
+    def __len__(self):
+        return len(self.roots)
+
+    @property
+    def names(self):
+        return self.columns['name']
+
+    @property
+    def frame_nums(self):
+        return self.columns['frame_num']
+
+    @property
+    def frame_num_dict(self):
+        """A dictionary compatible with frame_num.pickle.
+            key => utterance name
+            value => the number of frames
+        """
+        return dict(zip(self.names.tolist(), self.frame_nums.tolist()))
+
+    def label_lens(self, key):
+        """
+        Args:
+            key: string, the label key made by label_key
+        Returns:
+            np.ndarray of the number of labels of each utterance
+        """
+        if LABEL_LEN_PREFIX + key not in self.columns:
+            raise ValueError('label key "%s" is not in the manifest.' % key)
+        return self.columns[LABEL_LEN_PREFIX + key]
+
+    def ctc_lens(self, key):
+        """
+        Args:
+            key: string, the label key made by label_key
+        Returns:
+            np.ndarray of the minimum number of frames for CTC of each
+                utterance
+        """
+        if CTC_LEN_PREFIX + key not in self.columns:
+            raise ValueError('label key "%s" is not in the manifest.' % key)
+        return self.columns[CTC_LEN_PREFIX + key]
+
+    def has_labels(self, key):
+        """Whether lengths of labels of the label key are in the
+        manifest."""
+        return CTC_LEN_PREFIX + key in self.columns
+
+    def select(self, indices):
+        """
+        Args:
+            indices: np.ndarray of indices of utterances in ascending order
+        Returns:
+            manifest: Manifest of the selected utterances
+        """
+        return Manifest(dict((key, value[indices])
+                             for key, value in self.columns.items()),
+                        self.roots[indices])
+
+    def paths(self, root_dirs):
+        """Join relative paths to root directories.
+        Args:
+            root_dirs: list of paths to directories, corresponding to the
+                input directories the manifest was read from
+        Returns:
+            np.ndarray of paths of size `[num_utt]`
+        """
+        if len(self) == 0:
+            # e.g. all utterances are removed by filter_manifest
+            return np.array([], dtype='<U1')
+
+        root_dirs = [join(root_dir, '') for root_dir in root_dirs]
+        rel_paths = self.columns['path'].astype('U')
+        rel_width = rel_paths.dtype.itemsize // 4
+        root_width = max(len(root_dir) for root_dir in root_dirs)
+
+        # Copy code points of roots and relative paths into fixed-width
+        # strings at once. Trailing NULs are dropped by NumPy.
+        paths = np.zeros((len(self),),
+                         dtype='<U%d' % (root_width + rel_width))
+        chars = paths.view(np.uint32).reshape(len(self), -1)
+        rel_chars = rel_paths.view(np.uint32).reshape(len(self), rel_width)
+        for i_root, root_dir in enumerate(root_dirs):
+            rows = np.flatnonzero(self.roots == i_root)
+            root_chars = np.array([ord(c) for c in root_dir], dtype=np.uint32)
+            chars[rows, :len(root_dir)] = root_chars
+            chars[rows, len(root_dir):len(root_dir) + rel_width] = \
+                rel_chars[rows]
+        return paths
+
+
+def _read_columns(input_dir, speaker_fn):
+    """Read columns of a split from the manifest, or from frame_num.pickle if
+       the manifest does not exist.
+    """
+    if isfile(join(input_dir, MANIFEST_NAME)):
+        with np.load(join(input_dir, MANIFEST_NAME)) as manifest:
+            return dict((key, manifest[key]) for key in manifest.files)
+
+    with open(join(input_dir, FRAME_NUM_NAME), 'rb') as f:
+        frame_num_dict = pickle.load(f)
+    names = sorted(frame_num_dict.keys())
+    if speaker_fn is None:
+        paths = [name + '.npy' for name in names]
+    else:
+        paths = [join(speaker_fn(name), name + '.npy') for name in names]
+    return {'name': np.array(names),
+            'path': np.array(paths),
+            'frame_num': np.array([frame_num_dict[name] for name in names],
+                                  dtype=np.int32)}
+
+
+def load_manifest(input_dirs, speaker_fn=None):
+    """Load manifests of input directories and merge them.
+    Args:
+        input_dirs: list of paths to input directories
+        speaker_fn: A function to get the speaker directory from the
+            utterance name. This is used only when the manifest does not
+            exist and frame_num.pickle is loaded instead. If None, input data
+            are put directly under the input directory.
+    Returns:
+        manifest: Manifest
+    """
+    column_list = [_read_columns(input_dir, speaker_fn)
+                   for input_dir in input_dirs]
+    keys = set(column_list[0].keys())
+    for columns in column_list[1:]:
+        keys &= set(columns.keys())
+
+    columns = dict((key, np.concatenate([c[key] for c in column_list]))
+                   for key in keys)
+    roots = np.repeat(np.arange(len(column_list), dtype=np.int32),
+                      [len(c['name']) for c in column_list])
+
+    # Sort by frame num unless already sorted
+    if np.any(np.diff(columns['frame_num']) < 0):
+        order = np.argsort(columns['frame_num'], kind='mergesort')
+        for key in keys:
+            columns[key] = columns[key][order]
+        roots = roots[order]
+    return Manifest(columns, roots)
+
+
+def main(input_dir, label_dirs, store_path):
+
+    print('=> Making the manifest of %s...' % input_dir)
+    columns = make_manifest(input_dir, label_dirs, store_path,
+                            progressbar=True)
+    print('%d utterances, %d frames' %
+          (len(columns['name']), int(columns['frame_num'].sum())))
+
+
+if __name__ == '__main__':
+
+    args = sys.argv
+    if len(args) < 2:
+        raise ValueError
+    label_dirs, store_path = {}, None
+    for arg in args[2:]:
+        key, value = arg.split('=', 1)
+        if key == 'store':
+            store_path = value
+        else:
+            label_dirs[key] = value
+    main(input_dir=args[1], label_dirs=label_dirs, store_path=store_path)
@@ -0,0 +1,85 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Count how much of each mini-batch is padding."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+
+
+class PaddingCounter(object):
+    """Counter of padded elements in mini-batches. Sequences are counted for
+       each key (e.g. `inputs` or `labels`) separately.
+    Attributes:
+        batch_ratio: dict of the padding ratio of the latest mini-batch
+        epoch_ratio: dict of the padding ratio in the current epoch so far
+        last_epoch_ratio: dict of the padding ratio of the last epoch
+        num_elements: dict of the number of elements including padding in
+            the current epoch
+        num_padding: dict of the number of padded elements in the current
+            epoch
+    """
+
+    def __init__(self):
+        self.batch_ratio = {}
+        self.last_epoch_ratio = {}
+        self.reset()
+
+    @property
+    def epoch_ratio(self):
+        return {key: _ratio(self.num_padding[key], self.num_elements[key])
+                for key in self.num_elements.keys()}
+
+    def reset(self):
+        """Clear the counts of the current epoch."""
+        self.num_elements = {}
+        self.num_padding = {}
+
+    def update(self, key, seq_len):
+        """Count padding of a mini-batch padded to the longest sequence.
+        Args:
+            key: string, the name of sequences
+            seq_len: np.ndarray of length of each sequence of size `[B]`
+        """
+        seq_len = np.asarray(seq_len)
+        if len(seq_len) == 0:
+            return
+        num_elements = len(seq_len) * int(seq_len.max())
+        num_padding = num_elements - int(seq_len.sum())
+
+        self.batch_ratio[key] = _ratio(num_padding, num_elements)
+        self.num_elements[key] = self.num_elements.get(key, 0) + num_elements
+        self.num_padding[key] = self.num_padding.get(key, 0) + num_padding
+
+    def next_epoch(self):
+        """Close the current epoch."""
+        self.last_epoch_ratio = self.epoch_ratio
+        self.reset()
+
+    def state_dict(self):
+        """Return the counts of the current epoch.
+        Returns:
+            A dictionary of `num_elements`, `num_padding` and
+                `last_epoch_ratio`
+        """
+        return {'num_elements': dict(self.num_elements),
+                'num_padding': dict(self.num_padding),
+                'last_epoch_ratio': dict(self.last_epoch_ratio)}
+
+    def load_state_dict(self, state):
+        """Restore the counts of the current epoch.
+        Args:
+            state: A dictionary returned by state_dict()
+        """
+        self.num_elements = dict(state['num_elements'])
+        self.num_padding = dict(state['num_padding'])
+        self.last_epoch_ratio = dict(state['last_epoch_ratio'])
+
+
+def _ratio(num_padding, num_elements):
+    if num_elements == 0:
+        return 0.
+    return num_padding / num_elements
@@ -0,0 +1,63 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Prefetch mini-batches in background workers."""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+
+def prefetch(load_fn, task_generator, num_workers=1, queue_size=4,
+             backend='thread'):
+    """Run load_fn over tasks in background workers while keeping the order
+       of tasks.
+    Args:
+        load_fn: function to make each mini-batch. When backend is process,
+            this must be a module-level function and its arguments must be
+            picklable.
+        task_generator: generator of `(args, extra)`. load_fn is called as
+            `load_fn(*args)` in the worker and extra is passed through as is.
+        num_workers: int, the number of workers
+        queue_size: int, the maximum number of mini-batches in flight
+        backend: thread or process. Threads are suitable for I/O-bound
+            loading, and processes for CPU-bound frame stacking and padding.
+            NOTE: processes are forked at the first mini-batch, so create the
+            generator before starting the TensorFlow session if possible.
+    Returns:
+        A generator of `(load_fn(*args), extra)`. An exception raised in a
+            worker is re-raised when its mini-batch is consumed. Pending
+            mini-batches are cancelled and workers are shut down when the
+            generator is closed or garbage-collected.
+    """
+    if backend not in ['thread', 'process']:
+        raise ValueError('backend is "thread" or "process".')
+    if num_workers < 1:
+        raise ValueError('num_workers must be more than 0.')
+    if queue_size < 1:
+        raise ValueError('queue_size must be more than 0.')
+
+    if backend == 'thread':
+        executor = ThreadPoolExecutor(max_workers=num_workers)
+    else:
+        executor = ProcessPoolExecutor(max_workers=num_workers)
+
+    futures = deque()
+    try:
+        for args, extra in task_generator:
+            futures.append((executor.submit(load_fn, *args), extra))
+            if len(futures) >= queue_size:
+                future, extra = futures.popleft()
+                yield future.result(), extra
+
+        # Drain the rest of mini-batches
+        while len(futures) > 0:
+            future, extra = futures.popleft()
+            yield future.result(), extra
+    finally:
+        for future, _ in futures:
+            future.cancel()
+        executor.shutdown(wait=True)
@@ -0,0 +1,270 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Sample indices of each mini-batch from the schedule of the current epoch.
+   The schedule is precomputed once per epoch as an int array, so getting
+   each mini-batch costs O(B).
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from os.path import basename
+import numpy as np
+
+
+def compute_frame_nums(input_paths, frame_num_dict, num_stack=None,
+                       num_skip=None):
+    """Compute the number of frames of each utterance after frame stacking
+       and skipping.
+    Args:
+        input_paths: list of paths to input data
+        frame_num_dict:
+            key => utterance name
+            value => the number of frames
+        num_stack: int, the number of frames to stack
+        num_skip: int, the number of frames to skip
+    Returns:
+        frame_nums: np.ndarray of size `[len(input_paths)]`
+    """
+    frame_nums = np.array(
+        [frame_num_dict[basename(path).split('.')[0]] for path in input_paths],
+        dtype=np.int64)
+    return skip_frame_nums(frame_nums, num_stack, num_skip)
+
+
+def skip_frame_nums(frame_nums, num_stack=None, num_skip=None):
+    """Compute the number of frames of each utterance after frame stacking
+       and skipping. As in stack_frame, frames are skipped only when they are
+       stacked (num_stack > 1).
+    Args:
+        frame_nums: np.ndarray of the number of frames of each utterance
+        num_stack: int, the number of frames to stack
+        num_skip: int, the number of frames to skip
+    Returns:
+        frame_nums: np.ndarray of size `[len(frame_nums)]`
+    """
+    frame_nums = np.asarray(frame_nums, dtype=np.int64)
+    if num_stack is None or num_skip is None or num_stack == 1:
+        return frame_nums
+    if num_skip > 1:
+        frame_nums = (frame_nums + num_skip - 1) // num_skip
+    return frame_nums
+
+
+class Sampler(object):
+    """Index-based sampler of mini-batches.
+    Args:
+        data_num: int, the number of utterances. Utterances are expected to be
+            sorted by the number of frames in advance.
+        batch_size: int, the size of mini-batch
+        sort_utt: if True, utterances are sampled in ascending order of the
+            number of frames
+        sort_stop_epoch: After sort_stop_epoch, sampling will revert back to a
+            random order
+        shuffle_batch: if True, utteraces in each mini-batch are shuffled when
+            utterances are sorted
+        seed: int, the random seed. If None, it is drawn at random.
+        frame_nums: np.ndarray of the number of frames of each utterance.
+            This is necessary when max_frames_per_batch is set.
+        max_frames_per_batch: int, if set, utterances are packed into each
+            mini-batch until the number of padded frames (the size of
+            mini-batch times the max frame num in it) reaches this value.
+            batch_size is ignored in this case.
+        min_batch_size: int, the minimum size of mini-batch when
+            max_frames_per_batch or num_buckets is set. Set num_gpu here so that each tower
+            gets at least one utterance.
+        num_buckets: int, if set, utterances are divided into num_buckets
+            buckets by quantiles of the number of frames in random-order
+            epochs. Mini-batches are made in each bucket and then shuffled,
+            so that padding is reduced while keeping randomness. This is
+            ignored while utterances are sorted.
+    """
+
+    def __init__(self, data_num, batch_size, sort_utt=False,
+                 sort_stop_epoch=None, shuffle_batch=True, seed=None,
+                 frame_nums=None, max_frames_per_batch=None,
+                 min_batch_size=1, num_buckets=None):
+        self.data_num = data_num
+        self.batch_size = batch_size
+        self.sort_utt = sort_utt
+        self.sort_stop_epoch = sort_stop_epoch
+        self.shuffle_batch = shuffle_batch
+        if max_frames_per_batch is not None:
+            if frame_nums is None:
+                raise ValueError('Set frame_nums to use max_frames_per_batch.')
+        if num_buckets is not None:
+            if frame_nums is None:
+                raise ValueError('Set frame_nums to use num_buckets.')
+            if num_buckets < 1:
+                raise ValueError('num_buckets must be positive.')
+        if frame_nums is not None and len(frame_nums) != data_num:
+            raise ValueError('frame_nums must be of size data_num.')
+        self.frame_nums = frame_nums
+        self.max_frames_per_batch = max_frames_per_batch
+        self.min_batch_size = min_batch_size
+        self.num_buckets = num_buckets
+        if seed is None:
+            seed = np.random.randint(0, 2 ** 31 - 1)
+        self.seed = int(seed)
+
+        self.epoch = 0
+        self.offset = 0
+        self._make_schedule()
+
+    @property
+    def is_sorted(self):
+        """If True, the current epoch is sampled in the sorted order."""
+        if not self.sort_utt:
+            return False
+        if self.sort_stop_epoch is not None and self.epoch >= self.sort_stop_epoch:
+            return False
+        return True
+
+    def _make_schedule(self):
+        """Compute the order of all utterances in the current epoch.
+        The order is determined by the seed and the epoch only.
+        """
+        rng = np.random.RandomState((self.seed + self.epoch) % (2 ** 32))
+        boundaries = None
+        if self.is_sorted:
+            schedule = np.arange(self.data_num)
+        elif self.num_buckets is not None:
+            schedule, boundaries = self._bucket(rng)
+        else:
+            schedule = rng.permutation(self.data_num)
+
+        if boundaries is None and self.max_frames_per_batch is not None:
+            boundaries = self._pack(schedule)
+
+        if self.is_sorted and self.shuffle_batch:
+            # Shuffle utterances in each mini-batch while keeping the order
+            # of mini-batches
+            if boundaries is not None:
+                batch_ids = np.repeat(np.arange(len(boundaries) - 1),
+                                      np.diff(boundaries))
+            else:
+                batch_ids = np.arange(self.data_num) // self.batch_size
+            keys = batch_ids + rng.random_sample(self.data_num)
+            schedule = schedule[np.argsort(keys, kind='mergesort')]
+
+        self.schedule = schedule
+        self.boundaries = boundaries
+
+    def _bucket(self, rng):
+        """Make mini-batches in each bucket of similar lengths, and shuffle
+           the order of them.
+        Args:
+            rng: np.random.RandomState
+        Returns:
+            schedule: np.ndarray of indices of utterances
+            boundaries: np.ndarray of the start index of each mini-batch in
+                the schedule, followed by data_num
+        """
+        num_buckets = min(self.num_buckets,
+                          max(1, self.data_num // self.min_batch_size))
+        order = np.argsort(self.frame_nums, kind='mergesort')
+
+        batches = []
+        for bucket in np.array_split(order, num_buckets):
+            if len(bucket) == 0:
+                continue
+            bucket = bucket[rng.permutation(len(bucket))]
+            if self.max_frames_per_batch is not None:
+                bucket_boundaries = self._pack(bucket)
+            else:
+                bucket_boundaries = list(
+                    range(0, len(bucket), self.batch_size)) + [len(bucket)]
+                # Merge the last mini-batch into the previous one if it is
+                # too small
+                if (len(bucket_boundaries) > 2 and
+                        bucket_boundaries[-1] - bucket_boundaries[-2] <
+                        self.min_batch_size):
+                    del bucket_boundaries[-2]
+            batches.extend(np.split(bucket, bucket_boundaries[1:-1]))
+        batches = [b for b in batches if len(b) > 0]
+        batches = [batches[i] for i in rng.permutation(len(batches))]
+
+        schedule = np.concatenate(batches)
+        boundaries = np.cumsum([0] + [len(b) for b in batches])
+        return schedule, boundaries
+
+    def _pack(self, schedule):
+        """Split the schedule into mini-batches by the frame budget.
+        Args:
+            schedule: np.ndarray of indices of utterances
+        Returns:
+            boundaries: np.ndarray of the start index of each mini-batch in
+                the schedule, followed by the size of the schedule
+        """
+        boundaries = [0]
+        max_frame_num = 0
+        for i, frame_num in enumerate(self.frame_nums[schedule].tolist()):
+            batch_size = i - boundaries[-1]
+            if (batch_size >= self.min_batch_size and
+                    max(max_frame_num, frame_num) * (batch_size + 1) >
+                    self.max_frames_per_batch):
+                boundaries.append(i)
+                max_frame_num = frame_num
+            else:
+                max_frame_num = max(max_frame_num, frame_num)
+        boundaries.append(len(schedule))
+
+        # Merge the last mini-batch into the previous one if it is too small
+        if (len(boundaries) > 2 and
+                boundaries[-1] - boundaries[-2] < self.min_batch_size):
+            del boundaries[-2]
+
+        return np.array(boundaries)
+
+    def reset(self):
+        """Go back to the head of the current epoch."""
+        self.offset = 0
+        self._make_schedule()
+
+    def sample(self, batch_size=None):
+        """Sample indices of the next mini-batch.
+        Args:
+            batch_size: int, the size of mini-batch. This is ignored when
+                max_frames_per_batch or num_buckets is set.
+        Returns:
+            data_indices: np.ndarray of indices of utterances, of size `[B]`
+            next_epoch_flag: If true, one epoch is finished
+        """
+        if batch_size is None:
+            batch_size = self.batch_size
+        if self.boundaries is not None:
+            i_batch = np.searchsorted(self.boundaries, self.offset,
+                                      side='right')
+            batch_size = self.boundaries[i_batch] - self.offset
+
+        if self.data_num - self.offset > batch_size:
+            data_indices = self.schedule[self.offset:self.offset + batch_size]
+            self.offset += batch_size
+            return data_indices, False
+        else:
+            # Last mini-batch
+            data_indices = self.schedule[self.offset:]
+            self.epoch += 1
+            self.offset = 0
+            self._make_schedule()
+            return data_indices, True
+
+    def state_dict(self):
+        """Return the sampler state. The schedule is not included because it
+        is recomputed from the seed and the epoch.
+        Returns:
+            A dictionary of `epoch`, `offset` and `seed`
+        """
+        return {'epoch': self.epoch, 'offset': self.offset, 'seed': self.seed}
+
+    def load_state_dict(self, state):
+        """Restore the sampler state.
+        Args:
+            state: A dictionary returned by state_dict()
+        """
+        self.epoch = int(state['epoch'])
+        self.offset = int(state['offset'])
+        self.seed = int(state['seed'])
+        self._make_schedule()
@@ -0,0 +1,316 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Export input data and target labels to sharded TFRecord files, and read
+   them back as mini-batches with tf.data. Mini-batches are made in the
+   graph, so they are not fed through feed_dict every step.
+   Input data are stored without frame stacking and splicing. Stack and
+   splice them in the graph (create_input_tensors of models with
+   raw_inputs=True). This requires TensorFlow >= 1.4.
+
+   Layout of a TFRecord directory:
+       shard-%05d-of-%05d.tfrecord: tf.train.Example of each utterance
+           inputs: float32 (or float16) bytes of size `[T, input_size]`
+           frame_num: the number of frames
+           labels: target labels
+           label_len: the number of labels
+           name: the utterance name
+       info.npz: data_num, input_size and float16
+
+   Usage (from the root of this repository):
+       python -m experiments.utils.data.dataset_loader.tfrecord \
+           path_to_input_dir path_to_label_dir path_to_save_dir \
+           [num_shards] [float16]
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+from os.path import join
+import sys
+import math
+import numpy as np
+import tensorflow as tf
+
+from experiments.utils.data.dataset_loader.manifest import load_manifest
+from experiments.utils.data.inputs.quantization import Float16Converter
+from experiments.utils.progressbar import wrap_iterator
+
+SHARD_NAME = 'shard-%05d-of-%05d.tfrecord'
+INFO_NAME = 'info.npz'
+
+
+def _int64_feature(values):
+    return tf.train.Feature(int64_list=tf.train.Int64List(value=values))
+
+
+def _bytes_feature(value):
+    return tf.train.Feature(bytes_list=tf.train.BytesList(value=[value]))
+
+
+def _make_example(inputs, labels, name):
+    """Serialize an utterance.
+    Args:
+        inputs: np.ndarray of float32 or float16 of size `[T, input_size]`
+        labels: np.ndarray of size `[L]`
+        name: string, the utterance name
+    Returns:
+        A serialized tf.train.Example
+    """
+    inputs = np.ascontiguousarray(inputs)
+    feature = {
+        'inputs': _bytes_feature(inputs.tobytes()),
+        'frame_num': _int64_feature([inputs.shape[0]]),
+        'labels': _int64_feature(np.asarray(labels).tolist()),
+        'label_len': _int64_feature([len(labels)]),
+        'name': _bytes_feature(name.encode('utf-8'))}
+    return tf.train.Example(
+        features=tf.train.Features(feature=feature)).SerializeToString()
+
+
+def write_tfrecords(input_paths, label_paths, save_dir, num_shards=8,
+                    progressbar=False, float16=False):
+    """Write input data and target labels into sharded TFRecord files.
+       Utterances are assigned to shards in turn, so each shard covers all
+       lengths.
+    Args:
+        input_paths: list of paths to input data (`.npy` files)
+        label_paths: list of paths to target labels (`.npy` files)
+        save_dir: path to the directory to save TFRecord files
+        num_shards: int, the number of shards
+        progressbar: if True, visualize progressbar
+        float16: if True, input data are stored as float16. They are upcast
+            to float32 in the graph.
+    Returns:
+        data_num: int, the number of utterances
+        converter: Float16Converter if float16 is True, otherwise None
+    """
+    if len(input_paths) != len(label_paths):
+        raise ValueError('input_paths and label_paths must be the same size.')
+    if not os.path.isdir(save_dir):
+        os.makedirs(save_dir)
+    num_shards = max(1, min(num_shards, len(input_paths)))
+
+    writers = [tf.python_io.TFRecordWriter(
+        join(save_dir, SHARD_NAME % (i_shard, num_shards)))
+        for i_shard in range(num_shards)]
+    converter = Float16Converter() if float16 else None
+    input_size = None
+    for i in wrap_iterator(range(len(input_paths)), progressbar):
+        inputs = np.load(input_paths[i]).astype(np.float32)
+        if converter is not None:
+            inputs = converter.convert(inputs)
+        labels = np.load(label_paths[i])
+        if input_size is None:
+            input_size = inputs.shape[1]
+        name = os.path.basename(input_paths[i]).split('.')[0]
+        writers[i % num_shards].write(_make_example(inputs, labels, name))
+    for writer in writers:
+        writer.close()
+
+    np.savez(join(save_dir, INFO_NAME), data_num=len(input_paths),
+             input_size=input_size, float16=float16)
+    return len(input_paths), converter
+
+
+def load_info(tfrecord_dir):
+    """Load the number of utterances and the dimensions of input vectors.
+    Args:
+        tfrecord_dir: path to the directory made by write_tfrecords
+    Returns:
+        data_num: int, the number of utterances
+        input_size: int, the dimensions of input vectors
+        float16: bool, whether input data are stored as float16
+    """
+    info = np.load(join(tfrecord_dir, INFO_NAME))
+    float16 = bool(info['float16']) if 'float16' in info.files else False
+    return int(info['data_num']), int(info['input_size']), float16
+
+
+def _parse_example(serialized, input_size, float16=False):
+    """Parse an utterance.
+    Args:
+        serialized: A scalar string tensor
+        input_size: int, the dimensions of input vectors
+        float16: bool, whether input data are stored as float16
+    Returns:
+        inputs: A tensor of size `[T, input_size]`
+        labels: A tensor of size `[L]`
+        inputs_seq_len: A scalar tensor
+        labels_seq_len: A scalar tensor
+    """
+    features = tf.parse_single_example(
+        serialized,
+        features={'inputs': tf.FixedLenFeature([], tf.string),
+                  'frame_num': tf.FixedLenFeature([], tf.int64),
+                  'labels': tf.VarLenFeature(tf.int64),
+                  'label_len': tf.FixedLenFeature([], tf.int64)})
+    inputs = tf.decode_raw(features['inputs'],
+                           tf.float16 if float16 else tf.float32)
+    inputs = tf.reshape(tf.cast(inputs, tf.float32), [-1, input_size])
+    labels = tf.cast(tf.sparse_tensor_to_dense(features['labels']), tf.int32)
+    return (inputs, labels,
+            tf.cast(features['frame_num'], tf.int32),
+            tf.cast(features['label_len'], tf.int32))
+
+
+def make_dataset(tfrecord_dir, batch_size, padded_value=-1,
+                 shuffle_buffer_size=None, bucket_boundaries=None,
+                 num_epochs=None, num_parallel_calls=4, prefetch_size=2,
+                 seed=None):
+    """Make mini-batches of TFRecord files.
+    Args:
+        tfrecord_dir: path to the directory made by write_tfrecords
+        batch_size: int, the size of mini-batch
+        padded_value: int, the value used for padding labels
+        shuffle_buffer_size: int, the size of the buffer to shuffle
+            utterances. If None, utterances are not shuffled.
+        bucket_boundaries: list of frame nums. If set, mini-batches are made
+            in each bucket of utterances with similar lengths to reduce
+            padding.
+        num_epochs: int, the number of epochs. If None, repeat forever.
+        num_parallel_calls: int, the number of utterances parsed in parallel
+        prefetch_size: int, the number of mini-batches to prefetch
+        seed: int, the random seed for shuffling
+    Returns:
+        A tf.data.Dataset of `(inputs, labels, inputs_seq_len, labels_seq_len)`
+            inputs: A tensor of size `[B, T, input_size]`
+            labels: A tensor of size `[B, L]`
+            inputs_seq_len: A tensor of size `[B]`
+            labels_seq_len: A tensor of size `[B]`
+    """
+    _, input_size, float16 = load_info(tfrecord_dir)
+    file_paths = sorted(
+        join(tfrecord_dir, file_name) for file_name in os.listdir(tfrecord_dir)
+        if file_name.endswith('.tfrecord'))
+
+    # Read shards in parallel
+    dataset = tf.data.Dataset.from_tensor_slices(file_paths)
+    if shuffle_buffer_size is not None:
+        dataset = dataset.shuffle(len(file_paths), seed=seed)
+    dataset = dataset.interleave(tf.data.TFRecordDataset,
+                                 cycle_length=len(file_paths))
+
+    if shuffle_buffer_size is not None:
+        dataset = dataset.shuffle(shuffle_buffer_size, seed=seed)
+    dataset = dataset.repeat(num_epochs)
+    dataset = dataset.map(lambda x: _parse_example(x, input_size, float16),
+                          num_parallel_calls=num_parallel_calls)
+
+    padded_shapes = ([None, input_size], [None], [], [])
+    padding_values = (np.float32(0), np.int32(padded_value),
+                      np.int32(0), np.int32(0))
+
+    def batch(dataset):
+        return dataset.padded_batch(batch_size, padded_shapes,
+                                    padding_values=padding_values)
+
+    if bucket_boundaries is None:
+        dataset = batch(dataset)
+    else:
+        boundaries = tf.constant(bucket_boundaries, dtype=tf.int32)
+
+        def bucket_index(inputs, labels, inputs_seq_len, labels_seq_len):
+            return tf.reduce_sum(
+                tf.cast(inputs_seq_len >= boundaries, tf.int64))
+
+        dataset = dataset.apply(tf.contrib.data.group_by_window(
+            key_func=bucket_index,
+            reduce_func=lambda _, window: batch(window),
+            window_size=batch_size))
+
+    return dataset.prefetch(prefetch_size)
+
+
+def make_batch_tensors(dataset, sparse_labels=False):
+    """Make tensors of the next mini-batch. These are used in place of
+       placeholders of models.
+    Args:
+        dataset: A tf.data.Dataset made by make_dataset
+        sparse_labels: if True, labels are converted to a SparseTensor
+    Returns:
+        inputs: A tensor of size `[B, T, input_size]`
+        labels: A tensor of size `[B, L]`, or a SparseTensor if
+            sparse_labels is True
+        inputs_seq_len: A tensor of size `[B]`
+        labels_seq_len: A tensor of size `[B]`
+    """
+    iterator = dataset.make_one_shot_iterator()
+    inputs, labels, inputs_seq_len, labels_seq_len = iterator.get_next()
+    if sparse_labels:
+        labels = dense2sparse(labels, labels_seq_len)
+    return inputs, labels, inputs_seq_len, labels_seq_len
+
+
+def dense2sparse(labels, labels_seq_len):
+    """Convert padded labels to a SparseTensor in the graph.
+    Args:
+        labels: A tensor of size `[B, L]`
+        labels_seq_len: A tensor of size `[B]`
+    Returns:
+        A SparseTensor of labels
+    """
+    mask = tf.sequence_mask(labels_seq_len, tf.shape(labels)[1])
+    indices = tf.where(mask)
+    return tf.SparseTensor(indices=indices,
+                           values=tf.gather_nd(labels, indices),
+                           dense_shape=tf.shape(labels, out_type=tf.int64))
+
+
+class StepCounter(object):
+    """Count steps of training with mini-batches made in the graph. This is
+       used in place of Dataset in training loops, and yields
+       `(None, next_epoch_flag)` for each step. An epoch is
+       `ceil(data_num / batch_size)` steps.
+    Args:
+        data_num: int, the number of utterances
+        batch_size: int, the size of mini-batch
+    """
+
+    def __init__(self, data_num, batch_size):
+        self.steps_per_epoch = int(math.ceil(data_num / batch_size))
+        self.step = 0
+
+    def __call__(self):
+        while True:
+            self.step += 1
+            next_epoch_flag = self.step == self.steps_per_epoch
+            if next_epoch_flag:
+                self.step = 0
+                print('---Next epoch---')
+            yield None, next_epoch_flag
+
+    def state_dict(self):
+        """Return the number of steps in the current epoch."""
+        return {'step': self.step}
+
+    def load_state_dict(self, state):
+        """Restore the number of steps in the current epoch. Mini-batches
+        made in the graph are not restored.
+        """
+        self.step = state['step']
+
+
+def main(input_dir, label_dir, save_dir, num_shards, float16):
+
+    manifest = load_manifest([input_dir])
+    print('=> Writing %d utterances to %s...' %
+          (len(manifest.names), save_dir))
+    _, converter = write_tfrecords(manifest.paths([input_dir]),
+                                   manifest.paths([label_dir]),
+                                   save_dir, num_shards, progressbar=True,
+                                   float16=float16)
+    if converter is not None:
+        print('float16: %s' % converter.summary())
+
+
+if __name__ == '__main__':
+
+    args = sys.argv
+    if len(args) not in [4, 5, 6]:
+        raise ValueError
+    main(input_dir=args[1], label_dir=args[2], save_dir=args[3],
+         num_shards=int(args[4]) if len(args) >= 5 else 8,
+         float16=len(args) == 6 and args[5] == 'float16')
@@ -0,0 +1,69 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Split each mini-batch into towers (GPUs) so that towers have balanced
+   numbers of frames, and pad each tower only to its own max length.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import heapq
+import numpy as np
+
+
+def partition_towers(frame_nums, num_tower):
+    """Assign utterances to towers by the greedy longest-processing-time
+       (LPT) rule. The longest remaining utterance is assigned to the tower
+       with the fewest frames among towers which are not full. Each tower
+       gets the same number of utterances as np.array_split, so the average
+       of the gradients of towers weights utterances in the same way.
+    Args:
+        frame_nums: np.ndarray of the number of frames of size `[B]`
+        num_tower: int, the number of towers
+    Returns:
+        tower_indices: list of np.ndarray of indices of utterances in each
+            tower, in ascending order
+    """
+    frame_nums = np.asarray(frame_nums)
+    batch_size = len(frame_nums)
+    capacities = [len(x) for x in np.array_split(np.arange(batch_size),
+                                                 num_tower)]
+
+    # Towers with more capacities come first among ties
+    heap = [(0, i_tower) for i_tower in range(num_tower)
+            if capacities[i_tower] > 0]
+    heapq.heapify(heap)
+    tower_indices = [[] for _ in range(num_tower)]
+    for i in np.argsort(-frame_nums, kind='mergesort').tolist():
+        total_frame_num, i_tower = heapq.heappop(heap)
+        tower_indices[i_tower].append(i)
+        if len(tower_indices[i_tower]) < capacities[i_tower]:
+            heapq.heappush(heap,
+                           (total_frame_num + frame_nums[i], i_tower))
+
+    return [np.array(sorted(indices), dtype=np.int64)
+            for indices in tower_indices]
+
+
+def gather_towers(array, tower_indices, seq_len=None):
+    """Gather data of each tower.
+    Args:
+        array: np.ndarray of size `[B, ...]`
+        tower_indices: list of np.ndarray of indices made by
+            partition_towers
+        seq_len: np.ndarray of size `[B]`. If set, the padding of array
+            along the 2nd axis is trimmed to the max length in each tower.
+    Returns:
+        list of np.ndarray of data of each tower
+    """
+    array = np.asarray(array)
+    towers = []
+    for indices in tower_indices:
+        if seq_len is None:
+            towers.append(array[indices])
+        else:
+            max_len = int(seq_len[indices].max()) if len(indices) > 0 else 0
+            towers.append(array[indices, :max_len])
+    return towers
@@ -0,0 +1,326 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Compute global and per-speaker mean & variance of input features in one
+   streaming pass, and normalize each mini-batch with them (CMVN).
+
+   Layout of CMVN statistics (`.npz` file):
+       mean, std: `[input_size]`, statistics over all utterances
+       frame_num: the number of frames of all utterances
+       speaker: speaker names of size `[num_speaker]`
+       speaker_mean, speaker_std: `[num_speaker, input_size]`
+       speaker_frame_num: `[num_speaker]`
+
+   Utterances are grouped by the name of the directory including them
+   (e.g. input_path/speaker_name/input_name.npy).
+
+   Usage (from the root of this repository):
+       python -m experiments.utils.data.inputs.cmvn \
+           path_to_input_dir path_to_save
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+from os.path import join, basename, dirname, splitext, isfile
+import sys
+import numpy as np
+
+from experiments.utils.data.inputs.feature_store import open_store
+from experiments.utils.progressbar import wrap_iterator
+
+# Lower bound of variance to avoid division by zero
+VARIANCE_FLOOR = 1e-10
+
+# Opened statistics per process
+_CMVN_CACHE = {}
+
+
+def speaker_name(input_path):
+    """
+    Args:
+        input_path: path to input data
+    Returns:
+        string, the name of the directory including input data
+    """
+    return basename(dirname(input_path))
+
+
+def compute_cmvn(input_paths, store_path=None, chunk_size=10000,
+                 progressbar=False):
+    """Accumulate the sum and the sum of squares of features in float64 in
+       one pass over the data.
+    Args:
+        input_paths: list of paths to input data. Only utterance names are
+            used to read features when store_path is given.
+        store_path: path to the feature store. If None, each `.npy` file is
+            loaded.
+        chunk_size: int, the number of frames accumulated at once
+        progressbar: if True, visualize progressbar
+    Returns:
+        stats: A dictionary of statistics (see the layout above)
+    """
+    store = open_store(store_path) if store_path is not None else None
+
+    speaker_list, speaker2row = [], {}
+    frame_nums, sums, sq_sums = [], [], []
+    for input_path in wrap_iterator(input_paths, progressbar):
+        if store is None:
+            feat = np.load(input_path, mmap_mode='r')
+        else:
+            feat = store[basename(input_path).split('.')[0]]
+
+        speaker = speaker_name(input_path)
+        if speaker not in speaker2row:
+            speaker2row[speaker] = len(speaker_list)
+            speaker_list.append(speaker)
+            frame_nums.append(0)
+            sums.append(np.zeros((feat.shape[1],), dtype=np.float64))
+            sq_sums.append(np.zeros((feat.shape[1],), dtype=np.float64))
+        row = speaker2row[speaker]
+
+        for t in range(0, feat.shape[0], chunk_size):
+            chunk = np.asarray(feat[t:t + chunk_size], dtype=np.float64)
+            frame_nums[row] += chunk.shape[0]
+            sums[row] += chunk.sum(axis=0)
+            sq_sums[row] += np.einsum('td,td->d', chunk, chunk)
+
+    if len(speaker_list) == 0:
+        raise ValueError('input_paths must not be empty.')
+
+    return stats_from_sums(speaker_list, frame_nums, sums, sq_sums)
+
+
+def stats_from_sums(speaker_list, frame_nums, sums, sq_sums):
+    """Make statistics from accumulated sums of each speaker.
+    Args:
+        speaker_list: list of speaker names
+        frame_nums: list of the number of frames of each speaker
+        sums: np.ndarray of sums of features of size
+            `[num_speaker, input_size]`
+        sq_sums: np.ndarray of sums of squares of features of size
+            `[num_speaker, input_size]`
+    Returns:
+        stats: A dictionary of statistics (see the layout above)
+    """
+    speaker_frame_num = np.array(frame_nums, dtype=np.int64)
+    sums = np.array(sums, dtype=np.float64)
+    sq_sums = np.array(sq_sums, dtype=np.float64)
+
+    mean, std = _mean_std(sums.sum(axis=0), sq_sums.sum(axis=0),
+                          speaker_frame_num.sum())
+    speaker_mean, speaker_std = _mean_std(
+        sums, sq_sums, speaker_frame_num[:, np.newaxis])
+
+    return {'mean': mean,
+            'std': std,
+            'frame_num': speaker_frame_num.sum(),
+            'speaker': np.array(speaker_list),
+            'speaker_mean': speaker_mean,
+            'speaker_std': speaker_std,
+            'speaker_frame_num': speaker_frame_num}
+
+
+def _mean_std(sums, sq_sums, frame_num):
+    frame_num = np.maximum(frame_num, 1)
+    mean = sums / frame_num
+    variance = np.maximum(sq_sums / frame_num - mean ** 2, VARIANCE_FLOOR)
+    return mean, np.sqrt(variance)
+
+
+class CMVN(object):
+    """Normalize mini-batches with global or per-speaker statistics.
+    Args:
+        stats: A dictionary made by compute_cmvn
+    """
+
+    def __init__(self, stats):
+        self.mean = np.asarray(stats['mean'], dtype=np.float32)
+        self.inv_std = (1 / np.asarray(stats['std'])).astype(np.float32)
+        self.speaker_mean = np.asarray(stats['speaker_mean'],
+                                       dtype=np.float32)
+        self.speaker_inv_std = (
+            1 / np.asarray(stats['speaker_std'])).astype(np.float32)
+        self.speaker2row = dict(zip(np.asarray(stats['speaker']).tolist(),
+                                    range(len(stats['speaker']))))
+
+    def missing_speakers(self, input_paths):
+        """
+        Args:
+            input_paths: list of paths to input data
+        Returns:
+            list of speakers of input_paths not seen in computing statistics
+        """
+        return sorted(set(speaker_name(input_path)
+                          for input_path in input_paths) -
+                      set(self.speaker2row))
+
+    def stats(self, input_paths, per_speaker=False):
+        """Get statistics of each utterance.
+        Args:
+            input_paths: list of paths to input data
+            per_speaker: if True, use statistics of each speaker. All
+                speakers must be seen in computing statistics.
+        Returns:
+            mean: np.ndarray of size `[B, input_size]`
+            inv_std: np.ndarray of size `[B, input_size]`
+        """
+        batch_size = len(input_paths)
+        mean = np.tile(self.mean, (batch_size, 1))
+        inv_std = np.tile(self.inv_std, (batch_size, 1))
+        if per_speaker:
+            for i_batch, input_path in enumerate(input_paths):
+                speaker = speaker_name(input_path)
+                if speaker not in self.speaker2row:
+                    raise ValueError(
+                        'Statistics of speaker %s are not found.' % speaker)
+                row = self.speaker2row[speaker]
+                mean[i_batch] = self.speaker_mean[row]
+                inv_std[i_batch] = self.speaker_inv_std[row]
+        return mean, inv_std
+
+    def normalize(self, inputs, inputs_seq_len, input_paths,
+                  per_speaker=False, frame_nums=None, num_stack=None,
+                  num_skip=None):
+        """Normalize padded (and frame-stacked) inputs in place.
+        Args:
+            inputs: np.ndarray of size `[B, T, input_size * num_stack]`
+            inputs_seq_len: np.ndarray of length of inputs of size `[B]`
+            input_paths: list of paths to input data
+            per_speaker: if True, use statistics of each speaker
+            frame_nums: np.ndarray of the number of frames before frame
+                stacking of size `[B]`. This is not used if frames are not
+                stacked.
+            num_stack: int, the number of frames stacked
+            num_skip: int, the number of frames skipped
+        Returns:
+            inputs: np.ndarray of size `[B, T, input_size * num_stack]`
+        """
+        if num_stack is None or num_skip is None or num_stack == 1:
+            num_stack, num_skip = 1, 1
+            frame_nums = inputs_seq_len
+        mean, inv_std = self.stats(input_paths, per_speaker)
+        return apply_cmvn(inputs, frame_nums, mean, inv_std,
+                          num_stack, num_skip)
+
+
+def apply_cmvn(inputs, frame_nums, mean, inv_std, num_stack=1, num_skip=1):
+    """Subtract mean and multiply by the inverse of std in place. The i-th
+       frame of stacked inputs is the concatenation of frames
+       [i * num_skip, ..., i * num_skip + num_stack - 1], and the frames
+       beyond the length of each utterance are kept zero.
+    Args:
+        inputs: np.ndarray of size `[B, T, input_size * num_stack]`
+        frame_nums: np.ndarray of the number of frames before frame stacking
+            of size `[B]`
+        mean: np.ndarray of size `[input_size]` or `[B, input_size]`
+        inv_std: np.ndarray of size `[input_size]` or `[B, input_size]`
+        num_stack: int, the number of frames stacked
+        num_skip: int, the number of frames skipped
+    Returns:
+        inputs: np.ndarray of size `[B, T, input_size * num_stack]`
+    """
+    batch_size, max_time = inputs.shape[:2]
+    frames = inputs.reshape(batch_size, max_time, num_stack, -1)
+    mean = np.asarray(mean, dtype=inputs.dtype).reshape(
+        -1, 1, 1, frames.shape[3])
+    inv_std = np.asarray(inv_std, dtype=inputs.dtype).reshape(
+        -1, 1, 1, frames.shape[3])
+
+    frames -= mean
+    frames *= inv_std
+
+    # Index of the original frame of each stacked frame, `[T, num_stack]`
+    positions = (np.arange(max_time)[:, np.newaxis] * num_skip +
+                 np.arange(num_stack)[np.newaxis, :])
+    frames[positions[np.newaxis, :, :] >=
+           np.asarray(frame_nums)[:, np.newaxis, np.newaxis]] = 0
+
+    return inputs
+
+
+def save_cmvn(stats, save_path):
+    """
+    Args:
+        stats: A dictionary made by compute_cmvn
+        save_path: path to the `.npz` file
+    """
+    np.savez(save_path, **stats)
+
+
+def read_cmvn(cmvn_path):
+    """
+    Args:
+        cmvn_path: path to the `.npz` file made by save_cmvn
+    Returns:
+        cmvn: CMVN
+    """
+    with np.load(cmvn_path) as stats:
+        return CMVN(dict(stats))
+
+
+def open_cmvn(cmvn_path):
+    """Read statistics once per process.
+    Args:
+        cmvn_path: path to the `.npz` file made by save_cmvn
+    Returns:
+        cmvn: CMVN
+    """
+    if cmvn_path not in _CMVN_CACHE:
+        _CMVN_CACHE[cmvn_path] = read_cmvn(cmvn_path)
+    return _CMVN_CACHE[cmvn_path]
+
+
+def split_cmvn(cmvn_path, input_paths, data_type, store_path=None):
+    """Get statistics for per-speaker CMVN of a split. Speakers of dev and
+       evaluation sets are usually not in the training set, so statistics of
+       each speaker of such a split are computed on the split itself and
+       saved next to cmvn_path once.
+    Args:
+        cmvn_path: path to the `.npz` file made by save_cmvn
+        input_paths: list of paths to input data of the split
+        data_type: string, the name of the split
+        store_path: path to the feature store of the split. If None, each
+            `.npy` file is loaded.
+    Returns:
+        path to the `.npz` file with statistics of all speakers of the split
+    """
+    if len(open_cmvn(cmvn_path).missing_speakers(input_paths)) == 0:
+        return cmvn_path
+
+    split_cmvn_path = '%s_%s.npz' % (splitext(cmvn_path)[0], data_type)
+    if not isfile(split_cmvn_path):
+        print('=> Computing statistics of %s...' % data_type)
+        save_cmvn(compute_cmvn(input_paths, store_path=store_path),
+                  split_cmvn_path)
+    if len(open_cmvn(split_cmvn_path).missing_speakers(input_paths)) > 0:
+        raise ValueError(
+            '%s does not have statistics of all speakers of %s.' %
+            (split_cmvn_path, data_type))
+    return split_cmvn_path
+
+
+def main(input_dir, save_path):
+
+    input_paths = []
+    for dir_path, _, file_names in os.walk(input_dir):
+        for file_name in file_names:
+            if file_name.endswith('.npy'):
+                input_paths.append(join(dir_path, file_name))
+    input_paths = sorted(input_paths)
+
+    print('=> Computing statistics of %d utterances...' % len(input_paths))
+    stats = compute_cmvn(input_paths, progressbar=True)
+    save_cmvn(stats, save_path)
+    print('%d speakers, %d frames' %
+          (len(stats['speaker']), int(stats['frame_num'])))
+
+
+if __name__ == '__main__':
+
+    args = sys.argv
+    if len(args) != 3:
+        raise ValueError
+    main(input_dir=args[1], save_path=args[2])
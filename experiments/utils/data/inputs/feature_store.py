@@ -0,0 +1,210 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Pack per-utterance features into a few large float32 (or float16) shard
+   files and read each utterance out of memory-mapped shards.
+
+   Layout of a feature store:
+       save_path/shard_00000.npy, shard_00001.npy, ...: `[total_frames, dim]`
+       save_path/index.npz: name, shard, offset, frame_num, dim per utterance
+           (and relative_error per dimension of float16 shards)
+
+   Usage (from the root of this repository):
+       python -m experiments.utils.data.inputs.feature_store \
+           path_to_input_dir path_to_save [float16]
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+from os.path import join, basename, isdir
+import sys
+import numpy as np
+
+from experiments.utils.progressbar import wrap_iterator
+from experiments.utils.data.inputs.quantization import Float16Converter
+
+INDEX_NAME = 'index.npz'
+SHARD_NAME = 'shard_%05d.npy'
+
+# Opened feature stores per process
+_STORE_CACHE = {}
+
+
+def pack_features(input_paths, save_path, shard_size=1024 ** 3,
+                  progressbar=False, float16=False):
+    """Concatenate per-utterance feature matrices into float32 shard files.
+    Args:
+        input_paths: list of paths to input data (`.npy` files)
+        save_path: path to the directory to save shards and the index
+        shard_size: int, the approximate size of each shard in bytes
+        progressbar: if True, visualize progressbar
+        float16: if True, features are stored as float16. They are upcast
+            to float32 when each mini-batch is made.
+    Returns:
+        index: A dictionary of the index of utterances
+    """
+    if not isdir(save_path):
+        os.makedirs(save_path)
+
+    converter = Float16Converter() if float16 else None
+
+    names, shards, offsets, frame_nums, dims = [], [], [], [], []
+    buffer, buffer_bytes, offset, shard_id = [], 0, 0, 0
+    for input_path in wrap_iterator(input_paths, progressbar):
+        feat = np.load(input_path).astype(np.float32)
+        if len(buffer) > 0 and feat.shape[1] != buffer[0].shape[1]:
+            raise ValueError('All utterances must have the same dimension.')
+        if converter is not None:
+            feat = converter.convert(feat)
+
+        names.append(basename(input_path).split('.')[0])
+        shards.append(shard_id)
+        offsets.append(offset)
+        frame_nums.append(feat.shape[0])
+        dims.append(feat.shape[1])
+
+        buffer.append(feat)
+        buffer_bytes += feat.nbytes
+        offset += feat.shape[0]
+
+        if buffer_bytes >= shard_size:
+            np.save(join(save_path, SHARD_NAME % shard_id),
+                    np.concatenate(buffer, axis=0))
+            buffer, buffer_bytes, offset = [], 0, 0
+            shard_id += 1
+
+    if len(buffer) > 0:
+        np.save(join(save_path, SHARD_NAME % shard_id),
+                np.concatenate(buffer, axis=0))
+
+    index = {'name': np.array(names),
+             'shard': np.array(shards, dtype=np.int32),
+             'offset': np.array(offsets, dtype=np.int64),
+             'frame_num': np.array(frame_nums, dtype=np.int32),
+             'dim': np.array(dims, dtype=np.int32)}
+    if converter is not None:
+        index['relative_error'] = converter.relative_error.astype(np.float32)
+    np.savez(join(save_path, INDEX_NAME), **index)
+
+    return index
+
+
+class FeatureStore(object):
+    """Read each utterance out of memory-mapped shards without copying.
+    Args:
+        store_path: path to the directory made by pack_features
+    """
+
+    def __init__(self, store_path):
+        self.store_path = store_path
+
+        with np.load(join(store_path, INDEX_NAME)) as index:
+            self.names = index['name']
+            self.shards = index['shard']
+            self.offsets = index['offset']
+            self.frame_nums = index['frame_num']
+            self.dims = index['dim']
+        self.name2row = dict(zip(self.names.tolist(),
+                                 range(len(self.names))))
+
+        # Shards are memory-mapped lazily
+        self._shard_list = [None] * (int(self.shards.max()) + 1
+                                     if len(self.shards) > 0 else 0)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, input_name):
+        return input_name in self.name2row
+
+    def __getitem__(self, input_name):
+        """
+        Args:
+            input_name: string, the utterance name
+        Returns:
+            A view of the memory-mapped shard of size `[T, input_size]`
+        """
+        row = self.name2row[input_name]
+        shard = self._shard(self.shards[row])
+        offset = self.offsets[row]
+        return shard[offset:offset + self.frame_nums[row]]
+
+    def _shard(self, shard_id):
+        if self._shard_list[shard_id] is None:
+            self._shard_list[shard_id] = np.load(
+                join(self.store_path, SHARD_NAME % shard_id), mmap_mode='r')
+        return self._shard_list[shard_id]
+
+    @property
+    def frame_num_dict(self):
+        """A dictionary compatible with frame_num.pickle.
+            key => utterance name
+            value => the number of frames
+        """
+        return dict(zip(self.names.tolist(), self.frame_nums.tolist()))
+
+
+def open_store(store_path):
+    """Open a feature store once per process.
+    Args:
+        store_path: path to the directory made by pack_features
+    Returns:
+        store: FeatureStore
+    """
+    if store_path not in _STORE_CACHE:
+        _STORE_CACHE[store_path] = FeatureStore(store_path)
+    return _STORE_CACHE[store_path]
+
+
+def load_inputs(input_paths, store_path=None):
+    """Load input data of each mini-batch.
+    Args:
+        input_paths: list of paths to input data. Only utterance names are
+            used when store_path is given.
+        store_path: path to the feature store. If None, each `.npy` file is
+            loaded.
+    Returns:
+        input_list: np.ndarray of input data of size `[B]`
+    """
+    # An object array even if all utterances have the same length
+    input_list = np.empty((len(input_paths),), dtype=object)
+    if store_path is None:
+        for i, path in enumerate(input_paths):
+            input_list[i] = np.load(path)
+        return input_list
+
+    store = open_store(store_path)
+    for i, path in enumerate(input_paths):
+        input_list[i] = store[basename(path).split('.')[0]]
+    return input_list
+
+
+def main(input_dir, save_path, float16):
+
+    input_paths = []
+    for dir_path, _, file_names in os.walk(input_dir):
+        for file_name in file_names:
+            if file_name.endswith('.npy'):
+                input_paths.append(join(dir_path, file_name))
+    input_paths = sorted(input_paths)
+
+    print('=> Packing %d utterances...' % len(input_paths))
+    index = pack_features(input_paths, save_path, progressbar=True,
+                          float16=float16)
+    print('%d shards, %d frames' %
+          (int(index['shard'].max()) + 1, int(index['frame_num'].sum())))
+    if float16:
+        print('float16: relative RMS error %.3e (max %.3e)' %
+              (index['relative_error'].mean(), index['relative_error'].max()))
+
+
+if __name__ == '__main__':
+
+    args = sys.argv
+    if len(args) not in [3, 4]:
+        raise ValueError
+    main(input_dir=args[1], save_path=args[2],
+         float16=len(args) == 4 and args[3] == 'float16')
@@ -7,6 +7,7 @@ from __future__ import print_function
 
 from os.path import basename
 import numpy as np
+from numpy.lib.stride_tricks import as_strided
 from experiments.utils.progressbar import wrap_iterator
 
 
@@ -28,69 +29,98 @@ def stack_frame(input_list, input_paths, frame_num_dict, num_stack, num_skip,
         num_skip: int, the number of frames to skip
         progressbar: if True, visualize progressbar
     Returns:
-        stacked_input_list: list of frame-stacked inputs
+        stacked_input_list: np.ndarray of frame-stacked inputs of size
+            `[len(input_list)]`. Each element is a float32 array of size
+            `[ceil(frame_num / num_skip), input_size * num_stack]`.
     """
-    if num_stack == 1 and num_stack == 1:
-        return input_list
+    utt_num = len(input_paths)
+    stacked_input_list = np.empty((utt_num,), dtype=object)
+
+    if num_stack is None or num_skip is None or num_stack == 1:
+        for i_utt in range(utt_num):
+            stacked_input_list[i_utt] = input_list[i_utt].astype(
+                np.float32, copy=False)
+        return stacked_input_list
 
     if num_stack < num_skip:
         raise ValueError('num_skip must be less than num_stack.')
 
-    input_size = input_list[0].shape[1]
-    utt_num = len(input_paths)
-
-    stacked_input_list = []
     for i_utt in wrap_iterator(range(utt_num), progressbar):
         # Per utterance
         input_name = basename(input_paths[i_utt]).split('.')[0]
         frame_num = frame_num_dict[input_name]
-        frame_num_decimated = frame_num / num_skip
-        if frame_num_decimated != int(frame_num_decimated):
-            frame_num_decimated += 1
-        frame_num_decimated = int(frame_num_decimated)
-
-        stacked_frames = np.zeros(
-            (frame_num_decimated, input_size * num_stack))
-        stack_count = 0  # counter for stacked_frames
-        stack = []
-        for i_frame, frame in enumerate(input_list[i_utt]):
-            #####################
-            # final frame
-            #####################
-            if i_frame == len(input_list[i_utt]) - 1:
-                # Stack the final frame
-                stack.append(frame)
-
-                while stack_count != int(frame_num_decimated):
-                    # Concatenate stacked frames
-                    for i_stack in range(len(stack)):
-                        stacked_frames[stack_count][input_size *
-                                                    i_stack:input_size * (i_stack + 1)] = stack[i_stack]
-                    stack_count += 1
-
-                    # Delete some frames to skip
-                    for _ in range(num_skip):
-                        if len(stack) != 0:
-                            stack.pop(0)
-
-            ########################
-            # first & middle frames
-            ########################
-            elif len(stack) < num_stack:
-                # Stack some frames until stack is filled
-                stack.append(frame)
-
-                if len(stack) == num_stack:
-                    # Concatenate stacked frames
-                    for i_stack in range(num_stack):
-                        stacked_frames[stack_count][input_size *
-                                                    i_stack:input_size * (i_stack + 1)] = stack[i_stack]
-                    stack_count += 1
-
-                    # Delete some frames to skip
-                    for _ in range(num_skip):
-                        stack.pop(0)
-
-        stacked_input_list.append(stacked_frames)
-
-    return np.array(stacked_input_list)
+        frame_num_decimated = (frame_num + num_skip - 1) // num_skip
+
+        stacked_input_list[i_utt] = _stack(
+            input_list[i_utt][np.newaxis, :frame_num, :],
+            num_stack, num_skip, frame_num_decimated)[0]
+
+    return stacked_input_list
+
+
+def stack_frame_batch(inputs, inputs_seq_len, num_stack, num_skip):
+    """Stack & skip some frames of padded inputs. This gives the same frames
+       as stack_frame for each utterance.
+    Args:
+        inputs: np.ndarray of size `[B, T, input_size]`
+        inputs_seq_len: np.ndarray of length of inputs of size `[B]`
+        num_stack: int, the number of frames to stack
+        num_skip: int, the number of frames to skip
+    Returns:
+        stacked_inputs: np.ndarray of size
+            `[B, ceil(T / num_skip), input_size * num_stack]`. Frames beyond
+            the length of each utterance are zero.
+        stacked_inputs_seq_len: np.ndarray of size `[B]`
+    """
+    if num_stack < num_skip:
+        raise ValueError('num_skip must be less than num_stack.')
+
+    inputs_seq_len = np.asarray(inputs_seq_len)
+    max_time = inputs.shape[1]
+
+    # Zero frames beyond the length of each utterance
+    inputs = inputs.astype(np.float32)
+    inputs[np.arange(max_time)[np.newaxis, :] >=
+           inputs_seq_len[:, np.newaxis]] = 0
+
+    stacked_inputs = _stack(inputs, num_stack, num_skip,
+                            (max_time + num_skip - 1) // num_skip)
+    stacked_inputs_seq_len = (
+        (inputs_seq_len + num_skip - 1) // num_skip).astype(np.int32)
+    return stacked_inputs, stacked_inputs_seq_len
+
+
+def _stack(inputs, num_stack, num_skip, frame_num_decimated):
+    """Stack frames of sequences whose frames beyond the length are zero.
+       The i-th output frame is the concatenation of input frames
+       [i * num_skip, ..., i * num_skip + num_stack - 1], and frames beyond
+       the end are filled with zero.
+    Args:
+        inputs: np.ndarray of size `[B, T, input_size]`
+        num_stack: int, the number of frames to stack
+        num_skip: int, the number of frames to skip
+        frame_num_decimated: int, the number of output frames
+    Returns:
+        np.ndarray of size
+            `[B, frame_num_decimated, input_size * num_stack]`
+    """
+    batch_size, max_time, input_size = inputs.shape
+
+    # Pad zero frames on the right side so that every window is in range
+    padded_len = max((frame_num_decimated - 1) * num_skip + num_stack,
+                     max_time)
+    inputs_padded = np.zeros((batch_size, padded_len, input_size),
+                             dtype=np.float32)
+    inputs_padded[:, :max_time] = inputs
+
+    # View windows of num_stack frames every num_skip frames,
+    # `[B, frame_num_decimated, num_stack, input_size]`
+    stride_b, stride_t, stride_d = inputs_padded.strides
+    windows = as_strided(
+        inputs_padded,
+        shape=(batch_size, frame_num_decimated, num_stack, input_size),
+        strides=(stride_b, stride_t * num_skip, stride_t, stride_d))
+
+    # Copy windows because they can overlap each other in memory
+    return np.ascontiguousarray(windows).reshape(
+        batch_size, frame_num_decimated, num_stack * input_size)
@@ -0,0 +1,133 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Keep (frame-stacked) inputs of all utterances in one contiguous float32
+   (or float16) buffer with an offsets table. Each utterance is read through memory
+   mapping and stacked directly into the buffer, so the whole dataset is
+   never held twice in memory.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from os.path import basename
+import numpy as np
+
+from experiments.utils.data.inputs.feature_store import open_store
+from experiments.utils.data.inputs.frame_stacking import stack_frame_batch
+from experiments.utils.progressbar import wrap_iterator
+
+
+class PackedInputs(object):
+    """Inputs of all utterances packed in one buffer. This can be indexed
+       like an object array of inputs.
+    Args:
+        buffer: np.ndarray of size `[total_frame_num, input_size]`
+        offsets: np.ndarray of size `[num_utt + 1]`, inputs of the i-th
+            utterance are buffer[offsets[i]:offsets[i + 1]]
+    """
+
+    def __init__(self, buffer, offsets):
+        self.buffer = buffer
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        """
+        Args:
+            index: int or np.ndarray of indices of utterances
+        Returns:
+            A view of the buffer of size `[T, input_size]`, or list of them
+                if index is an array
+        """
+        if np.ndim(index) > 0:
+            return [self[i] for i in np.asarray(index).tolist()]
+        return self.buffer[self.offsets[index]:self.offsets[index + 1]]
+
+    @property
+    def frame_nums(self):
+        """np.ndarray of the number of frames of each utterance."""
+        return np.diff(self.offsets)
+
+    @property
+    def nbytes(self):
+        return self.buffer.nbytes + self.offsets.nbytes
+
+
+def pack_inputs(input_paths, frame_num_dict, num_stack=None, num_skip=None,
+                store_path=None, progressbar=False, converter=None):
+    """Read inputs of each utterance lazily and stack frames directly into
+       one buffer. This gives the same frames as stack_frame.
+    Args:
+        input_paths: list of paths to input data. Only utterance names are
+            used to read inputs when store_path is given.
+        frame_num_dict:
+            key => utterance name
+            value => the number of frames
+        num_stack: int, the number of frames to stack
+        num_skip: int, the number of frames to skip
+        store_path: path to the feature store. If None, each `.npy` file is
+            memory-mapped.
+        progressbar: if True, visualize progressbar
+        converter: Float16Converter. If set, inputs are held as float16, and
+            they are upcast to float32 when each mini-batch is made.
+    Returns:
+        packed_inputs: PackedInputs
+    """
+    if num_stack is None or num_skip is None or num_stack == 1:
+        num_stack, num_skip = 1, 1
+    if num_stack < num_skip:
+        raise ValueError('num_skip must be less than num_stack.')
+    store = open_store(store_path) if store_path is not None else None
+
+    input_names = [basename(path).split('.')[0] for path in input_paths]
+    frame_nums = np.array([frame_num_dict[name] for name in input_names],
+                          dtype=np.int64)
+    offsets = np.zeros((len(input_paths) + 1,), dtype=np.int64)
+    np.cumsum((frame_nums + num_skip - 1) // num_skip, out=offsets[1:])
+
+    buffer = None
+    for i_utt in wrap_iterator(range(len(input_paths)), progressbar):
+        if store is None:
+            feat = np.load(input_paths[i_utt], mmap_mode='r')
+        else:
+            feat = store[input_names[i_utt]]
+        frame_num = frame_nums[i_utt]
+        if feat.shape[0] < frame_num:
+            raise ValueError('%s has less frames than frame_num_dict.' %
+                             input_names[i_utt])
+
+        if buffer is None:
+            # Allocate the buffer once
+            buffer = np.empty((offsets[-1], feat.shape[1] * num_stack),
+                              dtype=np.float32 if converter is None
+                              else np.float16)
+
+        if num_stack == 1:
+            stacked_feat = feat[:frame_num]
+        else:
+            stacked_feat = stack_frame_batch(
+                feat[np.newaxis, :frame_num], frame_nums[i_utt:i_utt + 1],
+                num_stack, num_skip)[0][0]
+        if converter is not None:
+            stacked_feat = converter.convert(stacked_feat)
+        buffer[offsets[i_utt]:offsets[i_utt + 1]] = stacked_feat
+
+    if buffer is None:
+        buffer = np.zeros((0, 0), dtype=np.float32)
+    return PackedInputs(buffer, offsets)
+
+
+def inputs_nbytes(input_list):
+    """
+    Args:
+        input_list: PackedInputs or list of input data
+    Returns:
+        int, the number of bytes of input data
+    """
+    if isinstance(input_list, PackedInputs):
+        return input_list.nbytes
+    return int(sum(x.nbytes for x in input_list))
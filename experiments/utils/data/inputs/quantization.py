@@ -0,0 +1,83 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Hold input data as float16 to halve disk I/O and resident memory.
+   Values are upcast to float32 when each mini-batch is made.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+
+FLOAT16_MAX = float(np.finfo(np.float16).max)
+
+
+class Float16Converter(object):
+    """Convert input data to float16 after checking the scale of each
+       dimension, and accumulate the quantization error per dimension.
+    """
+
+    def __init__(self):
+        self.frame_num = 0
+        self.sum = None
+        self.sum_square = None
+        self.sum_square_error = None
+        self.max_abs_error = None
+
+    def convert(self, feat):
+        """
+        Args:
+            feat: np.ndarray of size `[T, input_size]`
+        Returns:
+            np.ndarray of float16 of size `[T, input_size]`
+        """
+        feat = np.asarray(feat)
+        if self.sum is None:
+            input_size = feat.shape[1]
+            self.sum = np.zeros((input_size,), dtype=np.float64)
+            self.sum_square = np.zeros((input_size,), dtype=np.float64)
+            self.sum_square_error = np.zeros((input_size,), dtype=np.float64)
+            self.max_abs_error = np.zeros((input_size,), dtype=np.float64)
+        if feat.shape[0] == 0:
+            return feat.astype(np.float16)
+
+        # Check the scale of each dimension
+        overflow = np.abs(feat).max(axis=0) >= FLOAT16_MAX
+        if overflow.any():
+            raise ValueError(
+                'Values of dimensions %s overflow float16. Normalize input '
+                'data before converting them.' %
+                np.flatnonzero(overflow).tolist())
+
+        feat_float16 = feat.astype(np.float16)
+        error = feat_float16.astype(np.float64) - feat
+        self.frame_num += feat.shape[0]
+        self.sum += feat.sum(axis=0, dtype=np.float64)
+        self.sum_square += np.square(feat, dtype=np.float64).sum(axis=0)
+        self.sum_square_error += np.square(error).sum(axis=0)
+        np.maximum(self.max_abs_error, np.abs(error).max(axis=0),
+                   out=self.max_abs_error)
+        return feat_float16
+
+    @property
+    def relative_error(self):
+        """np.ndarray of the RMS quantization error of each dimension
+        relative to its standard deviation.
+        """
+        frame_num = max(self.frame_num, 1)
+        mean = self.sum / frame_num
+        var = np.maximum(self.sum_square / frame_num - np.square(mean), 0)
+        rms_error = np.sqrt(self.sum_square_error / frame_num)
+        return rms_error / np.maximum(np.sqrt(var), np.finfo(np.float32).tiny)
+
+    def summary(self):
+        """Return a line of the quantization error."""
+        if self.sum is None:
+            return 'no frames'
+        relative_error = self.relative_error
+        return ('max abs error %.3e, relative RMS error %.3e '
+                '(max %.3e at dim %d)' %
+                (self.max_abs_error.max(), relative_error.mean(),
+                 relative_error.max(), int(relative_error.argmax())))
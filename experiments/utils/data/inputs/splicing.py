@@ -4,56 +4,51 @@
 """Splice data."""
 
 import numpy as np
+from numpy.lib.stride_tricks import as_strided
 
 
-def do_splice(inputs, splice=1, batch_size=1):
+def do_splice(inputs, splice=1, batch_size=1, inputs_seq_len=None):
     """Splice input data. This is expected to be used for DNNs or RNNs.
+       The t-th output frame is the concatenation of the `splice` frames
+       preceding the t-th input frame, [t - splice, ..., t - 1], and the first
+       frame is repeated for indices before the head of the sequence.
     Args:
-        inputs: list of size `[B, T, input_size]'
+        inputs: np.ndarray of size `[B, T, input_size]'
         splice: int, frames to splice. Default is 1 frame.
-            ex.) splice == 11
-                [t-5, ..., t-1, t, t+1, ..., t+5] (total 11 frames)
-        batch_size: int,
+        batch_size: int, this is not used and remains for compatibility
+        inputs_seq_len: np.ndarray of length of inputs of size `[B]`. If
+            given, frames beyond the length of each sequence are set to zero.
     Returns:
         data_spliced: np.ndarray of size
             `[B, T, input_size * splice]`
     """
     assert isinstance(inputs, np.ndarray), 'inputs should be np.ndarray.'
-    # assert len(inputs.shape) == 3, 'inputs must be 3 demension.'
 
+    inputs = inputs.astype(np.float32, copy=False)
     if splice == 1:
         return inputs
 
     batch_size, max_time, input_size = inputs.shape
-    input_data_spliced = np.zeros((batch_size, max_time, input_size * splice))
 
-    for i_batch in range(batch_size):
-        for i_time in range(max_time):
-            for i_splice in range(0, splice, 1):
-                #########################
-                # padding left frames
-                #########################
-                if i_time <= splice - 1 and i_splice < splice - i_time:
-                    # copy the first frame to left side
-                    copy_frame = inputs[i_batch][0]
+    # Repeat the first frame `splice` times on the left side
+    inputs_padded = np.concatenate(
+        [np.repeat(inputs[:, :1, :], splice, axis=1), inputs], axis=1)
+    inputs_padded = np.ascontiguousarray(inputs_padded)
 
-                #########################
-                # padding right frames
-                #########################
-                elif max_time - splice <= i_time and i_time + (i_splice - splice) > max_time - 1:
-                    # copy the last frame to right side
-                    copy_frame = inputs[i_batch][-1]
+    # View windows of `splice` frames, `[B, T, splice, input_size]`
+    stride_b, stride_t, stride_d = inputs_padded.strides
+    windows = as_strided(inputs_padded,
+                         shape=(batch_size, max_time, splice, input_size),
+                         strides=(stride_b, stride_t, stride_t, stride_d))
+    # Copy windows because they overlap each other in memory
+    data_spliced = np.ascontiguousarray(windows).reshape(
+        batch_size, max_time, splice * input_size)
 
-                #########################
-                # middle of frames
-                #########################
-                else:
-                    copy_frame = inputs[i_batch][i_time + (i_splice - splice)]
+    if inputs_seq_len is not None:
+        data_spliced[np.arange(max_time)[np.newaxis, :] >=
+                     np.asarray(inputs_seq_len)[:, np.newaxis]] = 0
 
-                input_data_spliced[i_batch][i_time][input_size *
-                                                    i_splice: input_size * (i_splice + 1)] = copy_frame
-
-    return input_data_spliced
+    return data_spliced
 
 
 def test():
@@ -63,6 +58,7 @@ def test():
             sequence[i_batch][i_frame][0] = i_frame
     sequence_spliced = do_splice(sequence, splice=11)
     assert sequence_spliced.shape == (3, 100, 5 * 11)
+    assert sequence_spliced.dtype == np.float32
 
     # for i in range(sequence_spliced.shape[1]):
     #     print(sequence_spliced[0][i])
@@ -0,0 +1,238 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Pack per-utterance target labels into one int32 values array and int64
+   offsets (CSR layout), and gather labels of each mini-batch at once.
+
+   Layout of a label store:
+       save_path/values.npy: concatenated labels of all utterances
+       save_path/offsets.npy: `[num_utt + 1]`, labels of the i-th utterance
+           are values[offsets[i]:offsets[i + 1]]
+       save_path/name.npy: utterance names
+
+   Usage (from the root of this repository):
+       python -m experiments.utils.data.labels.label_store \
+           path_to_label_dir path_to_save
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+from os.path import join, basename, isdir
+import sys
+import numpy as np
+
+from experiments.utils.progressbar import wrap_iterator
+
+VALUES_NAME = 'values.npy'
+OFFSETS_NAME = 'offsets.npy'
+NAMES_NAME = 'name.npy'
+
+# Opened label stores per process
+_STORE_CACHE = {}
+
+
+class LabelStore(object):
+    """Packed target labels.
+    Args:
+        values: np.ndarray of concatenated labels of all utterances
+        offsets: np.ndarray of size `[num_utt + 1]`
+        names: np.ndarray of utterance names of size `[num_utt]`
+    """
+
+    def __init__(self, values, offsets, names):
+        self.values = values
+        self.offsets = offsets
+        self.names = names
+        self.name2row = dict(zip(names.tolist(), range(len(names))))
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.name2row
+
+    def __getitem__(self, name):
+        """
+        Args:
+            name: string, the utterance name
+        Returns:
+            np.ndarray of labels of the utterance
+        """
+        row = self.name2row[name]
+        return self.values[self.offsets[row]:self.offsets[row + 1]]
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + self.offsets.nbytes
+
+    @property
+    def labels_seq_len(self):
+        """np.ndarray of length of labels of each utterance."""
+        return np.diff(self.offsets)
+
+    def rows(self, names):
+        """
+        Args:
+            names: list of utterance names
+        Returns:
+            np.ndarray of row indices of the utterances
+        """
+        return np.array([self.name2row[name] for name in names],
+                        dtype=np.int64)
+
+    def gather(self, rows, padded_value):
+        """Gather and pad labels of a mini-batch.
+        Args:
+            rows: np.ndarray of row indices of size `[B]`
+            padded_value: int, the value used for padding labels. If None,
+                labels are returned as an object array padded with None.
+        Returns:
+            labels: np.ndarray of size `[B, max_seq_len]`
+            labels_seq_len: np.ndarray of size `[B]`
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        starts = self.offsets[rows]
+        labels_seq_len = (self.offsets[rows + 1] - starts).astype(np.int32)
+        max_seq_len = int(labels_seq_len.max()) if len(rows) > 0 else 0
+
+        positions = np.arange(max_seq_len)
+        mask = positions[np.newaxis, :] < labels_seq_len[:, np.newaxis]
+        indices = starts[:, np.newaxis] + positions[np.newaxis, :]
+
+        if padded_value is None:
+            labels = np.full((len(rows), max_seq_len), None, dtype=object)
+        else:
+            labels = np.full((len(rows), max_seq_len), padded_value,
+                             dtype=np.int32)
+        labels[mask] = self.values[indices[mask]]
+        return labels, labels_seq_len
+
+
+def pack_label_list(label_list, names=None):
+    """Pack labels in memory.
+    Args:
+        label_list: list of np.ndarray of labels of each utterance
+        names: list of utterance names. If None, row indices are used.
+    Returns:
+        store: LabelStore
+    """
+    labels_seq_len = np.array([len(label) for label in label_list],
+                              dtype=np.int64)
+    offsets = np.zeros((len(label_list) + 1,), dtype=np.int64)
+    np.cumsum(labels_seq_len, out=offsets[1:])
+    if len(label_list) > 0:
+        values = np.concatenate(
+            [np.asarray(label) for label in label_list]).astype(np.int32)
+    else:
+        values = np.zeros((0,), dtype=np.int32)
+    if names is None:
+        names = np.arange(len(label_list))
+    return LabelStore(values, offsets, np.array(names))
+
+
+def pack_labels(label_paths, save_path, progressbar=False):
+    """Pack per-utterance labels (`.npy` files) into a label store.
+    Args:
+        label_paths: list of paths to target labels
+        save_path: path to the directory to save the store
+        progressbar: if True, visualize progressbar
+    Returns:
+        store: LabelStore
+    """
+    if not isdir(save_path):
+        os.makedirs(save_path)
+
+    label_list, names = [], []
+    for label_path in wrap_iterator(label_paths, progressbar):
+        label = np.load(label_path)
+        if not np.issubdtype(np.asarray(label).dtype, np.integer):
+            raise ValueError('Labels must be integers (%s).' % label_path)
+        label_list.append(label)
+        names.append(basename(label_path).split('.')[0])
+    store = pack_label_list(label_list, names)
+
+    np.save(join(save_path, VALUES_NAME), store.values)
+    np.save(join(save_path, OFFSETS_NAME), store.offsets)
+    np.save(join(save_path, NAMES_NAME), store.names)
+
+    return store
+
+
+def read_label_store(store_path, mmap=True):
+    """
+    Args:
+        store_path: path to the directory made by pack_labels
+        mmap: if True, values are memory-mapped instead of read into RAM
+    Returns:
+        store: LabelStore
+    """
+    values = np.load(join(store_path, VALUES_NAME),
+                     mmap_mode='r' if mmap else None)
+    offsets = np.load(join(store_path, OFFSETS_NAME))
+    names = np.load(join(store_path, NAMES_NAME))
+    return LabelStore(values, offsets, names)
+
+
+def open_store(store_path):
+    """Open a memory-mapped label store once per process.
+    Args:
+        store_path: path to the directory made by pack_labels
+    Returns:
+        store: LabelStore
+    """
+    if store_path not in _STORE_CACHE:
+        _STORE_CACHE[store_path] = read_label_store(store_path)
+    return _STORE_CACHE[store_path]
+
+
+def load_labels(label_paths, padded_value, store_path=None):
+    """Load and pad target labels of each mini-batch.
+    Args:
+        label_paths: list of paths to target labels. Only utterance names are
+            used when store_path is given.
+        padded_value: int, the value used for padding labels
+        store_path: path to the label store. If None, each `.npy` file is
+            loaded.
+    Returns:
+        labels: np.ndarray of size `[B, max_seq_len]`
+        labels_seq_len: np.ndarray of size `[B]`
+    """
+    if store_path is not None:
+        store = open_store(store_path)
+        rows = store.rows(
+            [basename(path).split('.')[0] for path in label_paths])
+        return store.gather(rows, padded_value)
+
+    label_list = list(map(lambda path: np.load(path), label_paths))
+    max_seq_len = max(map(len, label_list))
+    labels = np.array([[padded_value] * max_seq_len] * len(label_paths))
+    labels_seq_len = np.zeros((len(label_paths),), dtype=np.int32)
+    for i_batch, label in enumerate(label_list):
+        labels[i_batch, :len(label)] = label
+        labels_seq_len[i_batch] = len(label)
+    return labels, labels_seq_len
+
+
+def main(label_dir, save_path):
+
+    label_paths = []
+    for dir_path, _, file_names in os.walk(label_dir):
+        for file_name in file_names:
+            if file_name.endswith('.npy'):
+                label_paths.append(join(dir_path, file_name))
+    label_paths = sorted(label_paths)
+
+    print('=> Packing %d utterances...' % len(label_paths))
+    store = pack_labels(label_paths, save_path, progressbar=True)
+    print('%d labels' % len(store.values))
+
+
+if __name__ == '__main__':
+
+    args = sys.argv
+    if len(args) != 3:
+        raise ValueError
+    main(label_dir=args[1], save_path=args[2])
@@ -6,7 +6,6 @@ from __future__ import division
 from __future__ import print_function
 
 import numpy as np
-import tensorflow as tf
 
 
 def list2sparsetensor(labels, padded_value):
@@ -35,6 +34,33 @@ def list2sparsetensor(labels, padded_value):
     return labels_st
 
 
+def dense2sparsetensor(labels, labels_seq_len):
+    """Convert padded labels to sparse tensor without looping over each
+       label.
+    Args:
+        labels: np.ndarray of labels, size of `[B, max_label_len]`
+        labels_seq_len: np.ndarray of length of labels, size of `[B]`
+    Returns:
+        labels_st: A SparseTensor of labels,
+            list of (indices, values, dense_shape)
+    """
+    labels_seq_len = np.asarray(labels_seq_len, dtype=np.int64)
+    batch_size = len(labels_seq_len)
+
+    # Row and column index of each label
+    starts = np.cumsum(labels_seq_len) - labels_seq_len
+    rows = np.repeat(np.arange(batch_size, dtype=np.int64), labels_seq_len)
+    cols = (np.arange(labels_seq_len.sum(), dtype=np.int64) -
+            np.repeat(starts, labels_seq_len))
+
+    max_seq_len = labels_seq_len.max() if batch_size > 0 else 0
+    labels_st = [np.stack([rows, cols], axis=1),
+                 np.asarray(labels)[rows, cols].astype(np.int32),
+                 np.array([batch_size, max_seq_len], dtype=np.int64)]
+
+    return labels_st
+
+
 def sparsetensor2list(labels_st, batch_size):
     """Convert labels from sparse tensor to list.
     Args:
@@ -44,6 +70,10 @@ def sparsetensor2list(labels_st, batch_size):
         labels: list of np.ndarray, size of `[B]`. Each element is a sequence
             of target labels of an input.
     """
+    # NOTE: TensorFlow is imported here so that data loaders can use this
+    # module without it
+    import tensorflow as tf
+
     if isinstance(labels_st, tf.SparseTensorValue):
         # Output of TensorFlow
         indices = labels_st.indices
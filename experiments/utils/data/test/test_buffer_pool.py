@@ -0,0 +1,125 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+from os.path import join
+import shutil
+import sys
+import tempfile
+import unittest
+import numpy as np
+
+sys.path.append('../../../../')
+from experiments.utils.data.dataset_loader.buffer_pool import BufferPool
+from experiments.utils.data.dataset_loader.each_load.ctc_each_load import DatasetBase
+from experiments.utils.data.dataset_loader.sampler import Sampler
+from experiments.utils.data.dataset_loader.padding import PaddingCounter
+
+
+class Dataset(DatasetBase):
+
+    def __init__(self, data_dir, frame_num_dict, num_gpu=1):
+        self.is_training = False
+        self.is_test = False
+        self.batch_size = 4
+        self.num_gpu = num_gpu
+        self.num_stack = 2
+        self.num_skip = 2
+        self.input_size = None
+        self.frame_num_dict = frame_num_dict
+
+        input_names = sorted(frame_num_dict.keys(),
+                             key=lambda x: frame_num_dict[x])
+        self.input_paths = np.array(
+            [join(data_dir, 'inputs', name + '.npy') for name in input_names])
+        self.label_paths = np.array(
+            [join(data_dir, 'labels', name + '.npy') for name in input_names])
+        self.data_num = len(self.input_paths)
+
+        self.sampler = Sampler(self.data_num, self.batch_size, seed=1)
+        self.padding_counter = PaddingCounter()
+
+
+class TestBufferPool(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        rng = np.random.RandomState(0)
+        self.frame_num_dict = {}
+        for dir_name in ['inputs', 'labels']:
+            os.makedirs(join(self.temp_dir, dir_name))
+        for i in range(20):
+            input_name = 'utt%03d' % i
+            frame_num = rng.randint(5, 40)
+            np.save(join(self.temp_dir, 'inputs', input_name + '.npy'),
+                    rng.randn(frame_num, 3).astype(np.float32))
+            np.save(join(self.temp_dir, 'labels', input_name + '.npy'),
+                    rng.randint(0, 10, size=rng.randint(1, 8)))
+            self.frame_num_dict[input_name] = frame_num
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test(self):
+
+        self.check_pool()
+        self.check_loading(num_workers=0, num_gpu=1)
+        self.check_loading(num_workers=0, num_gpu=2)
+        self.check_loading(num_workers=2, num_gpu=1)
+
+    def check_pool(self):
+        pool = BufferPool(frame_bucket=8, max_free=1)
+
+        inputs = pool.acquire(4, 10, 3)
+        self.assertEqual(inputs.shape, (4, 10, 3))
+        self.assertTrue(inputs.flags['C_CONTIGUOUS'])
+        pool.release(inputs)
+
+        # Mini-batches in the same bucket share the buffer
+        inputs_reused = pool.acquire(4, 15, 3)
+        self.assertEqual(inputs_reused.shape, (4, 15, 3))
+        self.assertIs(inputs_reused.base, inputs.base)
+        self.assertEqual(pool.num_allocated, 1)
+
+        # The buffer is not shared while it is in use
+        inputs_new = pool.acquire(4, 16, 3)
+        self.assertIsNot(inputs_new.base, inputs_reused.base)
+        self.assertEqual(pool.num_allocated, 2)
+
+        with self.assertRaises(ValueError):
+            pool.release(np.zeros((4, 16, 3), dtype=np.float32))
+
+    def check_loading(self, num_workers, num_gpu):
+        dataset = Dataset(self.temp_dir, self.frame_num_dict, num_gpu)
+        dataset_pooled = Dataset(self.temp_dir, self.frame_num_dict, num_gpu)
+        dataset.set_prefetch(num_workers, backend='thread')
+        dataset_pooled.set_prefetch(num_workers, backend='thread')
+        dataset_pooled.set_buffer_pool(frame_bucket=4)
+
+        num_epoch = 0
+        for (data, next_epoch_flag), (data_pooled, _) in zip(
+                dataset(), dataset_pooled()):
+            inputs, inputs_pooled = data[0], data_pooled[0]
+            for i_gpu in range(num_gpu):
+                # Padding of reused buffers is zero
+                self.assertTrue(np.array_equal(inputs[i_gpu],
+                                               inputs_pooled[i_gpu]))
+                self.assertTrue(np.array_equal(data[2][i_gpu],
+                                               data_pooled[2][i_gpu]))
+
+            if next_epoch_flag:
+                num_epoch += 1
+                if num_epoch == 3:
+                    break
+
+        # Buffers are reused across epochs
+        self.assertLess(dataset_pooled.buffer_pool.num_allocated,
+                        3 * dataset.data_num // dataset.batch_size)
+
+
+if __name__ == '__main__':
+    unittest.main()
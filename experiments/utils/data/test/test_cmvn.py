@@ -0,0 +1,138 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+from os.path import join
+import shutil
+import sys
+import tempfile
+import unittest
+import numpy as np
+
+sys.path.append('../../../../')
+from experiments.utils.data.inputs.cmvn import compute_cmvn, save_cmvn, read_cmvn, split_cmvn
+from experiments.utils.data.inputs.frame_stacking import stack_frame_batch
+
+
+class TestCMVN(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        rng = np.random.RandomState(0)
+        self.input_paths, self.feat_dict = [], {}
+        for i in range(20):
+            speaker = 'spk%d' % (i % 3)
+            if not os.path.isdir(join(self.temp_dir, speaker)):
+                os.makedirs(join(self.temp_dir, speaker))
+            feat = (rng.randn(rng.randint(1, 50), 12) * (i % 3 + 1) +
+                    i % 3).astype(np.float32)
+            input_path = join(self.temp_dir, speaker, 'utt%03d.npy' % i)
+            np.save(input_path, feat)
+            self.input_paths.append(input_path)
+            self.feat_dict[input_path] = feat
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test(self):
+
+        stats = compute_cmvn(self.input_paths, chunk_size=7)
+
+        # Global statistics
+        feat_all = np.concatenate(
+            [self.feat_dict[path] for path in self.input_paths]).astype(
+                np.float64)
+        self.assertEqual(stats['frame_num'], feat_all.shape[0])
+        self.assertTrue(np.allclose(stats['mean'], feat_all.mean(axis=0)))
+        self.assertTrue(np.allclose(stats['std'], feat_all.std(axis=0)))
+
+        # Per-speaker statistics
+        for i_speaker, speaker in enumerate(stats['speaker']):
+            feat_speaker = np.concatenate(
+                [self.feat_dict[path] for path in self.input_paths
+                 if os.path.basename(os.path.dirname(path)) == speaker])
+            self.assertTrue(np.allclose(stats['speaker_mean'][i_speaker],
+                                        feat_speaker.mean(axis=0)))
+            self.assertTrue(np.allclose(stats['speaker_std'][i_speaker],
+                                        feat_speaker.std(axis=0)))
+
+        save_cmvn(stats, join(self.temp_dir, 'cmvn.npz'))
+        cmvn = read_cmvn(join(self.temp_dir, 'cmvn.npz'))
+
+        self.check_normalize(cmvn, stats, per_speaker=False)
+        self.check_normalize(cmvn, stats, per_speaker=True)
+        self.check_normalize(cmvn, stats, per_speaker=True,
+                             num_stack=3, num_skip=2)
+        self.check_normalize(cmvn, stats, per_speaker=False,
+                             num_stack=3, num_skip=3)
+
+        self.check_unseen_speakers()
+
+    def check_unseen_speakers(self):
+        # Statistics of the "training set" without the speaker spk2
+        train_paths = [path for path in self.input_paths
+                       if os.path.basename(os.path.dirname(path)) != 'spk2']
+        cmvn_path = join(self.temp_dir, 'cmvn_train.npz')
+        save_cmvn(compute_cmvn(train_paths), cmvn_path)
+        cmvn = read_cmvn(cmvn_path)
+        self.assertEqual(cmvn.missing_speakers(self.input_paths), ['spk2'])
+
+        # Global statistics are not silently used for unseen speakers
+        with self.assertRaises(ValueError):
+            cmvn.stats(self.input_paths, per_speaker=True)
+        mean, _ = cmvn.stats(self.input_paths, per_speaker=False)
+        self.assertEqual(mean.shape, (len(self.input_paths), 12))
+
+        # Statistics of a split are computed on the split
+        self.assertEqual(split_cmvn(cmvn_path, train_paths, 'train'),
+                         cmvn_path)
+        eval_cmvn_path = split_cmvn(cmvn_path, self.input_paths, 'eval')
+        self.assertEqual(eval_cmvn_path,
+                         join(self.temp_dir, 'cmvn_train_eval.npz'))
+        eval_stats = compute_cmvn(self.input_paths)
+        mean, inv_std = read_cmvn(eval_cmvn_path).stats(self.input_paths,
+                                                        per_speaker=True)
+        row = list(eval_stats['speaker']).index('spk2')
+        self.assertTrue(np.allclose(mean[2], eval_stats['speaker_mean'][row]))
+        self.assertTrue(np.allclose(1 / inv_std[2],
+                                    eval_stats['speaker_std'][row]))
+
+    def check_normalize(self, cmvn, stats, per_speaker, num_stack=None,
+                        num_skip=None):
+        input_paths = self.input_paths[:8]
+        frame_nums = np.array([self.feat_dict[path].shape[0]
+                               for path in input_paths])
+        inputs = np.zeros((len(input_paths), frame_nums.max(), 12),
+                          dtype=np.float32)
+        inputs_ref = np.zeros_like(inputs)
+        for i_batch, path in enumerate(input_paths):
+            feat = self.feat_dict[path]
+            if per_speaker:
+                row = list(stats['speaker']).index(
+                    os.path.basename(os.path.dirname(path)))
+                mean = stats['speaker_mean'][row]
+                std = stats['speaker_std'][row]
+            else:
+                mean, std = stats['mean'], stats['std']
+            inputs[i_batch, :len(feat)] = feat
+            inputs_ref[i_batch, :len(feat)] = (feat - mean) / std
+
+        inputs_seq_len = frame_nums
+        if num_stack is not None:
+            inputs, inputs_seq_len = stack_frame_batch(
+                inputs, frame_nums, num_stack, num_skip)
+            inputs_ref, _ = stack_frame_batch(
+                inputs_ref, frame_nums, num_stack, num_skip)
+
+        cmvn.normalize(inputs, inputs_seq_len, input_paths,
+                       per_speaker=per_speaker, frame_nums=frame_nums,
+                       num_stack=num_stack, num_skip=num_skip)
+        self.assertTrue(np.allclose(inputs, inputs_ref, atol=1e-5))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+from os.path import join
+import shutil
+import sys
+import tempfile
+import unittest
+import numpy as np
+
+sys.path.append('../../../../')
+from experiments.utils.data.dataset_loader.each_load.ctc_each_load import DatasetBase
+from experiments.utils.data.dataset_loader.sampler import Sampler
+from experiments.utils.data.dataset_loader.padding import PaddingCounter
+
+
+class Dataset(DatasetBase):
+
+    def __init__(self, data_dir, frame_num_dict, batch_size=4, seed=1):
+        self.is_training = False
+        self.is_test = False
+        self.batch_size = batch_size
+        self.num_gpu = 1
+        self.num_stack = None
+        self.num_skip = None
+        self.input_size = None
+        self.frame_num_dict = frame_num_dict
+
+        input_names = sorted(frame_num_dict.keys(),
+                             key=lambda x: frame_num_dict[x])
+        self.input_paths = np.array(
+            [join(data_dir, 'inputs', name + '.npy') for name in input_names])
+        self.label_paths = np.array(
+            [join(data_dir, 'labels', name + '.npy') for name in input_names])
+        self.data_num = len(self.input_paths)
+
+        self.sampler = Sampler(self.data_num, self.batch_size, seed=seed)
+        self.padding_counter = PaddingCounter()
+
+
+class TestCTCEachLoad(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        rng = np.random.RandomState(0)
+        self.frame_num_dict = {}
+        for dir_name in ['inputs', 'labels']:
+            os.makedirs(join(self.temp_dir, dir_name))
+        for i in range(30):
+            input_name = 'utt%03d' % i
+            frame_num = rng.randint(5, 40)
+            np.save(join(self.temp_dir, 'inputs', input_name + '.npy'),
+                    rng.randn(frame_num, 4).astype(np.float32))
+            np.save(join(self.temp_dir, 'labels', input_name + '.npy'),
+                    rng.randint(0, 10, size=rng.randint(1, 8)))
+            self.frame_num_dict[input_name] = frame_num
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test(self):
+
+        self.check_resume(num_workers=0)
+        self.check_resume(num_workers=2)
+
+    def check_resume(self, num_workers):
+        dataset = Dataset(self.temp_dir, self.frame_num_dict)
+        dataset.set_prefetch(num_workers)
+        batches = dataset()
+
+        # Stop in the middle of the second epoch
+        for _ in range(12):
+            next(batches)
+        state = dataset.state_dict()
+        expected = [next(batches) for _ in range(10)]
+
+        dataset_restored = Dataset(self.temp_dir, self.frame_num_dict,
+                                   seed=2)
+        dataset_restored.set_prefetch(num_workers)
+        dataset_restored.load_state_dict(state)
+        batches_restored = dataset_restored()
+        for (data, next_epoch_flag), (data_restored, next_epoch_flag_restored) in zip(
+                expected, batches_restored):
+            self.assertEqual(next_epoch_flag, next_epoch_flag_restored)
+            for x, x_restored in zip(data, data_restored):
+                self.assertTrue(np.array_equal(x, x_restored))
+
+        self.assertEqual(dataset.padding_counter.last_epoch_ratio,
+                         dataset_restored.padding_counter.last_epoch_ratio)
+
+
+if __name__ == '__main__':
+    unittest.main()
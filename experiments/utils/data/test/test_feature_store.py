@@ -0,0 +1,80 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from os.path import join
+import shutil
+import sys
+import tempfile
+import unittest
+import numpy as np
+
+sys.path.append('../../../../')
+from experiments.utils.data.inputs.feature_store import pack_features, FeatureStore, load_inputs
+
+
+class TestFeatureStore(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        rng = np.random.RandomState(0)
+        self.input_paths, self.feat_dict = [], {}
+        for i in range(20):
+            input_name = 'utt%03d' % i
+            feat = rng.randn(rng.randint(1, 50), 12).astype(np.float32)
+            input_path = join(self.temp_dir, input_name + '.npy')
+            np.save(input_path, feat)
+            self.input_paths.append(input_path)
+            self.feat_dict[input_name] = feat
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test(self):
+
+        # single shard
+        self.check_store(shard_size=1024 ** 3)
+
+        # multiple shards
+        self.check_store(shard_size=2000)
+
+        # without a store
+        self.check_load_inputs(self.input_paths[:5])
+        # utterances of the same length are not stacked into a 3-D array
+        same_len_paths = []
+        for i in range(3):
+            input_path = join(self.temp_dir, 'same%d.npy' % i)
+            np.save(input_path, np.full((4, 12), i, dtype=np.float32))
+            same_len_paths.append(input_path)
+        self.check_load_inputs(same_len_paths)
+
+    def check_load_inputs(self, input_paths):
+        input_list = load_inputs(input_paths)
+        self.assertEqual(input_list.dtype, object)
+        self.assertEqual(input_list.shape, (len(input_paths),))
+        for input_path, feat in zip(input_paths, input_list):
+            self.assertTrue(np.array_equal(np.load(input_path), feat))
+
+    def check_store(self, shard_size):
+        store_path = join(self.temp_dir, 'store_%d' % shard_size)
+        index = pack_features(self.input_paths, store_path,
+                              shard_size=shard_size)
+        if shard_size < 1024 ** 3:
+            self.assertTrue(index['shard'].max() > 0)
+
+        store = FeatureStore(store_path)
+        self.assertEqual(len(store), len(self.input_paths))
+        for input_name, feat in self.feat_dict.items():
+            self.assertTrue(np.array_equal(store[input_name], feat))
+            self.assertEqual(store.frame_num_dict[input_name], feat.shape[0])
+
+        input_list = load_inputs(self.input_paths[:5], store_path)
+        for input_path, feat in zip(self.input_paths[:5], input_list):
+            self.assertTrue(np.array_equal(np.load(input_path), feat))
+
+
+if __name__ == '__main__':
+    unittest.main()
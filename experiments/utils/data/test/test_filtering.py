@@ -0,0 +1,106 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+from os.path import join
+import pickle
+import shutil
+import sys
+import tempfile
+import unittest
+import numpy as np
+
+sys.path.append('../../../../')
+from experiments.utils.data.dataset_loader.manifest import make_manifest, load_manifest
+from experiments.utils.data.dataset_loader.filtering import filter_manifest
+
+
+class TestFiltering(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.input_dir = join(self.temp_dir, 'inputs')
+        self.label_dir = join(self.temp_dir, 'labels')
+        os.makedirs(self.input_dir)
+        os.makedirs(self.label_dir)
+
+        # input_name => (frame_num, label)
+        utterances = {
+            'utt-ok': (10, [1, 2, 3]),
+            # 4 labels + 2 repeats need 6 frames
+            'utt-repeat': (5, [1, 1, 2, 2]),
+            'utt-short': (2, [1, 2, 3]),
+            'utt-long': (100, [1, 2]),
+            'utt-many-labels': (30, list(range(20))),
+            'utt-no-label': (10, None),
+        }
+        frame_num_dict = {}
+        for input_name, (frame_num, label) in utterances.items():
+            np.save(join(self.input_dir, input_name + '.npy'),
+                    np.zeros((frame_num, 3), dtype=np.float32))
+            if label is not None:
+                np.save(join(self.label_dir, input_name + '.npy'),
+                        np.array(label, dtype=np.int32))
+            frame_num_dict[input_name] = frame_num
+        with open(join(self.input_dir, 'frame_num.pickle'), 'wb') as f:
+            pickle.dump(frame_num_dict, f)
+        make_manifest(self.input_dir, {'ctc/character': self.label_dir})
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test(self):
+
+        manifest = load_manifest([self.input_dir])
+        name2index = dict((name, i)
+                          for i, name in enumerate(manifest.names.tolist()))
+        self.assertEqual(
+            manifest.ctc_lens('ctc/character')[name2index['utt-repeat']], 6)
+        self.assertEqual(
+            manifest.label_lens('ctc/character')[name2index['utt-no-label']], -1)
+
+        # Only invalid utterances for CTC
+        kept, report = filter_manifest(
+            manifest, ctc_label_keys=['ctc/character'], verbose=False)
+        self.assertEqual(sorted(kept.names.tolist()),
+                         ['utt-long', 'utt-many-labels', 'utt-ok'])
+        self.assertEqual(report['no labels'], 1)
+        self.assertEqual(report['too short for CTC'], 2)
+
+        # Frame skipping makes more utterances too short
+        kept, report = filter_manifest(
+            manifest, ctc_label_keys=['ctc/character'], num_stack=4,
+            num_skip=4, verbose=False)
+        self.assertEqual(sorted(kept.names.tolist()), ['utt-long', 'utt-ok'])
+
+        # Frames are not skipped without frame stacking
+        kept, report = filter_manifest(
+            manifest, ctc_label_keys=['ctc/character'], num_stack=1,
+            num_skip=4, verbose=False)
+        self.assertEqual(sorted(kept.names.tolist()),
+                         ['utt-long', 'utt-many-labels', 'utt-ok'])
+
+        # Length outliers
+        kept, report = filter_manifest(
+            manifest, ctc_label_keys=['ctc/character'],
+            label_keys=['ctc/character'], max_frames=50, max_label_len=10,
+            verbose=False)
+        self.assertEqual(kept.names.tolist(), ['utt-ok'])
+        self.assertEqual(report['too many frames'], 1)
+        self.assertEqual(report['too many labels'], 1)
+        self.assertTrue(np.all(np.diff(kept.frame_nums) >= 0))
+        self.assertEqual(kept.paths([self.input_dir]).tolist(),
+                         [join(self.input_dir, 'utt-ok.npy')])
+
+        # Label checks are skipped without lengths of labels
+        kept, _ = filter_manifest(manifest, ctc_label_keys=['ctc/phone'],
+                                  verbose=False)
+        self.assertEqual(len(kept), len(manifest))
+
+
+if __name__ == '__main__':
+    unittest.main()
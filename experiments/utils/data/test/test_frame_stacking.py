@@ -0,0 +1,55 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import sys
+import unittest
+import numpy as np
+
+sys.path.append('../../../../')
+from experiments.utils.data.inputs.frame_stacking import stack_frame, stack_frame_batch
+
+
+class TestFrameStacking(unittest.TestCase):
+
+    def test(self):
+        # 5 frames of 1 dimension: [1, 2, 3, 4, 5]
+        input_list = [np.arange(1, 6, dtype=np.float64).reshape(5, 1)]
+        input_paths = ['/path/to/utt.npy']
+        frame_num_dict = {'utt': 5}
+
+        stacked = stack_frame(input_list, input_paths, frame_num_dict,
+                              num_stack=3, num_skip=2)[0]
+        self.assertEqual(stacked.dtype, np.float32)
+        self.assertTrue(np.array_equal(
+            stacked, np.array([[1, 2, 3], [3, 4, 5], [5, 0, 0]])))
+
+        stacked = stack_frame(input_list, input_paths, frame_num_dict,
+                              num_stack=2, num_skip=2)[0]
+        self.assertTrue(np.array_equal(
+            stacked, np.array([[1, 2], [3, 4], [5, 0]])))
+
+        # Batched input gives the same frames
+        rng = np.random.RandomState(0)
+        inputs_seq_len = np.array([7, 3, 10])
+        inputs = rng.randn(3, 10, 4)
+        input_list = [inputs[i, :l] for i, l in enumerate(inputs_seq_len)]
+        input_paths = ['utt%d.npy' % i for i in range(3)]
+        frame_num_dict = {'utt%d' % i: l for i, l in enumerate(inputs_seq_len)}
+        stacked_list = stack_frame(input_list, input_paths, frame_num_dict,
+                                   num_stack=3, num_skip=3)
+        stacked_inputs, stacked_inputs_seq_len = stack_frame_batch(
+            inputs, inputs_seq_len, num_stack=3, num_skip=3)
+        self.assertEqual(stacked_inputs.shape, (3, 4, 12))
+        for i, stacked in enumerate(stacked_list):
+            self.assertEqual(stacked_inputs_seq_len[i], len(stacked))
+            self.assertTrue(np.array_equal(
+                stacked_inputs[i, :len(stacked)], stacked))
+            self.assertFalse(stacked_inputs[i, len(stacked):].any())
+
+
+if __name__ == '__main__':
+    unittest.main()
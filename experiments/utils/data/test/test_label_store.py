@@ -0,0 +1,70 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from os.path import join
+import shutil
+import sys
+import tempfile
+import unittest
+import numpy as np
+
+sys.path.append('../../../../')
+from experiments.utils.data.labels.label_store import pack_labels, pack_label_list, read_label_store, load_labels
+
+
+class TestLabelStore(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        rng = np.random.RandomState(0)
+        self.label_paths, self.label_list = [], []
+        for i in range(20):
+            label = rng.randint(0, 30, size=rng.randint(1, 15))
+            label_path = join(self.temp_dir, 'utt%03d.npy' % i)
+            np.save(label_path, label)
+            self.label_paths.append(label_path)
+            self.label_list.append(label)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test(self):
+        store_path = join(self.temp_dir, 'store')
+        pack_labels(self.label_paths, store_path)
+
+        # on disk
+        store = read_label_store(store_path)
+        self.assertEqual(len(store), len(self.label_list))
+        self.assertEqual(store.values.dtype, np.int32)
+        for i, label in enumerate(self.label_list):
+            self.assertTrue(np.array_equal(store['utt%03d' % i], label))
+
+        label_paths = [self.label_paths[i] for i in [3, 0, 17]]
+        for padded_value in [-1, None]:
+            labels, labels_seq_len = load_labels(label_paths, padded_value)
+            labels_store, labels_seq_len_store = load_labels(
+                label_paths, padded_value, store_path)
+            self.assertTrue(np.array_equal(labels_seq_len,
+                                           labels_seq_len_store))
+            self.assertEqual(labels.shape, labels_store.shape)
+            self.assertTrue(np.array_equal(labels.tolist(),
+                                           labels_store.tolist()))
+
+        # in RAM
+        store = pack_label_list(self.label_list)
+        labels, labels_seq_len = store.gather(np.array([5, 2]), 99)
+        self.assertTrue(np.array_equal(labels_seq_len,
+                                       [len(self.label_list[5]),
+                                        len(self.label_list[2])]))
+        for i, x in enumerate([5, 2]):
+            label = self.label_list[x]
+            self.assertTrue(np.array_equal(labels[i, :len(label)], label))
+            self.assertTrue(np.all(labels[i, len(label):] == 99))
+
+
+if __name__ == '__main__':
+    unittest.main()
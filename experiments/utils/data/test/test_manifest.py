@@ -0,0 +1,129 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+from os.path import join, isfile
+import pickle
+import shutil
+import sys
+import tempfile
+import unittest
+import numpy as np
+
+sys.path.append('../../../../')
+from experiments.utils.data.dataset_loader.manifest import make_manifest, load_manifest, label_key, MANIFEST_NAME
+from experiments.utils.data.inputs.feature_store import pack_features
+
+
+class TestManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        rng = np.random.RandomState(0)
+        self.input_dirs, self.label_dirs, self.att_label_dirs = [], [], []
+        self.frame_num_dict, self.label_len_dict = {}, {}
+        for i_split in range(2):
+            input_dir = join(self.temp_dir, 'inputs', 'split%d' % i_split)
+            label_dir = join(self.temp_dir, 'labels', 'ctc',
+                             'split%d' % i_split)
+            att_label_dir = join(self.temp_dir, 'labels', 'attention',
+                                 'split%d' % i_split)
+            frame_num_dict = {}
+            for i in range(15):
+                speaker = 'spk%d' % (i % 3)
+                input_name = '%s-%d-%03d' % (speaker, i_split, i)
+                for dir_path in [input_dir, label_dir, att_label_dir]:
+                    if not os.path.isdir(join(dir_path, speaker)):
+                        os.makedirs(join(dir_path, speaker))
+                frame_num = rng.randint(1, 10)
+                np.save(join(input_dir, speaker, input_name + '.npy'),
+                        rng.randn(frame_num, 3))
+                label_len = rng.randint(1, 5)
+                np.save(join(label_dir, speaker, input_name + '.npy'),
+                        np.zeros((label_len,), dtype=np.int32))
+                # Labels of the same label type with <SOS> & <EOS>
+                np.save(join(att_label_dir, speaker, input_name + '.npy'),
+                        np.zeros((label_len + 2,), dtype=np.int32))
+                frame_num_dict[input_name] = frame_num
+                self.label_len_dict[input_name] = label_len
+            with open(join(input_dir, 'frame_num.pickle'), 'wb') as f:
+                pickle.dump(frame_num_dict, f)
+            self.frame_num_dict.update(frame_num_dict)
+            self.input_dirs.append(input_dir)
+            self.label_dirs.append(label_dir)
+            self.att_label_dirs.append(att_label_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test(self):
+
+        # From frame_num.pickle
+        self.check_manifest(has_labels=False)
+
+        for input_dir, label_dir, att_label_dir in zip(
+                self.input_dirs, self.label_dirs, self.att_label_dirs):
+            store_path = input_dir + '_store'
+            input_paths = []
+            for dir_path, _, file_names in os.walk(input_dir):
+                input_paths += [join(dir_path, file_name)
+                                for file_name in file_names
+                                if file_name.endswith('.npy')]
+            pack_features(sorted(input_paths), store_path)
+            with self.assertRaises(ValueError):
+                make_manifest(input_dir, {'character': label_dir})
+            make_manifest(input_dir,
+                          {label_key('ctc', 'character'): label_dir,
+                           label_key('attention', 'character'): att_label_dir},
+                          store_path=store_path)
+            self.assertTrue(isfile(join(input_dir, MANIFEST_NAME)))
+
+        # From manifest.npz
+        self.check_manifest(has_labels=True)
+
+    def check_manifest(self, has_labels):
+        manifest = load_manifest(
+            self.input_dirs,
+            speaker_fn=lambda input_name: input_name.split('-')[0])
+        self.assertEqual(len(manifest), len(self.frame_num_dict))
+        self.assertEqual(manifest.frame_num_dict, self.frame_num_dict)
+        self.assertTrue(np.all(np.diff(manifest.frame_nums) >= 0))
+
+        input_paths = manifest.paths(self.input_dirs)
+        label_paths = manifest.paths(self.label_dirs)
+        for input_name, input_path, label_path in zip(
+                manifest.names, input_paths, label_paths):
+            self.assertTrue(isfile(input_path))
+            self.assertTrue(isfile(label_path))
+            self.assertEqual(os.path.basename(input_path), input_name + '.npy')
+            self.assertEqual(np.load(input_path).shape[0],
+                             self.frame_num_dict[input_name])
+
+        # All utterances are removed
+        empty = manifest.select(np.array([], dtype=np.int64))
+        self.assertEqual(len(empty), 0)
+        self.assertEqual(len(empty.paths(self.input_dirs)), 0)
+
+        if has_labels:
+            # Lengths of labels of the same label type in different label
+            # directories are kept apart
+            label_lens = [self.label_len_dict[name]
+                          for name in manifest.names]
+            self.assertEqual(
+                manifest.label_lens('ctc/character').tolist(), label_lens)
+            self.assertEqual(
+                manifest.label_lens('attention/character').tolist(),
+                [label_len + 2 for label_len in label_lens])
+            with self.assertRaises(ValueError):
+                manifest.label_lens('character')
+        else:
+            with self.assertRaises(ValueError):
+                manifest.label_lens('ctc/character')
+
+
+if __name__ == '__main__':
+    unittest.main()
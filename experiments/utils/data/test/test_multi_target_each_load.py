@@ -0,0 +1,131 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+from os.path import join
+import shutil
+import sys
+import tempfile
+import unittest
+import numpy as np
+
+sys.path.append('../../../../')
+from experiments.utils.data.dataset_loader.each_load.multi_target_each_load import DatasetBase
+from experiments.utils.data.dataset_loader.sampler import Sampler
+from experiments.utils.data.dataset_loader.padding import PaddingCounter
+
+TARGET_NAMES = ['char', 'att', 'phone']
+
+
+class Dataset(DatasetBase):
+
+    seq_len_names = ('att',)
+
+    def __init__(self, data_dir, frame_num_dict, num_gpu=1, is_test=False):
+        self.is_training = False
+        self.is_test = is_test
+        self.batch_size = 4
+        self.num_gpu = num_gpu
+        self.num_stack = 2
+        self.num_skip = 2
+        self.input_size = None
+        self.frame_num_dict = frame_num_dict
+
+        input_names = sorted(frame_num_dict.keys(),
+                             key=lambda x: frame_num_dict[x])
+        self.input_paths = np.array(
+            [join(data_dir, 'inputs', name + '.npy') for name in input_names])
+        self.target_names = TARGET_NAMES
+        self.label_paths_dict = dict(
+            (target_name, np.array([join(data_dir, target_name, name + '.npy')
+                                    for name in input_names]))
+            for target_name in TARGET_NAMES)
+        self.padded_value_dict = {'att': 9}
+        self.data_num = len(self.input_paths)
+
+        self.sampler = Sampler(self.data_num, self.batch_size, seed=1)
+        self.padding_counter = PaddingCounter()
+
+
+class TestMultiTargetEachLoad(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        rng = np.random.RandomState(0)
+        self.frame_num_dict = {}
+        for dir_name in ['inputs'] + TARGET_NAMES:
+            os.makedirs(join(self.temp_dir, dir_name))
+        for i in range(10):
+            input_name = 'utt%03d' % i
+            frame_num = rng.randint(5, 20)
+            np.save(join(self.temp_dir, 'inputs', input_name + '.npy'),
+                    rng.randn(frame_num, 3).astype(np.float32))
+            for target_name in TARGET_NAMES:
+                np.save(join(self.temp_dir, target_name, input_name + '.npy'),
+                        rng.randint(0, 9, size=rng.randint(1, 6)))
+            self.frame_num_dict[input_name] = frame_num
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test(self):
+
+        self.check_loading(num_gpu=1)
+        self.check_loading(num_gpu=2)
+        self.check_loading(num_gpu=1, sparse_labels=True)
+        self.check_loading(num_gpu=1, is_test=True)
+
+    def check_loading(self, num_gpu, sparse_labels=False, is_test=False):
+        dataset = Dataset(self.temp_dir, self.frame_num_dict,
+                          num_gpu=num_gpu, is_test=is_test)
+        dataset.set_sparse_labels(sparse_labels, target_names=['char'])
+
+        for data, next_epoch_flag in dataset():
+            self.assertEqual(len(data), 7)
+            (inputs, labels_char, labels_att, labels_phone, inputs_seq_len,
+             labels_att_seq_len, input_names) = data
+            self.assertEqual(len(inputs), num_gpu)
+            self.assertEqual(inputs[0].shape[-1], 6)
+
+            for i_gpu in range(num_gpu):
+                for i_batch, input_name in enumerate(input_names[i_gpu]):
+                    for target_name, labels in zip(
+                            TARGET_NAMES,
+                            [labels_char, labels_att, labels_phone]):
+                        label = np.load(join(self.temp_dir, target_name,
+                                             input_name + '.npy'))
+                        if target_name == 'char' and sparse_labels:
+                            indices, values, _ = labels[i_gpu]
+                            label_sparse = values[indices[:, 0] == i_batch]
+                            self.assertTrue(np.array_equal(label_sparse,
+                                                           label))
+                            continue
+                        label_padded = labels[i_gpu][i_batch]
+                        self.assertTrue(np.array_equal(
+                            label_padded[:len(label)], label))
+                        if is_test:
+                            padded_value = None
+                        else:
+                            padded_value = 9 if target_name == 'att' else -1
+                        self.assertTrue(all(
+                            x == padded_value
+                            for x in label_padded[len(label):]))
+                        if target_name == 'att':
+                            self.assertEqual(
+                                labels_att_seq_len[i_gpu][i_batch],
+                                len(label))
+
+                    frame_num = self.frame_num_dict[input_name]
+                    self.assertEqual(inputs_seq_len[i_gpu][i_batch],
+                                     (frame_num + 1) // 2)
+
+            if next_epoch_flag:
+                break
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from os.path import join
+import shutil
+import sys
+import tempfile
+import unittest
+import numpy as np
+
+sys.path.append('../../../../')
+from experiments.utils.data.inputs.packed_inputs import pack_inputs, inputs_nbytes
+from experiments.utils.data.inputs.frame_stacking import stack_frame
+from experiments.utils.data.inputs.feature_store import pack_features
+
+
+class TestPackedInputs(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        rng = np.random.RandomState(0)
+        self.input_paths, self.frame_num_dict = [], {}
+        for i in range(20):
+            input_name = 'utt%03d' % i
+            feat = rng.randn(rng.randint(1, 50), 6)
+            input_path = join(self.temp_dir, input_name + '.npy')
+            np.save(input_path, feat)
+            self.input_paths.append(input_path)
+            self.frame_num_dict[input_name] = feat.shape[0]
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test(self):
+
+        store_path = join(self.temp_dir, 'store')
+        pack_features(self.input_paths, store_path, shard_size=2000)
+
+        for path in [None, store_path]:
+            self.check_pack(num_stack=None, num_skip=None, store_path=path)
+            self.check_pack(num_stack=1, num_skip=1, store_path=path)
+            self.check_pack(num_stack=3, num_skip=2, store_path=path)
+            self.check_pack(num_stack=3, num_skip=3, store_path=path)
+
+    def check_pack(self, num_stack, num_skip, store_path):
+        input_list = [np.load(path) for path in self.input_paths]
+        expected = stack_frame(input_list, self.input_paths,
+                               self.frame_num_dict, num_stack, num_skip)
+
+        packed_inputs = pack_inputs(self.input_paths, self.frame_num_dict,
+                                    num_stack, num_skip,
+                                    store_path=store_path)
+        self.assertEqual(len(packed_inputs), len(self.input_paths))
+        self.assertEqual(packed_inputs.buffer.dtype, np.float32)
+        self.assertTrue(packed_inputs.buffer.flags['C_CONTIGUOUS'])
+        for i, x in enumerate(expected):
+            self.assertTrue(np.array_equal(packed_inputs[i], x))
+        for x, y in zip(packed_inputs[np.array([3, 0, 7])],
+                        expected[[3, 0, 7]]):
+            self.assertTrue(np.array_equal(x, y))
+        self.assertEqual(packed_inputs.buffer.nbytes, inputs_nbytes(expected))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import sys
+import unittest
+import numpy as np
+
+sys.path.append('../../../../')
+from experiments.utils.data.dataset_loader.padding import PaddingCounter
+
+
+class TestPadding(unittest.TestCase):
+
+    def test(self):
+        counter = PaddingCounter()
+
+        counter.update('inputs', np.array([4, 2, 2]))
+        self.assertAlmostEqual(counter.batch_ratio['inputs'], 4 / 12)
+
+        counter.update('inputs', np.array([3, 3]))
+        self.assertAlmostEqual(counter.batch_ratio['inputs'], 0)
+        self.assertAlmostEqual(counter.epoch_ratio['inputs'], 4 / 18)
+        self.assertEqual(counter.num_elements['inputs'], 18)
+        self.assertEqual(counter.num_padding['inputs'], 4)
+
+        counter.next_epoch()
+        self.assertAlmostEqual(counter.last_epoch_ratio['inputs'], 4 / 18)
+        self.assertEqual(counter.epoch_ratio, {})
+
+        counter.update('labels', np.array([1, 3]))
+        self.assertAlmostEqual(counter.epoch_ratio['labels'], 2 / 6)
+        self.assertNotIn('inputs', counter.epoch_ratio)
+
+        # state
+        counter_restored = PaddingCounter()
+        counter_restored.load_state_dict(counter.state_dict())
+        self.assertEqual(counter_restored.epoch_ratio, counter.epoch_ratio)
+        self.assertEqual(counter_restored.last_epoch_ratio,
+                         counter.last_epoch_ratio)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import sys
+import time
+import unittest
+
+sys.path.append('../../../../')
+from experiments.utils.data.dataset_loader.prefetcher import prefetch
+
+
+def _square(x):
+    time.sleep(0.01 * (x % 3))
+    if x < 0:
+        raise ValueError('negative value')
+    return x * x
+
+
+def _tasks(values):
+    for i, x in enumerate(values):
+        yield (x,), i
+
+
+class TestPrefetcher(unittest.TestCase):
+
+    def test(self):
+
+        self.check_order(backend='thread')
+        self.check_order(backend='process')
+
+        self.check_exception()
+        self.check_close()
+
+    def check_order(self, backend):
+        values = list(range(20))
+        results = list(prefetch(_square, _tasks(values), num_workers=3,
+                                queue_size=4, backend=backend))
+        self.assertEqual(results, [(x * x, i) for i, x in enumerate(values)])
+
+    def check_exception(self):
+        batches = prefetch(_square, _tasks([1, 2, -1, 3]), num_workers=2)
+        self.assertEqual(next(batches), (1, 0))
+        self.assertEqual(next(batches), (4, 1))
+        with self.assertRaises(ValueError):
+            next(batches)
+
+    def check_close(self):
+        def endless():
+            i = 0
+            while True:
+                yield (i,), i
+                i += 1
+        batches = prefetch(_square, endless(), num_workers=2, queue_size=2)
+        for _ in range(5):
+            next(batches)
+        batches.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from os.path import join
+import shutil
+import sys
+import tempfile
+import unittest
+import numpy as np
+
+sys.path.append('../../../../')
+from experiments.utils.data.inputs.quantization import Float16Converter
+from experiments.utils.data.inputs.packed_inputs import pack_inputs
+from experiments.utils.data.inputs.feature_store import pack_features, load_inputs
+
+
+class TestQuantization(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        rng = np.random.RandomState(0)
+        self.input_paths, self.frame_num_dict = [], {}
+        for i in range(10):
+            input_name = 'utt%03d' % i
+            # The scale of each dimension is different
+            feat = rng.randn(rng.randint(1, 50), 4) * [1, 10, 100, 1000]
+            input_path = join(self.temp_dir, input_name + '.npy')
+            np.save(input_path, feat)
+            self.input_paths.append(input_path)
+            self.frame_num_dict[input_name] = feat.shape[0]
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test(self):
+
+        self.check_converter()
+        self.check_pack()
+
+    def check_converter(self):
+        converter = Float16Converter()
+        for path in self.input_paths:
+            feat = np.load(path)
+            feat_float16 = converter.convert(feat)
+            self.assertEqual(feat_float16.dtype, np.float16)
+            self.assertTrue(np.allclose(feat_float16, feat, rtol=1e-3))
+
+        # The relative error is about the precision of float16
+        relative_error = converter.relative_error
+        self.assertEqual(relative_error.shape, (4,))
+        self.assertTrue((relative_error < 1e-3).all())
+        self.assertTrue((converter.max_abs_error[:-1] <
+                         converter.max_abs_error[1:]).all())
+
+        with self.assertRaises(ValueError):
+            converter.convert(np.array([[1.0, 1e5]]))
+
+    def check_pack(self):
+        # Feature store
+        store_path = join(self.temp_dir, 'store')
+        index = pack_features(self.input_paths, store_path, shard_size=2000,
+                              float16=True)
+        self.assertEqual(index['relative_error'].shape, (4,))
+        input_list = load_inputs(self.input_paths, store_path)
+        for x, path in zip(input_list, self.input_paths):
+            self.assertEqual(x.dtype, np.float16)
+            self.assertTrue(np.allclose(x, np.load(path), rtol=1e-3))
+
+        # In-memory buffer
+        for path in [None, store_path]:
+            expected = pack_inputs(self.input_paths, self.frame_num_dict,
+                                   num_stack=3, num_skip=2)
+            packed_inputs = pack_inputs(self.input_paths, self.frame_num_dict,
+                                        num_stack=3, num_skip=2,
+                                        store_path=path,
+                                        converter=Float16Converter())
+            self.assertEqual(packed_inputs.buffer.dtype, np.float16)
+            self.assertEqual(packed_inputs.buffer.nbytes,
+                             expected.buffer.nbytes // 2)
+
+            # Upcast when each mini-batch is made
+            inputs = np.zeros((len(self.input_paths), 25, 12),
+                              dtype=np.float32)
+            for i_batch in range(len(self.input_paths)):
+                x = packed_inputs[i_batch]
+                inputs[i_batch, :len(x)] = x
+                self.assertTrue(np.allclose(inputs[i_batch, :len(x)],
+                                            expected[i_batch], rtol=1e-3))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,178 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import sys
+import unittest
+import numpy as np
+
+sys.path.append('../../../../')
+from experiments.utils.data.dataset_loader.sampler import Sampler, skip_frame_nums
+
+
+class TestSampler(unittest.TestCase):
+
+    def test(self):
+
+        # random
+        self.check_sampling(data_num=100, batch_size=16)
+        self.check_sampling(data_num=96, batch_size=16)
+
+        # sort
+        self.check_sampling(data_num=100, batch_size=16, sort_utt=True)
+        self.check_sampling(data_num=100, batch_size=16, sort_utt=True,
+                            shuffle_batch=False)
+        self.check_sampling(data_num=100, batch_size=16, sort_utt=True,
+                            sort_stop_epoch=1)
+
+        # frame budget
+        self.check_frame_budget(sort_utt=True)
+        self.check_frame_budget(sort_utt=True, sort_stop_epoch=1)
+        self.check_frame_budget(sort_utt=False, min_batch_size=4)
+
+        # bucket
+        self.check_bucket(batch_size=16)
+        self.check_bucket(max_frames_per_batch=3000)
+        # The tail of each bucket is smaller than min_batch_size
+        self.check_bucket(batch_size=7, min_batch_size=6)
+
+        self.check_state()
+
+        # frame skipping
+        self.check_skip_frame_nums()
+
+    def check_sampling(self, data_num, batch_size, sort_utt=False,
+                       sort_stop_epoch=None, shuffle_batch=True):
+        sampler = Sampler(data_num, batch_size, sort_utt=sort_utt,
+                          sort_stop_epoch=sort_stop_epoch,
+                          shuffle_batch=shuffle_batch, seed=1)
+
+        for epoch in range(3):
+            is_sorted = sampler.is_sorted
+            batches = []
+            while True:
+                data_indices, next_epoch_flag = sampler.sample()
+                batches.append(data_indices)
+                if next_epoch_flag:
+                    break
+
+            # Each utterance is sampled exactly once per epoch
+            self.assertEqual(len(batches),
+                             int(np.ceil(data_num / batch_size)))
+            all_indices = np.concatenate(batches)
+            self.assertTrue(np.array_equal(np.sort(all_indices),
+                                           np.arange(data_num)))
+
+            if is_sorted:
+                for i_batch, data_indices in enumerate(batches):
+                    expected = np.arange(i_batch * batch_size,
+                                         min((i_batch + 1) * batch_size,
+                                             data_num))
+                    self.assertTrue(np.array_equal(np.sort(data_indices),
+                                                   expected))
+                    if not shuffle_batch:
+                        self.assertTrue(np.array_equal(data_indices,
+                                                       expected))
+            self.assertEqual(sampler.epoch, epoch + 1)
+
+        if sort_stop_epoch is not None:
+            self.assertFalse(sampler.is_sorted)
+
+    def check_frame_budget(self, sort_utt, sort_stop_epoch=None,
+                           min_batch_size=1):
+        rng = np.random.RandomState(0)
+        frame_nums = np.sort(rng.randint(10, 500, size=300))
+        max_frames_per_batch = 3000
+        sampler = Sampler(len(frame_nums), 16, sort_utt=sort_utt,
+                          sort_stop_epoch=sort_stop_epoch, seed=1,
+                          frame_nums=frame_nums,
+                          max_frames_per_batch=max_frames_per_batch,
+                          min_batch_size=min_batch_size)
+
+        for epoch in range(3):
+            batches = []
+            while True:
+                data_indices, next_epoch_flag = sampler.sample()
+                batches.append(data_indices)
+                if next_epoch_flag:
+                    break
+
+            all_indices = np.concatenate(batches)
+            self.assertTrue(np.array_equal(np.sort(all_indices),
+                                           np.arange(len(frame_nums))))
+            for data_indices in batches[:-1]:
+                self.assertTrue(len(data_indices) >= min_batch_size)
+                padded_frames = (len(data_indices) *
+                                 frame_nums[data_indices].max())
+                if len(data_indices) > min_batch_size:
+                    self.assertTrue(padded_frames <= max_frames_per_batch)
+            self.assertTrue(len(batches[-1]) >= min_batch_size)
+
+    def check_bucket(self, batch_size=16, max_frames_per_batch=None,
+                     min_batch_size=1):
+        rng = np.random.RandomState(0)
+        frame_nums = np.sort(rng.randint(10, 500, size=300))
+        sampler = Sampler(len(frame_nums), batch_size, seed=1,
+                          frame_nums=frame_nums,
+                          max_frames_per_batch=max_frames_per_batch,
+                          min_batch_size=min_batch_size, num_buckets=5)
+        sampler_random = Sampler(len(frame_nums), batch_size, seed=1,
+                                 frame_nums=frame_nums,
+                                 max_frames_per_batch=max_frames_per_batch,
+                                 min_batch_size=min_batch_size)
+
+        def padding(sampler):
+            num_padding, batches = 0, []
+            while True:
+                data_indices, next_epoch_flag = sampler.sample()
+                batches.append(data_indices)
+                lengths = frame_nums[data_indices]
+                num_padding += (lengths.max() - lengths).sum()
+                if next_epoch_flag:
+                    return num_padding, batches
+
+        num_padding, batches = padding(sampler)
+        all_indices = np.concatenate(batches)
+        self.assertTrue(np.array_equal(np.sort(all_indices),
+                                       np.arange(len(frame_nums))))
+        self.assertTrue(min(map(len, batches)) >= min_batch_size)
+        if max_frames_per_batch is None:
+            self.assertTrue(
+                max(map(len, batches)) < batch_size + min_batch_size)
+        self.assertTrue(num_padding < padding(sampler_random)[0])
+
+        # The order of mini-batches changes every epoch
+        _, batches_next = padding(sampler)
+        self.assertFalse(np.array_equal(all_indices,
+                                        np.concatenate(batches_next)))
+
+    def check_state(self):
+        sampler = Sampler(1000, 32, seed=3)
+        for _ in range(5):
+            sampler.sample()
+        state = sampler.state_dict()
+        expected = [sampler.sample()[0] for _ in range(50)]
+
+        sampler_restored = Sampler(1000, 32)
+        sampler_restored.load_state_dict(state)
+        for data_indices in expected:
+            self.assertTrue(np.array_equal(sampler_restored.sample()[0],
+                                           data_indices))
+
+    def check_skip_frame_nums(self):
+        frame_nums = [10, 7, 1]
+        self.assertEqual(skip_frame_nums(frame_nums).tolist(), [10, 7, 1])
+        # Frames are skipped only when they are stacked
+        self.assertEqual(skip_frame_nums(frame_nums, 1, 3).tolist(),
+                         [10, 7, 1])
+        self.assertEqual(skip_frame_nums(frame_nums, 3, 3).tolist(),
+                         [4, 3, 1])
+        self.assertEqual(skip_frame_nums(frame_nums, 3, 1).tolist(),
+                         [10, 7, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
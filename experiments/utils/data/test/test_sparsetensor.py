@@ -0,0 +1,43 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import sys
+import unittest
+import numpy as np
+
+sys.path.append('../../../../')
+from experiments.utils.data.sparsetensor import list2sparsetensor
+from experiments.utils.data.sparsetensor import dense2sparsetensor
+
+
+class TestSparseTensor(unittest.TestCase):
+
+    def test(self):
+
+        rng = np.random.RandomState(0)
+        for batch_size in [1, 5, 32]:
+            labels_seq_len = rng.randint(1, 30, size=batch_size)
+            labels = np.full((batch_size, labels_seq_len.max()), -1,
+                             dtype=np.int32)
+            for i_batch, seq_len in enumerate(labels_seq_len):
+                labels[i_batch, :seq_len] = rng.randint(0, 60, size=seq_len)
+
+            indices, values, dense_shape = dense2sparsetensor(
+                labels, labels_seq_len)
+            indices_ref, values_ref, dense_shape_ref = list2sparsetensor(
+                labels, padded_value=-1)
+
+            self.assertTrue(np.array_equal(indices, indices_ref))
+            self.assertTrue(np.array_equal(values, values_ref))
+            self.assertTrue(np.array_equal(dense_shape, dense_shape_ref))
+            self.assertEqual(indices.dtype, np.int64)
+            self.assertEqual(values.dtype, np.int32)
+            self.assertEqual(dense_shape.dtype, np.int64)
+
+
+if __name__ == '__main__':
+    unittest.main()
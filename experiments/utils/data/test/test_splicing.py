@@ -0,0 +1,40 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import sys
+import unittest
+import numpy as np
+
+sys.path.append('../../../../')
+from experiments.utils.data.inputs.splicing import do_splice
+
+
+class TestSplicing(unittest.TestCase):
+
+    def test(self):
+        # 2 utterances of 4 frames of 1 dimension
+        inputs = np.array([[1, 2, 3, 4], [5, 6, 0, 0]],
+                          dtype=np.float64).reshape(2, 4, 1)
+
+        inputs_spliced = do_splice(inputs, splice=3)
+        self.assertEqual(inputs_spliced.dtype, np.float32)
+        self.assertTrue(np.array_equal(
+            inputs_spliced[0],
+            np.array([[1, 1, 1], [1, 1, 1], [1, 1, 2], [1, 2, 3]])))
+
+        # Frames beyond the length are set to zero
+        inputs_spliced = do_splice(inputs, splice=3,
+                                   inputs_seq_len=np.array([4, 2]))
+        self.assertTrue(np.array_equal(
+            inputs_spliced[1],
+            np.array([[5, 5, 5], [5, 5, 5], [0, 0, 0], [0, 0, 0]])))
+
+        self.assertEqual(do_splice(inputs, splice=1).dtype, np.float32)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+from os.path import join
+import shutil
+import sys
+import tempfile
+import unittest
+import numpy as np
+
+sys.path.append('../../../../')
+try:
+    import tensorflow as tf
+    from experiments.utils.data.dataset_loader.tfrecord import write_tfrecords, make_dataset, make_batch_tensors
+except (ImportError, AttributeError):
+    # TensorFlow fails to import with some versions of numpy
+    tf = None
+from experiments.utils.data.dataset_loader.each_load.ctc_each_load import DatasetBase
+from experiments.utils.data.dataset_loader.sampler import Sampler
+from experiments.utils.data.dataset_loader.padding import PaddingCounter
+
+
+class Dataset(DatasetBase):
+
+    def __init__(self, data_dir, frame_num_dict, batch_size=4, seed=1):
+        self.is_training = False
+        self.is_test = False
+        self.batch_size = batch_size
+        self.num_gpu = 1
+        self.num_stack = None
+        self.num_skip = None
+        self.input_size = None
+        self.frame_num_dict = frame_num_dict
+
+        input_names = sorted(frame_num_dict.keys())
+        self.input_paths = np.array(
+            [join(data_dir, 'inputs', name + '.npy') for name in input_names])
+        self.label_paths = np.array(
+            [join(data_dir, 'labels', name + '.npy') for name in input_names])
+        self.data_num = len(self.input_paths)
+
+        self.sampler = Sampler(self.data_num, self.batch_size, seed=seed)
+        self.padding_counter = PaddingCounter()
+
+
+@unittest.skipIf(tf is None, 'TensorFlow is not available.')
+class TestTFRecord(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        rng = np.random.RandomState(0)
+        self.frame_num_dict = {}
+        for dir_name in ['inputs', 'labels']:
+            os.makedirs(join(self.temp_dir, dir_name))
+        for i in range(30):
+            input_name = 'utt%03d' % i
+            frame_num = rng.randint(5, 40)
+            np.save(join(self.temp_dir, 'inputs', input_name + '.npy'),
+                    rng.randn(frame_num, 4).astype(np.float32))
+            np.save(join(self.temp_dir, 'labels', input_name + '.npy'),
+                    rng.randint(0, 10, size=rng.randint(1, 8)))
+            self.frame_num_dict[input_name] = frame_num
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test(self):
+
+        # Mini-batches of one epoch read from each `.npy` file
+        dataset = Dataset(self.temp_dir, self.frame_num_dict)
+        dataset.set_sparse_labels()
+        expected = []
+        for data, next_epoch_flag in dataset():
+            expected.append(data)
+            if next_epoch_flag:
+                break
+        input_names = np.concatenate(
+            [data[-1][0] for data in expected]).tolist()
+
+        # Write utterances in the same order to a single shard
+        tfrecord_dir = join(self.temp_dir, 'tfrecord')
+        data_num, _ = write_tfrecords(
+            [join(self.temp_dir, 'inputs', name + '.npy')
+             for name in input_names],
+            [join(self.temp_dir, 'labels', name + '.npy')
+             for name in input_names],
+            tfrecord_dir, num_shards=1)
+        self.assertEqual(data_num, len(self.frame_num_dict))
+
+        with tf.Graph().as_default():
+            inputs_op, labels_op, inputs_seq_len_op, _ = make_batch_tensors(
+                make_dataset(tfrecord_dir, batch_size=dataset.batch_size,
+                             num_epochs=1),
+                sparse_labels=True)
+            with tf.Session() as sess:
+                for inputs, labels, inputs_seq_len, _ in expected:
+                    inputs_tf, labels_tf, inputs_seq_len_tf = sess.run(
+                        [inputs_op, labels_op, inputs_seq_len_op])
+
+                    self.assertTrue(np.array_equal(inputs_tf, inputs[0]))
+                    self.assertTrue(np.array_equal(inputs_seq_len_tf,
+                                                   inputs_seq_len[0]))
+                    indices, values, dense_shape = labels[0]
+                    self.assertTrue(np.array_equal(labels_tf.indices,
+                                                   indices))
+                    self.assertTrue(np.array_equal(labels_tf.values, values))
+                    self.assertTrue(np.array_equal(labels_tf.dense_shape,
+                                                   dense_shape))
+
+                # All utterances are read once
+                with self.assertRaises(tf.errors.OutOfRangeError):
+                    sess.run(inputs_op)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import sys
+import unittest
+import numpy as np
+
+sys.path.append('../../../../')
+from experiments.utils.data.dataset_loader.tower import partition_towers, gather_towers
+
+
+class TestTower(unittest.TestCase):
+
+    def test(self):
+
+        self.check_partition(batch_size=32, num_tower=4)
+        self.check_partition(batch_size=10, num_tower=3)
+        self.check_partition(batch_size=2, num_tower=4)
+        self.check_gather()
+
+    def check_partition(self, batch_size, num_tower):
+        rng = np.random.RandomState(0)
+        frame_nums = rng.randint(10, 500, size=batch_size)
+        tower_indices = partition_towers(frame_nums, num_tower)
+
+        # Every utterance is assigned to one tower
+        self.assertEqual(len(tower_indices), num_tower)
+        self.assertTrue(np.array_equal(
+            np.sort(np.concatenate(tower_indices)), np.arange(batch_size)))
+
+        # The same numbers of utterances as np.array_split
+        self.assertEqual(
+            [len(indices) for indices in tower_indices],
+            [len(x) for x in np.array_split(frame_nums, num_tower)])
+
+        # Frames are more balanced than np.array_split
+        def imbalance(towers):
+            totals = [int(x.sum()) for x in towers]
+            return max(totals) - min(totals)
+        self.assertLessEqual(
+            imbalance([frame_nums[indices] for indices in tower_indices]),
+            imbalance(np.array_split(frame_nums, num_tower)))
+
+    def check_gather(self):
+        inputs_seq_len = np.array([5, 2, 4, 1])
+        inputs = np.zeros((4, 5, 3), dtype=np.float32)
+        for i, frame_num in enumerate(inputs_seq_len):
+            inputs[i, :frame_num] = i + 1
+        tower_indices = partition_towers(inputs_seq_len, 2)
+
+        # Each tower is padded only to its own max length
+        towers = gather_towers(inputs, tower_indices, inputs_seq_len)
+        for indices, inputs_tower in zip(tower_indices, towers):
+            self.assertEqual(inputs_tower.shape,
+                             (len(indices), inputs_seq_len[indices].max(), 3))
+            for i, x in zip(indices, inputs_tower):
+                self.assertTrue(np.array_equal(x, inputs[i, :len(x)]))
+
+        seq_len_towers = gather_towers(inputs_seq_len, tower_indices)
+        self.assertEqual(sorted(int(x.sum()) for x in seq_len_towers),
+                         [6, 6])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -63,3 +63,19 @@ class Controller(object):
             self.not_improved_epoch = 0
             learning_rate_decayed = learning_rate * self.decay_rate
             return learning_rate_decayed
+
+    def state_dict(self):
+        """Return the state of the controller.
+        Returns:
+            A dictionary of `best_value` and `not_improved_epoch`
+        """
+        return {'best_value': self.best_value,
+                'not_improved_epoch': self.not_improved_epoch}
+
+    def load_state_dict(self, state):
+        """Restore the state of the controller.
+        Args:
+            state: A dictionary returned by state_dict()
+        """
+        self.best_value = state['best_value']
+        self.not_improved_epoch = int(state['not_improved_epoch'])
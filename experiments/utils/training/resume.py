@@ -0,0 +1,55 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Save the state of training (the data iterator, the learning rate
+   controller and the history of loss & LER) beside each checkpoint, so that
+   training can be resumed from the latest checkpoint in the middle of an
+   epoch.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+from os.path import join, basename, isfile
+import pickle
+
+STATE_SUFFIX = '.state'
+LATEST_NAME = 'train_state'
+
+
+def _dump_atomic(obj, path):
+    with open(path + '.tmp', 'wb') as f:
+        pickle.dump(obj, f, protocol=2)
+    os.rename(path + '.tmp', path)
+
+
+def save_train_state(model_dir, checkpoint_path, state):
+    """Save the state of training beside the checkpoint and mark it as the
+       latest one. Call this after the checkpoint is saved.
+    Args:
+        model_dir: path to the directory of the model
+        checkpoint_path: path to the checkpoint returned by
+            tf.train.Saver.save()
+        state: A dictionary of the state of training
+    """
+    _dump_atomic(state, checkpoint_path + STATE_SUFFIX)
+    _dump_atomic(basename(checkpoint_path), join(model_dir, LATEST_NAME))
+
+
+def load_train_state(model_dir):
+    """Load the latest state of training.
+    Args:
+        model_dir: path to the directory of the model
+    Returns:
+        checkpoint_path: path to the checkpoint to restore
+        state: A dictionary of the state of training
+    """
+    if not isfile(join(model_dir, LATEST_NAME)):
+        raise ValueError('There is no state of training in %s.' % model_dir)
+    with open(join(model_dir, LATEST_NAME), 'rb') as f:
+        checkpoint_path = join(model_dir, pickle.load(f))
+    with open(checkpoint_path + STATE_SUFFIX, 'rb') as f:
+        state = pickle.load(f)
+    return checkpoint_path, state
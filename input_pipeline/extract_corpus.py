@@ -0,0 +1,297 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*
+
+"""Extract features of a corpus of wav files on all cores and write them
+   into a feature store directly. Progress is checkpointed per shard, so an
+   interrupted run resumes after the last completed shard.
+
+   Layout of save_path (readable by FeatureStore):
+       shard_00000.npy, ...: `[total_frames, input_size]`
+       shard_00000.index.npz, ...: index and CMVN sums of each shard,
+           written after the shard as the checkpoint
+       index.npz: name, path, shard, offset, frame_num, dim per utterance
+       manifest.npz: the manifest of the split sorted by frame num (see
+           experiments.utils.data.dataset_loader.manifest), which replaces
+           frame_num.pickle
+       cmvn.npz: CMVN statistics of the split (see
+           experiments.utils.data.inputs.cmvn). Utterances are grouped by
+           the name of the directory including each wav file.
+
+   The path of each utterance is the path of its wav file relative to the
+   wav directory (or `speaker_name/input_name.npy` for a list of wav
+   files) with the extension `.npy`, so labels under label directories of
+   the same layout are joined to utterances. Use save_path as the input
+   directory of datasets and read input data with
+   set_feature_store(save_path).
+
+   Features are not normalized per wav; normalize them by cmvn.npz with
+   set_cmvn of datasets.
+
+   Usage (from the root of this repository):
+       python -m input_pipeline.extract_corpus \
+           path_to_wav_dir_or_list path_to_save [num_workers] \
+           [label_kind/label_type=path_to_label_dir ...]
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+from os.path import join, basename, dirname, isdir, isfile, relpath, splitext
+import sys
+import time
+import multiprocessing
+import numpy as np
+
+from experiments.utils.data.inputs.feature_store import INDEX_NAME, SHARD_NAME
+from experiments.utils.data.inputs.cmvn import speaker_name, stats_from_sums, save_cmvn
+from experiments.utils.data.dataset_loader.manifest import save_manifest
+from input_pipeline.feature_extraction import iter_wav2feature
+
+SHARD_INDEX_NAME = 'shard_%05d.index.npz'
+CMVN_NAME = 'cmvn.npz'
+
+# The step between frames in seconds
+FRAME_STEP = 0.01
+
+
+def list_wav_paths(wav_dir_or_list):
+    """
+    Args:
+        wav_dir_or_list: path to a directory of wav files, or a text file of
+            paths to wav files (one path per line)
+    Returns:
+        wav_paths: list of paths to wav files
+    """
+    if isdir(wav_dir_or_list):
+        wav_paths = []
+        for dir_path, _, file_names in os.walk(wav_dir_or_list):
+            for file_name in file_names:
+                if file_name.lower().endswith('.wav'):
+                    wav_paths.append(join(dir_path, file_name))
+        return sorted(wav_paths)
+
+    with open(wav_dir_or_list, 'r') as f:
+        return [line.strip() for line in f if line.strip() != '']
+
+
+def input_path(wav_path, wav_root=None):
+    """
+    Args:
+        wav_path: path to a wav file
+        wav_root: path to the directory of wav files. If None, the wav file
+            is put under the directory of its speaker.
+    Returns:
+        string, the path of input data relative to the input directory
+    """
+    if wav_root is None:
+        wav_path = join(basename(dirname(wav_path)), basename(wav_path))
+    else:
+        wav_path = relpath(wav_path, wav_root)
+    return splitext(wav_path)[0] + '.npy'
+
+
+def extract_corpus(wav_paths, save_path, shard_size=1024 ** 3,
+                   num_workers=1, feature_type='logfbank', feature_dim=40,
+                   energy=True, delta1=True, delta2=True, wav_root=None,
+                   label_dirs=None, verbose=True):
+    """Extract features of wav files into shards. Completed shards are kept
+       and extraction resumes after them.
+    Args:
+        wav_paths: list of paths to wav files
+        save_path: path to the directory to save shards, the index and the
+            manifest
+        shard_size: int, the approximate size of each shard in bytes
+        num_workers: int, the number of processes to extract features
+        feature_type: logfbank (logmelfbank) or fbank or mfcc
+        feature_dim: int, the demension of each feature
+        energy: if True, add energy
+        delta1: if True, add delta features
+        delta2: if True, add delta delta features
+        wav_root: path to the directory of wav files. Paths of utterances
+            are relative to it. If None, `speaker_name/input_name.npy`.
+        label_dirs: A dictionary of paths to the directories of labels
+            whose lengths are added to the manifest
+            key => label key (e.g. ctc/character)
+            value => path to the directory of labels
+        verbose: if True, print progress of each shard
+    Returns:
+        index: A dictionary of the index of utterances
+        stats: A dictionary of CMVN statistics
+    """
+    if len(wav_paths) == 0:
+        raise ValueError('wav_paths must not be empty.')
+    if not isdir(save_path):
+        os.makedirs(save_path)
+
+    names = [basename(wav_path).split('.')[0] for wav_path in wav_paths]
+    if len(set(names)) != len(names):
+        raise ValueError('Names of wav files must be unique.')
+    paths = [input_path(wav_path, wav_root) for wav_path in wav_paths]
+    speakers = [speaker_name(wav_path) for wav_path in wav_paths]
+
+    # Resume after completed shards
+    shard_indices = []
+    while isfile(join(save_path, SHARD_INDEX_NAME % len(shard_indices))):
+        shard_indices.append(
+            _load_shard_index(save_path, len(shard_indices)))
+    num_done = sum(len(x['name']) for x in shard_indices)
+    done_names = np.concatenate(
+        [x['name'] for x in shard_indices]).tolist() if num_done > 0 else []
+    if done_names != names[:num_done]:
+        raise ValueError('%s has shards of other wav files.' % save_path)
+    if verbose and num_done > 0:
+        print('=> Resume after %d shards (%d/%d utterances)' %
+              (len(shard_indices), num_done, len(names)))
+
+    start_time = time.time()
+    audio_hours = 0
+    buffer, buffer_bytes = [], 0
+
+    def write_shard(begin):
+        shard_id = len(shard_indices)
+        shard_indices.append(_write_shard(
+            save_path, shard_id, buffer, names[begin:begin + len(buffer)],
+            paths[begin:begin + len(buffer)],
+            speakers[begin:begin + len(buffer)]))
+        if verbose:
+            elapsed_hours = (time.time() - start_time) / 3600
+            print('=> shard %d: %d utterances (%d/%d), '
+                  '%.1f audio-hours/wall-hour' %
+                  (shard_id, len(buffer), begin + len(buffer), len(names),
+                   audio_hours / max(elapsed_hours, 1e-12)))
+
+    begin = num_done
+    for _, feat in iter_wav2feature(
+            wav_paths[num_done:], feature_type=feature_type,
+            feature_dim=feature_dim, energy=energy, delta1=delta1,
+            delta2=delta2, normalize=False, num_workers=num_workers):
+        if len(buffer) > 0 and feat.shape[1] != buffer[0].shape[1]:
+            raise ValueError('All utterances must have the same dimension.')
+        buffer.append(feat)
+        buffer_bytes += feat.nbytes
+        audio_hours += feat.shape[0] * FRAME_STEP / 3600
+
+        if buffer_bytes >= shard_size:
+            write_shard(begin)
+            begin += len(buffer)
+            buffer, buffer_bytes = [], 0
+
+    if len(buffer) > 0:
+        write_shard(begin)
+
+    # Index and statistics of all shards
+    index = dict((key, np.concatenate([x[key] for x in shard_indices]))
+                 for key in ['name', 'path', 'offset', 'frame_num', 'dim'])
+    index['shard'] = np.concatenate(
+        [np.full((len(x['name']),), shard_id, dtype=np.int32)
+         for shard_id, x in enumerate(shard_indices)])
+    np.savez(join(save_path, INDEX_NAME), **index)
+    save_manifest(save_path, index['name'], index['path'], index['frame_num'],
+                  label_dirs, extra_columns={'shard': index['shard'],
+                                             'offset': index['offset']})
+
+    speaker_list, speaker2row = [], {}
+    frame_nums, sums, sq_sums = [], [], []
+    for x in shard_indices:
+        for j, speaker in enumerate(x['speaker'].tolist()):
+            if speaker not in speaker2row:
+                speaker2row[speaker] = len(speaker_list)
+                speaker_list.append(speaker)
+                frame_nums.append(0)
+                sums.append(0)
+                sq_sums.append(0)
+            row = speaker2row[speaker]
+            frame_nums[row] += int(x['speaker_frame_num'][j])
+            sums[row] = sums[row] + x['speaker_sum'][j]
+            sq_sums[row] = sq_sums[row] + x['speaker_sq_sum'][j]
+    stats = stats_from_sums(speaker_list, frame_nums, sums, sq_sums)
+    save_cmvn(stats, join(save_path, CMVN_NAME))
+
+    return index, stats
+
+
+def _write_shard(save_path, shard_id, feat_list, names, paths, speakers):
+    """Write a shard and then its index as the checkpoint. Both files are
+       renamed from temporary files, so a crash never leaves a broken
+       checkpoint.
+    Returns:
+        shard_index: A dictionary of the index of the shard
+    """
+    shard = np.concatenate(feat_list, axis=0)
+    _save_atomic(join(save_path, SHARD_NAME % shard_id), np.save, shard)
+
+    frame_nums = np.array([len(feat) for feat in feat_list], dtype=np.int32)
+    speaker_list = sorted(set(speakers))
+    speaker2row = dict(zip(speaker_list, range(len(speaker_list))))
+    rows = np.array([speaker2row[speaker] for speaker in speakers])
+    input_size = shard.shape[1]
+    speaker_sum = np.zeros((len(speaker_list), input_size), dtype=np.float64)
+    speaker_sq_sum = np.zeros((len(speaker_list), input_size),
+                              dtype=np.float64)
+    for row, feat in zip(rows, feat_list):
+        feat = feat.astype(np.float64)
+        speaker_sum[row] += feat.sum(axis=0)
+        speaker_sq_sum[row] += np.einsum('td,td->d', feat, feat)
+
+    shard_index = {
+        'name': np.array(names),
+        'path': np.array(paths),
+        'offset': np.cumsum(frame_nums, dtype=np.int64) - frame_nums,
+        'frame_num': frame_nums,
+        'dim': np.full((len(names),), input_size, dtype=np.int32),
+        'speaker': np.array(speaker_list),
+        'speaker_frame_num': np.bincount(
+            rows, weights=frame_nums,
+            minlength=len(speaker_list)).astype(np.int64),
+        'speaker_sum': speaker_sum,
+        'speaker_sq_sum': speaker_sq_sum}
+    _save_atomic(join(save_path, SHARD_INDEX_NAME % shard_id), np.savez,
+                 **shard_index)
+    return shard_index
+
+
+def _load_shard_index(save_path, shard_id):
+    with np.load(join(save_path, SHARD_INDEX_NAME % shard_id)) as f:
+        return dict(f)
+
+
+def _save_atomic(file_path, save_fn, *args, **kwargs):
+    tmp_path = file_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        save_fn(f, *args, **kwargs)
+    os.rename(tmp_path, file_path)
+
+
+def main(wav_dir_or_list, save_path, num_workers, label_dirs):
+
+    wav_paths = list_wav_paths(wav_dir_or_list)
+    print('=> Extracting features of %d wav files with %d workers...' %
+          (len(wav_paths), num_workers))
+    start_time = time.time()
+    index, stats = extract_corpus(
+        wav_paths, save_path, num_workers=num_workers,
+        wav_root=wav_dir_or_list if isdir(wav_dir_or_list) else None,
+        label_dirs=label_dirs)
+    audio_hours = int(index['frame_num'].sum()) * FRAME_STEP / 3600
+    print('%d shards, %d frames (%.2f audio-hours), %d speakers' %
+          (int(index['shard'].max()) + 1, int(index['frame_num'].sum()),
+           audio_hours, len(stats['speaker'])))
+    print('Elapsed time: %.1f sec' % (time.time() - start_time))
+
+
+if __name__ == '__main__':
+
+    args = sys.argv
+    if len(args) < 3:
+        raise ValueError
+    num_workers, label_dirs = multiprocessing.cpu_count(), {}
+    for arg in args[3:]:
+        if '=' in arg:
+            key, value = arg.split('=', 1)
+            label_dirs[key] = value
+        else:
+            num_workers = int(arg)
+    main(wav_dir_or_list=args[1], save_path=args[2],
+         num_workers=num_workers, label_dirs=label_dirs)
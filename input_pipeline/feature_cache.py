@@ -0,0 +1,287 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*
+
+"""Cache features of wav files on disk. Entries are keyed by the hash of
+   the audio and the feature configuration, so that later epochs and other
+   experiments with the same configuration reuse them.
+
+   Layout of cache_dir:
+       cache_dir/ab/abcdef....npy: features of size `[T, input_size]`
+
+   The least recently used entries are evicted when the total size exceeds
+   the cap. Each entry is written to a temporary file and renamed, so
+   processes can share cache_dir. A FeatureCache sent to a worker process
+   is pickled as its configuration, and the worker reuses its own cache of
+   the configuration (see open_cache) across mini-batches.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import hashlib
+import io
+import os
+from os.path import join, isdir
+import uuid
+import wave
+import numpy as np
+
+from input_pipeline.feature_engine import get_engine
+from input_pipeline.feature_extraction import _extract
+
+# Entries are evicted down to this ratio of the cap at once
+LOW_WATERMARK = 0.9
+
+# Opened feature caches per process
+_CACHES = {}
+
+
+class FeatureCache(object):
+    """On-disk LRU cache of features of wav files.
+    Args:
+        cache_dir: path to the directory of cached features
+        max_bytes: int, the approximate cap of the total size of entries
+        feature_type: logfbank (logmelfbank) or fbank or mfcc
+        feature_dim: int, the demension of each feature
+        energy: if True, add energy
+        delta1: if True, add delta features
+        delta2: if True, add delta delta features
+        normalize: if True, normalize features per wav
+    """
+
+    def __init__(self, cache_dir, max_bytes=10 * 1024 ** 3,
+                 feature_type='logfbank', feature_dim=40, energy=True,
+                 delta1=True, delta2=True, normalize=True):
+        if feature_type not in ['logmelfbank', 'logfbank', 'fbank', 'mfcc']:
+            raise ValueError(
+                'feature_type is "logmelfbank" or "logfbank" or "fbank" or "mfcc".')
+        if delta2 and not delta1:
+            delta1 = True
+
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.config = (feature_type, feature_dim, energy, delta1, delta2,
+                       normalize)
+
+        # (path, size, mtime) => hash of the audio, so that the audio is not
+        # read again on hits of later epochs
+        self._audio_hashes = {}
+        # The estimated total size of entries. None means unknown.
+        self._usage = None
+
+        self.hit_num = 0
+        self.miss_num = 0
+        # The number of wav files read to compute keys
+        self.hash_num = 0
+
+    def __reduce__(self):
+        # Hashes of audio and the usage are per-process state, so worker
+        # processes open their own cache instead of a copy of them
+        return (open_cache, (self.cache_dir, self.max_bytes, self.config))
+
+    def key(self, wav_path):
+        """
+        Args:
+            wav_path: path to a wav file
+        Returns:
+            string, the key of the features of the wav file
+        """
+        return self._key(self._audio_hash(wav_path)[0])
+
+    def _key(self, audio_hash):
+        return hashlib.sha1(
+            (audio_hash + repr(self.config)).encode('utf-8')).hexdigest()
+
+    def _audio_hash(self, wav_path):
+        """
+        Args:
+            wav_path: path to a wav file
+        Returns:
+            audio_hash: string, the hash of the wav file
+            audio: bytes of the wav file if it was read to compute the hash,
+                otherwise None
+        """
+        stat = os.stat(wav_path)
+        file_id = (wav_path, stat.st_size, stat.st_mtime)
+        if file_id in self._audio_hashes:
+            return self._audio_hashes[file_id], None
+        with open(wav_path, 'rb') as f:
+            audio = f.read()
+        self._audio_hashes[file_id] = hashlib.sha1(audio).hexdigest()
+        return self._audio_hashes[file_id], audio
+
+    def _entry_path(self, key):
+        return join(self.cache_dir, key[:2], key + '.npy')
+
+    def __getitem__(self, wav_path):
+        """Read features out of the cache, or extract and cache them.
+        Args:
+            wav_path: path to a wav file
+        Returns:
+            feat: np.ndarray of float32 of size `[T, input_size]`
+        """
+        counts = [0, 0, 0]
+        feat = self._get(wav_path, counts)
+        self.add_counts(counts)
+        return feat
+
+    def _get(self, wav_path, counts):
+        """
+        Args:
+            wav_path: path to a wav file
+            counts: list of the numbers of hits, misses and hashed wav files
+                to update
+        Returns:
+            feat: np.ndarray of float32 of size `[T, input_size]`
+        """
+        audio_hash, audio = self._audio_hash(wav_path)
+        if audio is not None:
+            counts[2] += 1
+        entry_path = self._entry_path(self._key(audio_hash))
+        try:
+            feat = np.load(entry_path)
+            # Mark as recently used
+            os.utime(entry_path, None)
+            counts[0] += 1
+            return feat
+        except (IOError, OSError, ValueError):
+            # Missing, or evicted by another process
+            pass
+
+        counts[1] += 1
+        if audio is not None:
+            # Extract from the audio read for the hash instead of reading
+            # the wav file again
+            feat = _extract(io.BytesIO(audio), *self.config)
+        else:
+            feat = _extract(wav_path, *self.config)
+        self._write(entry_path, feat)
+        return feat
+
+    def load(self, input_paths):
+        """Load input data of each mini-batch.
+        Args:
+            input_paths: list of paths to wav files
+        Returns:
+            input_list: np.ndarray of input data of size `[B]`
+            counts: list of the numbers of hits, misses and hashed wav files
+                of the mini-batch. Add them to the cache the dataset holds by
+                add_counts, since this may run in a worker process.
+        """
+        input_list = np.empty((len(input_paths),), dtype=object)
+        counts = [0, 0, 0]
+        for i, wav_path in enumerate(input_paths):
+            input_list[i] = self._get(wav_path, counts)
+        return input_list, counts
+
+    def add_counts(self, counts):
+        """
+        Args:
+            counts: list of the numbers of hits, misses and hashed wav files
+        """
+        hit_num, miss_num, hash_num = counts
+        self.hit_num += hit_num
+        self.miss_num += miss_num
+        self.hash_num += hash_num
+
+    def _write(self, entry_path, feat):
+        entry_dir = os.path.dirname(entry_path)
+        if not isdir(entry_dir):
+            try:
+                os.makedirs(entry_dir)
+            except OSError:
+                # Made by another process
+                if not isdir(entry_dir):
+                    raise
+
+        # Rename a unique temporary file, so readers never see a partial
+        # entry even if processes write the same entry at once
+        tmp_path = '%s.%d.%s.tmp' % (entry_path, os.getpid(),
+                                     uuid.uuid4().hex)
+        with open(tmp_path, 'wb') as f:
+            np.save(f, feat)
+        os.rename(tmp_path, entry_path)
+
+        if self._usage is None:
+            self._usage = self.usage()
+        else:
+            self._usage += os.path.getsize(entry_path)
+        if self._usage > self.max_bytes:
+            self.evict(int(self.max_bytes * LOW_WATERMARK))
+
+    def _entries(self):
+        """
+        Returns:
+            list of `(mtime, size, path)` of entries
+        """
+        entries = []
+        if not isdir(self.cache_dir):
+            return entries
+        for dir_path, _, file_names in os.walk(self.cache_dir):
+            for file_name in file_names:
+                if not file_name.endswith('.npy'):
+                    continue
+                path = join(dir_path, file_name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def usage(self):
+        """Return the total size of entries in bytes."""
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self, max_bytes):
+        """Remove the least recently used entries until the total size is
+           at most max_bytes.
+        Args:
+            max_bytes: int, the total size to keep
+        """
+        entries = sorted(self._entries())
+        usage = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if usage <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                # Removed by another process
+                pass
+            usage -= size
+        self._usage = usage
+
+
+def open_cache(cache_dir, max_bytes, config):
+    """Open a feature cache once per process.
+    Args:
+        cache_dir: path to the cache directory
+        max_bytes: int, the cap of the total size of entries
+        config: tuple of feature_type, feature_dim, energy, delta1, delta2
+            and normalize
+    Returns:
+        cache: FeatureCache
+    """
+    key = (cache_dir, max_bytes, tuple(config))
+    if key not in _CACHES:
+        _CACHES[key] = FeatureCache(cache_dir, max_bytes, *config)
+    return _CACHES[key]
+
+
+def wav_frame_num(wav_path):
+    """Compute the number of frames of a wav file from its header without
+       reading the audio.
+    Args:
+        wav_path: path to a wav file
+    Returns:
+        int, the number of frames
+    """
+    wav = wave.open(wav_path, 'rb')
+    try:
+        samplerate, num_samples = wav.getframerate(), wav.getnframes()
+    finally:
+        wav.close()
+    return get_engine(samplerate=samplerate).num_frames(num_samples)
+
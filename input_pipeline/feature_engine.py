@@ -0,0 +1,294 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*
+
+"""Mel filterbank & MFCC features in NumPy. The window, the mel filterbank
+   matrix and the DCT matrix are computed once per configuration, and audio
+   is framed by strides instead of gathering indices. The defaults reproduce
+   python_speech_features 0.5 (pinned in requirements.txt) and 0.6, which
+   compute the same features.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import decimal
+import math
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+EPS = np.finfo(float).eps
+
+# (samplerate, nfilt, nfft, ...) => FeatureEngine
+_ENGINES = {}
+
+
+def get_engine(samplerate=16000, nfilt=26, nfft=512, winlen=0.025,
+               winstep=0.01, lowfreq=0, highfreq=None, preemph=0.97,
+               window='rectangular'):
+    """Return the cached engine of a configuration.
+    Args:
+        see FeatureEngine
+    Returns:
+        engine: FeatureEngine
+    """
+    key = (samplerate, nfilt, nfft, winlen, winstep, lowfreq, highfreq,
+           preemph, window)
+    if key not in _ENGINES:
+        _ENGINES[key] = FeatureEngine(*key)
+    return _ENGINES[key]
+
+
+class FeatureEngine(object):
+    """Compute mel filterbank & MFCC features.
+    Args:
+        samplerate: int, the sample rate of audio
+        nfilt: int, the number of mel filters
+        nfft: int, the FFT size
+        winlen: float, the length of each frame in seconds
+        winstep: float, the step between frames in seconds
+        lowfreq: float, the lowest band edge of mel filters in Hz
+        highfreq: float, the highest band edge of mel filters in Hz.
+            Default is samplerate / 2.
+        preemph: float, the coefficient of the preemphasis filter
+        window: rectangular or hamming
+    """
+
+    def __init__(self, samplerate=16000, nfilt=26, nfft=512, winlen=0.025,
+                 winstep=0.01, lowfreq=0, highfreq=None, preemph=0.97,
+                 window='rectangular'):
+        if window not in ['rectangular', 'hamming']:
+            raise ValueError('window is "rectangular" or "hamming".')
+
+        self.samplerate = samplerate
+        self.nfilt = nfilt
+        self.nfft = nfft
+        self.preemph = preemph
+        self.frame_len = _round_half_up(winlen * samplerate)
+        self.frame_step = _round_half_up(winstep * samplerate)
+
+        if window == 'rectangular':
+            self.window = None
+        else:
+            self.window = np.hamming(self.frame_len)
+        self.mel_matrix = _mel_matrix(
+            nfilt, nfft, samplerate, lowfreq, highfreq or samplerate / 2)
+
+        # (numcep, ceplifter) => DCT matrix with the lifter
+        self._dct_cache = {}
+
+    def num_frames(self, num_samples):
+        """
+        Args:
+            num_samples: int, the number of samples of a signal
+        Returns:
+            int, the number of frames of the signal
+        """
+        if num_samples <= self.frame_len:
+            return 1
+        return 1 + int(math.ceil(
+            (num_samples - self.frame_len) / self.frame_step))
+
+    def frame(self, signal):
+        """Split a signal into overlapping frames by strides. The tail is
+           padded with 0 to fill the last frame.
+        Args:
+            signal: np.ndarray of size `[num_samples]`
+        Returns:
+            frames: np.ndarray of size `[num_frames, frame_len]`
+        """
+        num_samples = len(signal)
+        num_frames = self.num_frames(num_samples)
+        pad_len = (num_frames - 1) * self.frame_step + self.frame_len
+        signal = np.concatenate(
+            [signal, np.zeros((pad_len - num_samples,), dtype=signal.dtype)])
+        stride = signal.strides[0]
+        return as_strided(signal, shape=(num_frames, self.frame_len),
+                          strides=(self.frame_step * stride, stride),
+                          writeable=False)
+
+    def preemphasis(self, signal, prev_sample=None):
+        """
+        Args:
+            signal: np.ndarray of size `[num_samples]`
+            prev_sample: float, the sample just before signal when signal
+                is a chunk of a stream. If None, signal is the head.
+        Returns:
+            np.ndarray of float64 of size `[num_samples]`
+        """
+        signal = np.asarray(signal, dtype=np.float64)
+        if prev_sample is None:
+            return np.append(signal[:1],
+                             signal[1:] - self.preemph * signal[:-1])
+        return signal - self.preemph * np.append(prev_sample, signal[:-1])
+
+    def power_spectrum(self, signals):
+        """Compute power spectra. Frames longer than nfft are truncated.
+        Args:
+            signals: list of np.ndarray of size `[num_samples]`
+        Returns:
+            pspec_list: list of np.ndarray of size
+                `[num_frames, nfft // 2 + 1]`
+        """
+        frames_list = [self.frame(self.preemphasis(signal))
+                       for signal in signals]
+        frame_nums = [len(frames) for frames in frames_list]
+
+        # FFT of frames of all signals at once
+        pspec = self.frame_power_spectrum(
+            np.concatenate(frames_list, axis=0))
+        return np.split(pspec, np.cumsum(frame_nums)[:-1], axis=0)
+
+    def frame_power_spectrum(self, frames):
+        """
+        Args:
+            frames: np.ndarray of preemphasized frames of size
+                `[num_frames, frame_len]`
+        Returns:
+            pspec: np.ndarray of size `[num_frames, nfft // 2 + 1]`
+        """
+        if self.window is not None:
+            frames = frames * self.window
+        return np.square(np.abs(np.fft.rfft(frames, self.nfft))) / self.nfft
+
+    def fbank_from_spectrum(self, pspec):
+        """
+        Args:
+            pspec: np.ndarray of size `[num_frames, nfft // 2 + 1]`
+        Returns:
+            feat: np.ndarray of size `[num_frames, nfilt]`
+            energy: np.ndarray of size `[num_frames]`
+        """
+        energy = pspec.sum(axis=1)
+        energy[energy == 0] = EPS
+        feat = np.dot(pspec, self.mel_matrix)
+        feat[feat == 0] = EPS
+        return feat, energy
+
+    def fbank(self, signal):
+        """Compute mel filterbank energies.
+        Args:
+            signal: np.ndarray of size `[num_samples]`, or list of them
+        Returns:
+            feat: np.ndarray of size `[num_frames, nfilt]`
+            energy: np.ndarray of the energy of each frame of size
+                `[num_frames]`
+            (lists of them if signal is a list)
+        """
+        is_batch = isinstance(signal, list)
+        signals = signal if is_batch else [signal]
+        feat_list, energy_list = [], []
+        for pspec in self.power_spectrum(signals):
+            feat, energy = self.fbank_from_spectrum(pspec)
+            feat_list.append(feat)
+            energy_list.append(energy)
+        if is_batch:
+            return feat_list, energy_list
+        return feat_list[0], energy_list[0]
+
+    def logfbank(self, signal):
+        """Compute log mel filterbank energies.
+        Args:
+            signal: np.ndarray of size `[num_samples]`, or list of them
+        Returns:
+            feat: np.ndarray of size `[num_frames, nfilt]`
+            energy: np.ndarray of the energy of each frame of size
+                `[num_frames]`
+            (lists of them if signal is a list)
+        """
+        feat, energy = self.fbank(signal)
+        if isinstance(feat, list):
+            return [np.log(x) for x in feat], energy
+        return np.log(feat), energy
+
+    def mfcc(self, signal, numcep=13, ceplifter=22, append_energy=True):
+        """Compute MFCC features. Like python_speech_features, at most nfilt
+           coefficients are returned.
+        Args:
+            signal: np.ndarray of size `[num_samples]`, or list of them
+            numcep: int, the number of cepstral coefficients
+            ceplifter: int, the lifter of cepstral coefficients. 0 is none.
+            append_energy: if True, the 0th coefficient is replaced with the
+                log energy of each frame
+        Returns:
+            feat: np.ndarray of size `[num_frames, min(numcep, nfilt)]`
+            energy: np.ndarray of the energy of each frame of size
+                `[num_frames]`
+            (lists of them if signal is a list)
+        """
+        logfbank_feat, energy = self.logfbank(signal)
+        is_batch = isinstance(logfbank_feat, list)
+        if not is_batch:
+            logfbank_feat, energy = [logfbank_feat], [energy]
+        feat_list = [self.cepstrum(x, e, numcep, ceplifter, append_energy)
+                     for x, e in zip(logfbank_feat, energy)]
+        if is_batch:
+            return feat_list, energy
+        return feat_list[0], energy[0]
+
+    def cepstrum(self, logfbank_feat, energy, numcep=13, ceplifter=22,
+                 append_energy=True):
+        """Compute MFCC features from log mel filterbank energies.
+        Args:
+            logfbank_feat: np.ndarray of size `[num_frames, nfilt]`
+            energy: np.ndarray of size `[num_frames]`
+            numcep, ceplifter, append_energy: see mfcc
+        Returns:
+            feat: np.ndarray of size `[num_frames, min(numcep, nfilt)]`
+        """
+        key = (numcep, ceplifter)
+        if key not in self._dct_cache:
+            dct_matrix = _dct_matrix(self.nfilt)[:numcep].T
+            n = np.arange(dct_matrix.shape[1])
+            if ceplifter > 0:
+                lift = 1 + (ceplifter / 2) * np.sin(np.pi * n / ceplifter)
+            else:
+                lift = np.ones((len(n),))
+            # Fold the lifter into the DCT matrix
+            self._dct_cache[key] = dct_matrix * lift
+
+        feat = np.dot(logfbank_feat, self._dct_cache[key])
+        if append_energy:
+            feat[:, 0] = np.log(energy)
+        return feat
+
+
+def _round_half_up(number):
+    return int(decimal.Decimal(number).quantize(
+        decimal.Decimal('1'), rounding=decimal.ROUND_HALF_UP))
+
+
+def _hz2mel(hz):
+    return 2595 * np.log10(1 + hz / 700.)
+
+
+def _mel2hz(mel):
+    return 700 * (10 ** (mel / 2595.0) - 1)
+
+
+def _mel_matrix(nfilt, nfft, samplerate, lowfreq, highfreq):
+    """Make triangular mel filters.
+    Returns:
+        np.ndarray of size `[nfft // 2 + 1, nfilt]`
+    """
+    mel_points = np.linspace(_hz2mel(lowfreq), _hz2mel(highfreq), nfilt + 2)
+    bins = np.floor((nfft + 1) * _mel2hz(mel_points) / samplerate)
+    matrix = np.zeros((nfft // 2 + 1, nfilt))
+    for j in range(nfilt):
+        for i in range(int(bins[j]), int(bins[j + 1])):
+            matrix[i, j] = (i - bins[j]) / (bins[j + 1] - bins[j])
+        for i in range(int(bins[j + 1]), int(bins[j + 2])):
+            matrix[i, j] = (bins[j + 2] - i) / (bins[j + 2] - bins[j + 1])
+    return matrix
+
+
+def _dct_matrix(size):
+    """Make the orthonormal DCT-II matrix.
+    Returns:
+        np.ndarray of size `[size, size]`
+    """
+    n = np.arange(size)
+    matrix = np.cos(np.pi * n[:, np.newaxis] * (2 * n + 1) / (2 * size))
+    matrix *= np.sqrt(2 / size)
+    matrix[0] /= np.sqrt(2)
+    return matrix
@@ -5,109 +5,225 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import scipy.io.wavfile
-from python_speech_features import mfcc, fbank
+
+from input_pipeline.feature_engine import get_engine
 
 
 def wav2feature(wav_paths, feature_type='logfbank', feature_dim=40,
-                energy=True, delta1=True, delta2=True):
-    """Read wav file & convert to MFCC or log mel filterbank features.
+                energy=True, delta1=True, delta2=True, ragged=False,
+                num_workers=1):
+    """Read wav files & convert to MFCC or log mel filterbank features.
+    Args:
+        wav_paths: list of the path to a wav file
+        feature_type: logfbank (logmelfbank) or fbank or mfcc
+        feature_dim: int, the demension of each feature
+        energy: if True, add energy
+        delta1: if True, add delta features
+        delta2: if True, add delta delta features
+        ragged: if True, return a list of features of each utterance instead
+            of a padded batch
+        num_workers: int, the number of processes to extract features
+    Returns:
+        inputs: A numpy array of float32 of size `[B, T, input_size]` padded
+            with 0, or a list of numpy arrays of size `[T_i, input_size]` if
+            ragged is True
+        inputs_seq_len: A numpy array of int32 of size `[B]`
+    """
+    if not isinstance(wav_paths, list):
+        raise ValueError('wav_paths must be a list.')
+
+    feat_list = [None] * len(wav_paths)
+    for i, feat in iter_wav2feature(
+            wav_paths, feature_type=feature_type, feature_dim=feature_dim,
+            energy=energy, delta1=delta1, delta2=delta2,
+            num_workers=num_workers):
+        feat_list[i] = feat
+    inputs_seq_len = np.array([len(feat) for feat in feat_list],
+                              dtype=np.int32)
+    if ragged:
+        return feat_list, inputs_seq_len
+
+    max_time = inputs_seq_len.max() if len(feat_list) > 0 else 0
+    input_size = feat_list[0].shape[-1] if len(feat_list) > 0 else 0
+    inputs = np.zeros((len(feat_list), max_time, input_size),
+                      dtype=np.float32)
+    for i, feat in enumerate(feat_list):
+        inputs[i, :len(feat)] = feat
+    return inputs, inputs_seq_len
+
+
+def iter_wav2feature(wav_paths, feature_type='logfbank', feature_dim=40,
+                     energy=True, delta1=True, delta2=True, normalize=True,
+                     num_workers=1, queue_size=None):
+    """Extract features of wav files one by one, so that features of a
+       large list of files never sit in memory at once.
     Args:
         wav_paths: list of the path to a wav file
-        batch_size: int, the batch size
-        feature_type: logfbank or fbank or mfcc
+        feature_type: logfbank (logmelfbank) or fbank or mfcc
         feature_dim: int, the demension of each feature
         energy: if True, add energy
         delta1: if True, add delta features
         delta2: if True, add delta delta features
+        normalize: if True, normalize features by the mean and standard
+            deviation of each wav
+        num_workers: int, the number of processes to extract features
+        queue_size: int, the maximum number of utterances in flight.
+            Default is twice num_workers.
     Returns:
-        inputs: A tensor of size `[B, T, input_size]`
-        inputs_seq_len: A tensor of size `[B]`
+        A generator of `(index, feat)` in the order of wav_paths, where feat
+            is a numpy array of float32 of size `[T, input_size]`
     """
     if feature_type not in ['logmelfbank', 'logfbank', 'fbank', 'mfcc']:
         raise ValueError(
             'feature_type is "logmelfbank" or "logfbank" or "fbank" or "mfcc".')
-    if not isinstance(wav_paths, list):
-        raise ValueError('wav_paths must be a list.')
     if delta2 and not delta1:
         delta1 = True
 
-    batch_size = len(wav_paths)
-    max_time = 0
-    for wav_path in wav_paths:
-        # Read wav file
-        fs, audio = scipy.io.wavfile.read(wav_path)
-        if len(audio) > max_time:
-            max_time = len(audio)
-    input_size = feature_dim
+    def task_generator():
+        for i, wav_path in enumerate(wav_paths):
+            yield ((wav_path, feature_type, feature_dim, energy,
+                    delta1, delta2, normalize), i)
+
+    if num_workers <= 1:
+        for args, i in task_generator():
+            yield i, _extract(*args)
+    else:
+        if queue_size is None:
+            queue_size = num_workers * 2
+        for feat, i in _ordered_map(_extract, task_generator(),
+                                    num_workers, queue_size):
+            yield i, feat
+
+
+def _ordered_map(fn, task_generator, num_workers, queue_size):
+    """Run fn over tasks in worker processes while keeping the order of
+       tasks.
+    Args:
+        fn: A module-level function
+        task_generator: generator of `(args, extra)`. fn is called as
+            `fn(*args)` and extra is passed through as is.
+        num_workers: int, the number of processes
+        queue_size: int, the maximum number of tasks in flight
+    Returns:
+        A generator of `(fn(*args), extra)`
+    """
+    executor = ProcessPoolExecutor(max_workers=num_workers)
+    futures = deque()
+    try:
+        for args, extra in task_generator:
+            futures.append((executor.submit(fn, *args), extra))
+            if len(futures) >= queue_size:
+                future, extra = futures.popleft()
+                yield future.result(), extra
+        while len(futures) > 0:
+            future, extra = futures.popleft()
+            yield future.result(), extra
+    finally:
+        for future, _ in futures:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def _extract(wav_path, feature_type, feature_dim, energy, delta1, delta2,
+             normalize=True):
+    """Read a wav file once & convert to features.
+    Args:
+        wav_path: path to a wav file, or a file object of a wav file
+        feature_type: logfbank (logmelfbank) or fbank or mfcc
+        feature_dim: int, the demension of each feature
+        energy: if True, add energy
+        delta1: if True, add delta features
+        delta2: if True, add delta delta features
+        normalize: if True, normalize features per wav
+    Returns:
+        feat: A numpy array of float32 of size `[T, input_size]`
+    """
+    fs, audio = scipy.io.wavfile.read(wav_path)
+    if feature_type == 'mfcc':
+        # NOTE: the number of mel filters is 26, so at most 26 coefficients
+        engine = get_engine(samplerate=fs)
+        feat, energy_feat = engine.mfcc(audio, numcep=feature_dim)
+    else:
+        engine = get_engine(samplerate=fs, nfilt=feature_dim)
+        if feature_type in ['logfbank', 'logmelfbank']:
+            feat, energy_feat = engine.logfbank(audio)
+        else:
+            feat, energy_feat = engine.fbank(audio)
     if energy:
-        input_size + 1
+        # logenergy = np.log(energy_feat)
+        feat = np.c_[feat, energy_feat]
+
     if delta2:
-        input_size *= 3
+        delta1_feat = _delta(feat, N=2)
+        delta2_feat = _delta(delta1_feat, N=2)
+        feat = np.c_[feat, delta1_feat, delta2_feat]
     elif delta1:
-        input_size *= 2
-
-    inputs = None
-    inputs_seq_len = np.zeros((batch_size,))
-    for i, wav_path in enumerate(wav_paths):
-        if feature_type == 'mfcc':
-            feat = mfcc(audio, samplerate=fs, numcep=feature_dim)
-            if energy:
-                energy_feat = fbank(audio, samplerate=fs, nfilt=feature_dim)[1]
-                feat = np.c_[feat, energy_feat]
-        else:
-            fbank_feat, energy_feat = fbank(
-                audio, samplerate=fs, nfilt=feature_dim)
-            if feature_type == 'logfbank':
-                fbank_feat = np.log(fbank_feat)
-            feat = fbank_feat
-            if energy:
-                # logenergy = np.log(energy_feat)
-                feat = np.c_[feat, energy_feat]
-
-        if delta2:
-            delta1_feat = _delta(feat, N=2)
-            delta2_feat = _delta(delta1_feat, N=2)
-            feat = np.c_[feat, delta1_feat, delta2_feat]
-        elif delta1:
-            delta1_feat = _delta(feat, N=2)
-            feat = np.c_[feat, delta1_feat]
-
-        # Normalize per wav
-        feat = (feat - np.mean(feat)) / np.std(feat)
-
-        if inputs is None:
-            max_time = feat.shape[0]
-            input_size = feat.shape[-1]
-            inputs = np.zeros((batch_size, max_time, input_size))
+        delta1_feat = _delta(feat, N=2)
+        feat = np.c_[feat, delta1_feat]
 
-        inputs[i] = feat
-        inputs_seq_len[i] = len(feat)
+    # Normalize per wav
+    if normalize:
+        feat = (feat - np.mean(feat)) / np.std(feat)
 
-    return inputs, inputs_seq_len
+    return feat.astype(np.float32)
 
 
-def _delta(feat, N):
-    """Compute delta features from a feature vector sequence.
+def _delta(feat, N, seq_len=None):
+    """Compute delta features from a feature vector sequence by the
+       regression over a window of 2N+1 frames. Each utterance is padded by
+       repeating its first and last frames.
     Args:
-        feat: A numpy array of size (NUMFRAMES by number of features)
-            containing features. Each row holds 1 feature vector.
+        feat: A numpy array of size `[T, input_size]` or `[B, T, input_size]`
         N: For each frame, calculate delta features based on preceding and
             following N frames
+        seq_len: A numpy array of size `[B]` of the number of frames of each
+            utterance in the batch. If None, all frames are valid.
     Returns:
-        A numpy array of size (NUMFRAMES by number of features) containing
-            delta features. Each row holds 1 delta feature vector.
+        A numpy array of the same size as feat containing delta features.
+            Frames beyond seq_len are 0.
     """
     if N < 1:
         raise ValueError('N must be an integer >= 1')
-    NUMFRAMES = len(feat)
+    feat = np.asarray(feat)
+    if feat.ndim == 2:
+        if seq_len is not None:
+            raise ValueError('seq_len is only for a batch `[B, T, D]`.')
+        return _delta(feat[np.newaxis], N)[0]
+    if feat.ndim != 3:
+        raise ValueError('feat must be of size `[T, D]` or `[B, T, D]`.')
+
+    batch_size, max_time = feat.shape[:2]
+    dtype = feat.dtype if np.issubdtype(feat.dtype, np.floating) \
+        else np.float64
+    delta_feat = np.zeros(feat.shape, dtype=dtype)
+    if max_time == 0:
+        return delta_feat
     denominator = 2 * sum([i**2 for i in range(1, N + 1)])
-    delta_feat = np.empty_like(feat)
-    # padded version of feat
-    padded = np.pad(feat, ((N, N), (0, 0)), mode='edge')
-    for t in range(NUMFRAMES):
-        # [t : t+2*N+1] == [(N+t)-N : (N+t)+N+1]
-        delta_feat[t] = np.dot(np.arange(-N, N + 1),
-                               padded[t: t + 2 * N + 1]) / denominator
+
+    if seq_len is None:
+        # Edge-padded along time, the window of frame t is
+        # padded[:, t:t + 2N + 1]
+        padded = np.pad(feat, ((0, 0), (N, N), (0, 0)), mode='edge')
+        for n in range(1, N + 1):
+            delta_feat += n * (padded[:, N + n:N + n + max_time] -
+                               padded[:, N - n:N - n + max_time])
+    else:
+        # Clip the indices of the window into each utterance instead of
+        # padding each utterance separately
+        seq_len = np.asarray(seq_len, dtype=np.int64)
+        last = np.maximum(seq_len - 1, 0)[:, np.newaxis]
+        time = np.arange(max_time)[np.newaxis, :]
+        batch_indices = np.arange(batch_size)[:, np.newaxis]
+        for n in range(1, N + 1):
+            forward = np.minimum(time + n, last)
+            backward = np.clip(time - n, 0, last)
+            delta_feat += n * (feat[batch_indices, forward] -
+                               feat[batch_indices, backward])
+        delta_feat[time >= seq_len[:, np.newaxis]] = 0
+
+    delta_feat /= denominator
     return delta_feat
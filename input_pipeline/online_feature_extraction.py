@@ -0,0 +1,269 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*
+
+"""Extract features from a stream of audio chunks. Frames are emitted as
+   soon as their windows and delta contexts are available, so that whole
+   utterances are never buffered.
+"""
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import numpy as np
+
+from input_pipeline.feature_engine import get_engine
+from input_pipeline.feature_extraction import _delta
+
+
+class OnlineFeatureExtractor(object):
+    """Stateful feature extractor for streaming audio. Without normalization
+       the concatenation of frames of an utterance is the same as
+       wav2feature. Features are normalized by the running mean and standard
+       deviation of each dimension over all frames emitted so far instead
+       of the statistics of the whole wav.
+    Args:
+        samplerate: int, the sample rate of audio
+        feature_type: logfbank (logmelfbank) or fbank or mfcc
+        feature_dim: int, the demension of each feature
+        energy: if True, add energy
+        delta1: if True, add delta features
+        delta2: if True, add delta delta features
+        normalize: if True, normalize features by running statistics
+    """
+
+    def __init__(self, samplerate=16000, feature_type='logfbank',
+                 feature_dim=40, energy=True, delta1=True, delta2=True,
+                 normalize=True):
+        if feature_type not in ['logmelfbank', 'logfbank', 'fbank', 'mfcc']:
+            raise ValueError(
+                'feature_type is "logmelfbank" or "logfbank" or "fbank" or "mfcc".')
+        if delta2 and not delta1:
+            delta1 = True
+
+        self.feature_type = feature_type
+        self.feature_dim = feature_dim
+        self.energy = energy
+        self.normalize = normalize
+        if feature_type == 'mfcc':
+            self.engine = get_engine(samplerate=samplerate)
+        else:
+            self.engine = get_engine(samplerate=samplerate,
+                                     nfilt=feature_dim)
+
+        self.delta_streams = []
+        if delta1:
+            self.delta_streams.append(_DeltaStream(N=2))
+        if delta2:
+            self.delta_streams.append(_DeltaStream(N=2))
+
+        self.reset()
+
+    @property
+    def latency(self):
+        """The number of frames held back for the contexts of deltas."""
+        return sum(stream.N for stream in self.delta_streams)
+
+    def reset(self):
+        """Reset the state of the utterance and the running statistics."""
+        self.frame_num = 0
+        self.sum = None
+        self.sum_square = None
+        self._reset_utterance()
+
+    def _reset_utterance(self):
+        self._samples = np.zeros((0,), dtype=np.float64)
+        self._prev_sample = None
+        self._num_samples = 0
+        self._num_frames = 0
+        # The static features and deltas waiting for the last delta
+        self._pending = [np.zeros((0, 0)) for _ in self.delta_streams]
+        for stream in self.delta_streams:
+            stream.reset()
+
+    def accept_waveform(self, chunk):
+        """Feed a chunk of audio and return new frames.
+        Args:
+            chunk: np.ndarray of PCM samples of any size
+        Returns:
+            feat: np.ndarray of float32 of size `[num_frames, input_size]`
+        """
+        chunk = np.asarray(chunk).reshape(-1)
+        if len(chunk) == 0:
+            return self._emit(self._extend(self._compute([])))
+
+        self._samples = np.append(
+            self._samples,
+            self.engine.preemphasis(chunk, prev_sample=self._prev_sample))
+        self._prev_sample = float(chunk[-1])
+        self._num_samples += len(chunk)
+
+        # Frames whose windows are complete
+        frame_len = self.engine.frame_len
+        frame_step = self.engine.frame_step
+        if len(self._samples) < frame_len:
+            return self._emit(self._extend(self._compute([])))
+        num_frames = 1 + (len(self._samples) - frame_len) // frame_step
+        frames = self.engine.frame(
+            self._samples[:(num_frames - 1) * frame_step + frame_len])
+        self._samples = self._samples[num_frames * frame_step:]
+        self._num_frames += num_frames
+        return self._emit(self._extend(self._compute(frames)))
+
+    def flush(self):
+        """Finish the utterance and return the rest of frames. The last
+           window is padded with 0 and deltas are padded by repeating the
+           last frame as in wav2feature. The running statistics are kept for
+           the next utterance.
+        Returns:
+            feat: np.ndarray of float32 of size `[num_frames, input_size]`
+        """
+        frames = []
+        frame_len = self.engine.frame_len
+        frame_step = self.engine.frame_step
+        if self._num_samples > 0:
+            if (self._num_frames == 0 or
+                    len(self._samples) > frame_len - frame_step):
+                frames = self.engine.frame(self._samples)[:1]
+                self._num_frames += 1
+
+        feat = self._compute(frames)
+        # Flush each delta stream in order
+        outputs = [feat]
+        for i, stream in enumerate(self.delta_streams):
+            delta_feat = stream.accept(outputs[-1])
+            tail = stream.flush()
+            if len(tail) > 0:
+                delta_feat = np.concatenate([delta_feat, tail], axis=0)
+            outputs = self._align(i, outputs, delta_feat)
+        feat = self._emit(np.concatenate(outputs, axis=1)
+                          if len(outputs[0]) > 0 else self._empty())
+
+        self._reset_utterance()
+        return feat
+
+    def _compute(self, frames):
+        """Compute static features of frames.
+        Args:
+            frames: np.ndarray of size `[num_frames, frame_len]`
+        Returns:
+            feat: np.ndarray of size `[num_frames, static_size]`
+        """
+        if len(frames) == 0:
+            return np.zeros((0, self._static_size()))
+        pspec = self.engine.frame_power_spectrum(frames)
+        feat, energy = self.engine.fbank_from_spectrum(pspec)
+        if self.feature_type == 'mfcc':
+            feat = self.engine.cepstrum(np.log(feat), energy,
+                                        numcep=self.feature_dim)
+        elif self.feature_type in ['logfbank', 'logmelfbank']:
+            feat = np.log(feat)
+        if self.energy:
+            feat = np.c_[feat, energy]
+        return feat
+
+    def _static_size(self):
+        if self.feature_type == 'mfcc':
+            size = min(self.feature_dim, self.engine.nfilt)
+        else:
+            size = self.feature_dim
+        return size + 1 if self.energy else size
+
+    def _extend(self, feat):
+        """Pass static features through delta streams.
+        Returns:
+            np.ndarray of frames whose all deltas are computed
+        """
+        outputs = [feat]
+        for i, stream in enumerate(self.delta_streams):
+            outputs = self._align(i, outputs, stream.accept(outputs[-1]))
+        if len(outputs[0]) == 0:
+            return self._empty()
+        return np.concatenate(outputs, axis=1)
+
+    def _align(self, i, outputs, delta_feat):
+        """Hold features until their i-th deltas are computed.
+        Args:
+            i: int, the index of the delta stream
+            outputs: list of np.ndarray of features so far
+            delta_feat: np.ndarray of new i-th deltas
+        Returns:
+            list of np.ndarray of features with the i-th deltas
+        """
+        pending = np.concatenate(outputs, axis=1)
+        if self._pending[i].shape[0] > 0:
+            pending = np.concatenate([self._pending[i], pending], axis=0)
+        num_ready = len(delta_feat)
+        ready, self._pending[i] = pending[:num_ready], pending[num_ready:]
+        sizes = np.cumsum([x.shape[1] for x in outputs])[:-1]
+        return np.split(ready, sizes, axis=1) + [delta_feat]
+
+    def _empty(self):
+        input_size = self._static_size() * (len(self.delta_streams) + 1)
+        return np.zeros((0, input_size))
+
+    def _emit(self, feat):
+        """Normalize features by the running statistics."""
+        if self.normalize and len(feat) > 0:
+            if self.sum is None:
+                self.sum = np.zeros((feat.shape[1],), dtype=np.float64)
+                self.sum_square = np.zeros((feat.shape[1],),
+                                           dtype=np.float64)
+            self.frame_num += len(feat)
+            self.sum += feat.sum(axis=0)
+            self.sum_square += np.square(feat).sum(axis=0)
+            mean = self.sum / self.frame_num
+            var = np.maximum(self.sum_square / self.frame_num -
+                             np.square(mean), 0)
+            feat = (feat - mean) / np.maximum(np.sqrt(var), 1e-8)
+        return feat.astype(np.float32)
+
+
+class _DeltaStream(object):
+    """Compute deltas of a stream of frames. The delta of a frame is
+       computed when the N following frames arrive, and the head and the
+       tail are padded by repeating the first and last frames.
+    Args:
+        N: int, the number of preceding and following frames
+    """
+
+    def __init__(self, N):
+        self.N = N
+        self.reset()
+
+    def reset(self):
+        self.context = None
+
+    def accept(self, feat):
+        """
+        Args:
+            feat: np.ndarray of size `[num_frames, feature_size]`
+        Returns:
+            np.ndarray of deltas of the frames which became computable
+        """
+        if len(feat) == 0:
+            return np.zeros((0, feat.shape[1]))
+        if self.context is None:
+            # Pad the head by repeating the first frame
+            self.context = np.repeat(feat[:1], self.N, axis=0)
+        return self._step(np.concatenate([self.context, feat], axis=0))
+
+    def flush(self):
+        """
+        Returns:
+            np.ndarray of deltas of the last N frames
+        """
+        if self.context is None:
+            return np.zeros((0, 0))
+        # Pad the tail by repeating the last frame
+        delta_feat = self._step(np.concatenate(
+            [self.context, np.repeat(self.context[-1:], self.N, axis=0)],
+            axis=0))
+        self.reset()
+        return delta_feat
+
+    def _step(self, buffer):
+        # The delta of the frame at buffer[t] (N <= t < len(buffer) - N)
+        delta_feat = _delta(buffer, self.N)[self.N:len(buffer) - self.N]
+        self.context = buffer[len(delta_feat):]
+        return delta_feat
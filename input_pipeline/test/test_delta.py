@@ -0,0 +1,72 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import sys
+import unittest
+import numpy as np
+
+sys.path.append('../../')
+try:
+    from input_pipeline.feature_extraction import _delta
+except ImportError:
+    _delta = None
+
+
+def _delta_loop(feat, N):
+    """The previous implementation of _delta looping over frames."""
+    NUMFRAMES = len(feat)
+    denominator = 2 * sum([i**2 for i in range(1, N + 1)])
+    delta_feat = np.empty_like(feat)
+    padded = np.pad(feat, ((N, N), (0, 0)), mode='edge')
+    for t in range(NUMFRAMES):
+        delta_feat[t] = np.dot(np.arange(-N, N + 1),
+                               padded[t: t + 2 * N + 1]) / denominator
+    return delta_feat
+
+
+@unittest.skipIf(_delta is None, 'scipy is not available.')
+class TestDelta(unittest.TestCase):
+
+    def test(self):
+        print("Delta features check.")
+
+        rng = np.random.RandomState(0)
+        for frame_num in [1, 2, 3, 7, 300]:
+            for N in [1, 2, 3]:
+                feat = rng.randn(frame_num, 41)
+                self.assertTrue(np.allclose(_delta(feat, N),
+                                            _delta_loop(feat, N)))
+                # delta-delta
+                self.assertTrue(np.allclose(
+                    _delta(_delta(feat, N), N),
+                    _delta_loop(_delta_loop(feat, N), N)))
+
+        self.check_batch(N=2, frame_nums=[5, 1, 300, 2, 77])
+
+        with self.assertRaises(ValueError):
+            _delta(rng.randn(10, 3), 0)
+        with self.assertRaises(ValueError):
+            _delta(rng.randn(10, 3), 2, seq_len=[10])
+
+    def check_batch(self, N, frame_nums, input_size=41):
+        # Utterances padded with non-zero values
+        rng = np.random.RandomState(1)
+        feat_list = [rng.randn(frame_num, input_size)
+                     for frame_num in frame_nums]
+        feat = np.full((len(frame_nums), max(frame_nums), input_size), 100.)
+        for i, x in enumerate(feat_list):
+            feat[i, :len(x)] = x
+
+        delta_feat = _delta(feat, N, seq_len=frame_nums)
+        for i, x in enumerate(feat_list):
+            self.assertTrue(np.allclose(delta_feat[i, :len(x)],
+                                        _delta_loop(x, N)))
+            self.assertTrue(np.all(delta_feat[i, len(x):] == 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,195 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+from os.path import join, basename
+import shutil
+import sys
+import tempfile
+import unittest
+import wave
+import numpy as np
+
+sys.path.append('../../')
+try:
+    from input_pipeline.extract_corpus import extract_corpus, list_wav_paths, input_path, SHARD_INDEX_NAME
+    from input_pipeline.feature_extraction import iter_wav2feature
+except ImportError:
+    extract_corpus = None
+from experiments.utils.data.inputs.feature_store import FeatureStore, SHARD_NAME
+from experiments.utils.data.inputs.cmvn import compute_cmvn
+from experiments.utils.data.dataset_loader.each_load.ctc_each_load import DatasetBase
+from experiments.utils.data.dataset_loader.manifest import load_manifest
+from experiments.utils.data.dataset_loader.filtering import filter_manifest
+from experiments.utils.data.dataset_loader.sampler import Sampler
+from experiments.utils.data.dataset_loader.padding import PaddingCounter
+
+
+def write_wav(wav_path, audio, samplerate=16000):
+    wav = wave.open(wav_path, 'wb')
+    wav.setnchannels(1)
+    wav.setsampwidth(2)
+    wav.setframerate(samplerate)
+    wav.writeframes(audio.astype(np.int16).tobytes())
+    wav.close()
+
+
+class Dataset(DatasetBase):
+
+    def __init__(self, input_dir, label_dir, batch_size=4):
+        self.is_training = True
+        self.is_test = False
+        self.batch_size = batch_size
+        self.num_gpu = 1
+        self.num_stack = None
+        self.num_skip = None
+        self.input_size = None
+
+        manifest = load_manifest([input_dir])
+        manifest, _ = filter_manifest(manifest,
+                                      ctc_label_keys=['ctc/character'],
+                                      verbose=False)
+        self.frame_num_dict = manifest.frame_num_dict
+        self.input_paths = manifest.paths([input_dir])
+        self.label_paths = manifest.paths([label_dir])
+        self.data_num = len(self.input_paths)
+
+        self.sampler = Sampler(self.data_num, self.batch_size,
+                               sort_utt=True, seed=1)
+        self.padding_counter = PaddingCounter()
+
+
+@unittest.skipIf(extract_corpus is None, 'scipy is not available.')
+class TestExtractCorpus(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.wav_dir = join(self.temp_dir, 'wav')
+        self.label_dir = join(self.temp_dir, 'labels')
+        self.save_path = join(self.temp_dir, 'store')
+        rng = np.random.RandomState(0)
+        for speaker in ['spkA', 'spkB', 'spkC']:
+            os.makedirs(join(self.wav_dir, speaker))
+            os.makedirs(join(self.label_dir, speaker))
+            for i in range(7):
+                input_name = '%s_%d' % (speaker, i)
+                write_wav(join(self.wav_dir, speaker, input_name + '.wav'),
+                          rng.randn(rng.randint(2000, 20000)) * 2000)
+                # Labels are stored in the same layout as wav files
+                if i > 0:
+                    np.save(join(self.label_dir, speaker,
+                                 input_name + '.npy'),
+                            rng.randint(0, 10, size=rng.randint(1, 8)))
+        self.wav_paths = list_wav_paths(self.wav_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test(self):
+        print("Feature extraction of a corpus check.")
+
+        index, stats = extract_corpus(
+            self.wav_paths, self.save_path, shard_size=50000, num_workers=2,
+            feature_dim=20, wav_root=self.wav_dir,
+            label_dirs={'ctc/character': self.label_dir}, verbose=False)
+        num_shards = int(index['shard'].max()) + 1
+        self.assertGreater(num_shards, 3)
+        self.check_store(feature_dim=20)
+        self.check_dataset(feature_dim=20)
+
+        # The index & statistics are the same as computed from the store
+        stats_store = compute_cmvn(self.wav_paths, store_path=self.save_path)
+        self.check_stats(stats, stats_store)
+
+        # Crash while writing a shard: the shard is left without its index
+        # and later shards are lost
+        crash_shard_id = num_shards - 2
+        for shard_id in range(crash_shard_id, num_shards):
+            os.remove(join(self.save_path, SHARD_INDEX_NAME % shard_id))
+        os.remove(join(self.save_path, SHARD_NAME % (num_shards - 1)))
+        # Completed shards must not be written again
+        for shard_id in range(crash_shard_id):
+            os.utime(join(self.save_path, SHARD_NAME % shard_id), (0, 0))
+
+        index_resumed, stats_resumed = extract_corpus(
+            self.wav_paths, self.save_path, shard_size=50000,
+            num_workers=1, feature_dim=20, wav_root=self.wav_dir,
+            label_dirs={'ctc/character': self.label_dir}, verbose=False)
+        for shard_id in range(crash_shard_id):
+            self.assertEqual(os.stat(
+                join(self.save_path, SHARD_NAME % shard_id)).st_mtime, 0)
+        for key in index:
+            self.assertTrue(np.array_equal(index[key], index_resumed[key]))
+        self.check_stats(stats, stats_resumed)
+        self.check_store(feature_dim=20)
+        self.check_dataset(feature_dim=20)
+
+        # Paths of a list of wav files are under speaker directories
+        self.assertEqual(input_path(self.wav_paths[0]),
+                         join('spkA', 'spkA_0.npy'))
+        self.assertEqual(input_path(self.wav_paths[0], self.wav_dir),
+                         join('spkA', 'spkA_0.npy'))
+
+        # Shards of other wav files are not resumed
+        with self.assertRaises(ValueError):
+            extract_corpus(self.wav_paths[::-1], self.save_path,
+                           shard_size=50000, feature_dim=20, verbose=False)
+
+    def check_store(self, feature_dim):
+        store = FeatureStore(self.save_path)
+        self.assertEqual(len(store), len(self.wav_paths))
+        for i, feat in iter_wav2feature(self.wav_paths,
+                                        feature_dim=feature_dim,
+                                        normalize=False):
+            input_name = basename(self.wav_paths[i]).split('.')[0]
+            self.assertTrue(np.array_equal(store[input_name], feat))
+
+    def check_dataset(self, feature_dim):
+        # The manifest replaces frame_num.pickle, and paths of the index keep
+        # the speaker directories
+        dataset = Dataset(self.save_path, self.label_dir)
+        dataset.set_feature_store(self.save_path)
+        self.assertEqual(dataset.data_num, len(self.wav_paths) - 3)
+        feat_dict = dict(
+            (basename(self.wav_paths[i]).split('.')[0], feat)
+            for i, feat in iter_wav2feature(self.wav_paths,
+                                            feature_dim=feature_dim,
+                                            normalize=False))
+
+        input_names = []
+        for data, next_epoch_flag in dataset():
+            inputs, labels, inputs_seq_len, names = data
+            for i, input_name in enumerate(names[0]):
+                feat = feat_dict[input_name]
+                label = np.load(join(self.label_dir, input_name.split('_')[0],
+                                     input_name + '.npy'))
+                self.assertEqual(inputs_seq_len[0][i], len(feat))
+                self.assertTrue(np.array_equal(inputs[0][i, :len(feat)],
+                                               feat))
+                self.assertTrue(np.array_equal(labels[0][i, :len(label)],
+                                               label))
+                input_names.append(input_name)
+            if next_epoch_flag:
+                break
+        self.assertEqual(sorted(input_names), sorted(
+            name for name in feat_dict if not name.endswith('_0')))
+
+    def check_stats(self, stats, stats_expected):
+        self.assertEqual(sorted(stats['speaker'].tolist()),
+                         sorted(stats_expected['speaker'].tolist()))
+        rows = np.argsort(stats['speaker'])
+        rows_expected = np.argsort(stats_expected['speaker'])
+        self.assertEqual(stats['frame_num'], stats_expected['frame_num'])
+        for key in ['mean', 'std']:
+            self.assertTrue(np.allclose(stats[key], stats_expected[key]))
+        for key in ['speaker_mean', 'speaker_std', 'speaker_frame_num']:
+            self.assertTrue(np.allclose(stats[key][rows],
+                                        stats_expected[key][rows_expected]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,262 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+from os.path import join, basename
+import shutil
+import sys
+import tempfile
+import unittest
+import wave
+import numpy as np
+
+sys.path.append('../../')
+try:
+    from input_pipeline import feature_cache
+    from input_pipeline.feature_cache import FeatureCache, wav_frame_num, LOW_WATERMARK
+    from input_pipeline.feature_extraction import _extract
+    from experiments.utils.data.dataset_loader.each_load.ctc_wav_load import WavDataset
+except ImportError:
+    FeatureCache = None
+from experiments.utils.data.dataset_loader.each_load.ctc_each_load import DatasetBase
+from experiments.utils.data.dataset_loader.sampler import Sampler
+from experiments.utils.data.dataset_loader.padding import PaddingCounter
+
+# feature_type, feature_dim, energy, delta1, delta2, normalize
+CONFIG = ('logfbank', 40, True, True, True, True)
+
+
+def write_wav(wav_path, audio, samplerate=16000):
+    wav = wave.open(wav_path, 'wb')
+    wav.setnchannels(1)
+    wav.setsampwidth(2)
+    wav.setframerate(samplerate)
+    wav.writeframes(audio.astype(np.int16).tobytes())
+    wav.close()
+
+
+class Dataset(DatasetBase):
+
+    def __init__(self, input_paths, label_paths, frame_num_dict, batch_size,
+                 num_stack, num_skip):
+        self.is_training = True
+        self.is_test = False
+        self.batch_size = batch_size
+        self.num_gpu = 1
+        self.num_stack = num_stack
+        self.num_skip = num_skip
+        self.input_size = None
+        self.frame_num_dict = frame_num_dict
+        self.input_paths = np.array(input_paths)
+        self.label_paths = np.array(label_paths)
+        self.data_num = len(self.input_paths)
+        self.sampler = Sampler(self.data_num, self.batch_size, seed=1)
+        self.padding_counter = PaddingCounter()
+
+
+@unittest.skipIf(FeatureCache is None, 'scipy is not available.')
+class TestFeatureCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache_dir = join(self.temp_dir, 'cache')
+        for dir_name in ['wav', 'inputs', 'labels']:
+            os.makedirs(join(self.temp_dir, dir_name))
+        rng = np.random.RandomState(0)
+        self.wav_paths, self.label_paths = [], []
+        for i in range(10):
+            wav_path = join(self.temp_dir, 'wav', 'utt%03d.wav' % i)
+            write_wav(wav_path, rng.randn(rng.randint(1000, 12000)) * 2000)
+            label_path = join(self.temp_dir, 'labels', 'utt%03d.npy' % i)
+            np.save(label_path, rng.randint(0, 10, size=rng.randint(1, 5)))
+            self.wav_paths.append(wav_path)
+            self.label_paths.append(label_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test(self):
+        print("Feature cache check.")
+
+        self.check_hit()
+        self.check_key()
+        self.check_eviction()
+        self.check_frame_num()
+        self.check_dataset()
+        self.check_process_backend()
+
+    def check_hit(self):
+        cache = FeatureCache(self.cache_dir)
+        for wav_path in self.wav_paths:
+            expected = _extract(wav_path, *CONFIG)
+            self.assertTrue(np.array_equal(cache[wav_path], expected))
+            self.assertTrue(np.array_equal(cache[wav_path], expected))
+        self.assertEqual(cache.miss_num, len(self.wav_paths))
+        self.assertEqual(cache.hit_num, len(self.wav_paths))
+
+        # Entries are shared with other instances
+        cache = FeatureCache(self.cache_dir)
+        for wav_path in self.wav_paths:
+            self.assertTrue(np.array_equal(cache[wav_path],
+                                           _extract(wav_path, *CONFIG)))
+        self.assertEqual(cache.hit_num, len(self.wav_paths))
+        self.assertEqual(cache.miss_num, 0)
+
+        # On a miss, features are extracted from the audio read for the key
+        shutil.rmtree(self.cache_dir)
+        extract_args = []
+
+        def extract(wav_path, *args):
+            extract_args.append(wav_path)
+            return _extract(wav_path, *args)
+
+        feature_cache._extract = extract
+        try:
+            cache = FeatureCache(self.cache_dir)
+            self.assertTrue(np.array_equal(cache[self.wav_paths[0]],
+                                           _extract(self.wav_paths[0],
+                                                    *CONFIG)))
+        finally:
+            feature_cache._extract = _extract
+        self.assertEqual(len(extract_args), 1)
+        self.assertNotIsInstance(extract_args[0], str)
+
+    def check_key(self):
+        cache = FeatureCache(self.cache_dir)
+        wav_path = self.wav_paths[0]
+        key = cache.key(wav_path)
+
+        # The same audio at another path has the same key
+        copy_path = join(self.temp_dir, 'copy.wav')
+        shutil.copyfile(wav_path, copy_path)
+        self.assertEqual(cache.key(copy_path), key)
+
+        # Any change of the configuration changes the key
+        for kwargs in [{'feature_type': 'fbank'}, {'feature_dim': 20},
+                       {'energy': False}, {'delta2': False},
+                       {'normalize': False}]:
+            self.assertNotEqual(
+                FeatureCache(self.cache_dir, **kwargs).key(wav_path), key)
+
+        # Rewriting the audio changes the key
+        write_wav(copy_path, np.random.RandomState(1).randn(5000) * 2000)
+        os.utime(copy_path, (0, 0))
+        self.assertNotEqual(cache.key(copy_path), key)
+        self.assertTrue(np.array_equal(cache[copy_path],
+                                       _extract(copy_path, *CONFIG)))
+
+    def check_eviction(self):
+        shutil.rmtree(self.cache_dir)
+        cache = FeatureCache(self.cache_dir)
+        for wav_path in self.wav_paths[:-1]:
+            cache[wav_path]
+        entry_paths = [cache._entry_path(cache.key(wav_path))
+                       for wav_path in self.wav_paths[:-1]]
+        entry_sizes = [os.path.getsize(path) for path in entry_paths]
+        # Make access times distinct in a random order
+        ages = np.random.RandomState(0).permutation(len(entry_paths))
+        for entry_path, age in zip(entry_paths, ages):
+            os.utime(entry_path, (1000 + age, 1000 + age))
+        max_bytes = cache.usage()
+
+        # A new entry exceeds the cap
+        cache = FeatureCache(self.cache_dir, max_bytes=max_bytes)
+        cache[self.wav_paths[-1]]
+        new_entry_path = cache._entry_path(cache.key(self.wav_paths[-1]))
+        low_watermark = int(max_bytes * LOW_WATERMARK)
+        self.assertTrue(os.path.isfile(new_entry_path))
+        self.assertLessEqual(cache.usage(), low_watermark)
+
+        # The oldest entries are removed first, and only until the total
+        # size reaches the low watermark
+        usage = max_bytes + os.path.getsize(new_entry_path)
+        for i in np.argsort(ages):
+            if usage > low_watermark:
+                self.assertFalse(os.path.isfile(entry_paths[i]))
+                usage -= entry_sizes[i]
+            else:
+                self.assertTrue(os.path.isfile(entry_paths[i]))
+        self.assertEqual(cache.usage(), usage)
+
+    def check_frame_num(self):
+        rng = np.random.RandomState(2)
+        # Shorter than a frame, exactly a frame, a frame + 1 sample, ...
+        for samplerate in [16000, 8000]:
+            for num_samples in [1, 100, 400, 401, 560, 561, 12345]:
+                wav_path = join(self.temp_dir, 'frame_num.wav')
+                write_wav(wav_path, rng.randn(num_samples) * 2000,
+                          samplerate=samplerate)
+                self.assertEqual(wav_frame_num(wav_path),
+                                 len(_extract(wav_path, *CONFIG)))
+
+    def check_dataset(self, num_stack=2, num_skip=2):
+        # Features extracted in advance
+        frame_num_dict = {}
+        for wav_path in self.wav_paths:
+            input_name = basename(wav_path).split('.')[0]
+            feat = _extract(wav_path, *CONFIG)
+            input_path = join(self.temp_dir, 'inputs', input_name + '.npy')
+            np.save(input_path, feat)
+            frame_num_dict[input_name] = len(feat)
+
+        wav_dataset = WavDataset(self.wav_paths, self.label_paths,
+                                 batch_size=3, cache_dir=self.cache_dir,
+                                 num_stack=num_stack, num_skip=num_skip)
+        self.assertEqual(wav_dataset.frame_num_dict, frame_num_dict)
+        input_names = [basename(path).split('.')[0]
+                       for path in wav_dataset.input_paths]
+        dataset = Dataset([join(self.temp_dir, 'inputs', name + '.npy')
+                           for name in input_names],
+                          wav_dataset.label_paths, frame_num_dict,
+                          batch_size=3, num_stack=num_stack,
+                          num_skip=num_skip)
+        # Sample the same mini-batches
+        wav_dataset.sampler = Sampler(wav_dataset.data_num, 3, seed=1)
+
+        for (data, next_epoch_flag), (data_wav, next_epoch_flag_wav) in zip(
+                dataset(), wav_dataset()):
+            self.assertEqual(next_epoch_flag, next_epoch_flag_wav)
+            for x, x_wav in zip(data, data_wav):
+                self.assertTrue(np.array_equal(x, x_wav))
+            if next_epoch_flag:
+                break
+
+    def check_process_backend(self):
+        cache_dir = join(self.temp_dir, 'cache_process')
+        wav_dataset = WavDataset(self.wav_paths, self.label_paths,
+                                 batch_size=3, cache_dir=cache_dir)
+        wav_dataset.set_prefetch(1, backend='process')
+        feat_dict = dict((basename(wav_path).split('.')[0],
+                          _extract(wav_path, *CONFIG))
+                         for wav_path in self.wav_paths)
+
+        epoch = 0
+        input_names = []
+        for data, next_epoch_flag in wav_dataset():
+            inputs, _, inputs_seq_len, names = data
+            for i, input_name in enumerate(names[0]):
+                feat = feat_dict[input_name]
+                self.assertEqual(inputs_seq_len[0][i], len(feat))
+                self.assertTrue(np.array_equal(inputs[0][i, :len(feat)],
+                                               feat))
+                input_names.append(input_name)
+            if next_epoch_flag:
+                epoch += 1
+                if epoch == 2:
+                    break
+        self.assertEqual(sorted(input_names), sorted(list(feat_dict) * 2))
+
+        # The worker keeps its cache across mini-batches, so each wav file
+        # is hashed once, and the counters reach the dataset
+        cache = wav_dataset.feature_cache
+        self.assertEqual(cache.miss_num, len(self.wav_paths))
+        self.assertEqual(cache.hit_num, len(self.wav_paths))
+        self.assertEqual(cache.hash_num, len(self.wav_paths))
+
+
+if __name__ == '__main__':
+    unittest.main()
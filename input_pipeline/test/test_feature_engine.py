@@ -0,0 +1,79 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import sys
+import unittest
+import numpy as np
+
+sys.path.append('../../')
+try:
+    import python_speech_features as psf
+except ImportError:
+    psf = None
+from input_pipeline.feature_engine import get_engine
+
+
+@unittest.skipIf(psf is None, 'python_speech_features is not available.')
+class TestFeatureEngine(unittest.TestCase):
+
+    def test(self):
+        print("Parity with python_speech_features check.")
+
+        rng = np.random.RandomState(0)
+        # Shorter than a frame, exactly a frame, a frame + 1 sample, ...
+        for num_samples in [100, 400, 401, 5000, 16000 * 3 + 7]:
+            audio = (rng.randn(num_samples) * 3000).astype(np.int16)
+            self.check(audio, samplerate=16000, nfilt=40)
+            self.check(audio, samplerate=16000, nfilt=26)
+            self.check(audio, samplerate=8000, nfilt=23)
+
+        # Signals of different lengths at once
+        signals = [(rng.randn(num_samples) * 3000).astype(np.int16)
+                   for num_samples in [1000, 20000, 333]]
+        engine = get_engine(nfilt=40)
+        feat_list, energy_list = engine.fbank(signals)
+        for signal, feat, energy in zip(signals, feat_list, energy_list):
+            feat_psf, energy_psf = psf.fbank(signal, nfilt=40)
+            self.assertTrue(np.allclose(feat, feat_psf))
+            self.assertTrue(np.allclose(energy, energy_psf))
+
+        # Engines are cached per configuration
+        self.assertIs(get_engine(nfilt=40), engine)
+        with self.assertRaises(ValueError):
+            get_engine(window='hann')
+
+    def check(self, audio, samplerate, nfilt):
+        engine = get_engine(samplerate=samplerate, nfilt=nfilt)
+
+        feat, energy = engine.fbank(audio)
+        feat_psf, energy_psf = psf.fbank(audio, samplerate=samplerate,
+                                         nfilt=nfilt)
+        self.assertTrue(np.allclose(feat, feat_psf, rtol=1e-10))
+        self.assertTrue(np.allclose(energy, energy_psf, rtol=1e-10))
+
+        feat, _ = engine.logfbank(audio)
+        feat_psf = psf.logfbank(audio, samplerate=samplerate, nfilt=nfilt)
+        self.assertTrue(np.allclose(feat, feat_psf))
+
+        # At most nfilt coefficients
+        for numcep in [13, nfilt + 1]:
+            feat, _ = engine.mfcc(audio, numcep=numcep)
+            feat_psf = psf.mfcc(audio, samplerate=samplerate, numcep=numcep,
+                                nfilt=nfilt)
+            self.assertEqual(feat.shape, feat_psf.shape)
+            self.assertTrue(np.allclose(feat, feat_psf, atol=1e-8))
+
+        engine = get_engine(samplerate=samplerate, nfilt=nfilt,
+                            window='hamming')
+        feat, _ = engine.fbank(audio)
+        feat_psf, _ = psf.fbank(audio, samplerate=samplerate, nfilt=nfilt,
+                                winfunc=np.hamming)
+        self.assertTrue(np.allclose(feat, feat_psf))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import sys
+import unittest
+import numpy as np
+
+sys.path.append('../../')
+try:
+    from input_pipeline.feature_extraction import _delta
+    from input_pipeline.online_feature_extraction import OnlineFeatureExtractor
+except ImportError:
+    OnlineFeatureExtractor = None
+from input_pipeline.feature_engine import get_engine
+
+
+def extract_batch(audio, feature_type, feature_dim, energy, delta1, delta2):
+    """Features of the whole audio without normalization."""
+    if feature_type == 'mfcc':
+        feat, energy_feat = get_engine().mfcc(audio, numcep=feature_dim)
+    elif feature_type == 'fbank':
+        feat, energy_feat = get_engine(nfilt=feature_dim).fbank(audio)
+    else:
+        feat, energy_feat = get_engine(nfilt=feature_dim).logfbank(audio)
+    if energy:
+        feat = np.c_[feat, energy_feat]
+    if delta2:
+        delta1_feat = _delta(feat, N=2)
+        feat = np.c_[feat, delta1_feat, _delta(delta1_feat, N=2)]
+    elif delta1:
+        feat = np.c_[feat, _delta(feat, N=2)]
+    return feat
+
+
+@unittest.skipIf(OnlineFeatureExtractor is None, 'scipy is not available.')
+class TestOnlineFeatureExtraction(unittest.TestCase):
+
+    def test(self):
+        print("Online feature extraction check.")
+
+        self.check(feature_type='logfbank', feature_dim=40, energy=True,
+                   delta1=True, delta2=True)
+        self.check(feature_type='fbank', feature_dim=20, energy=False,
+                   delta1=True, delta2=False)
+        self.check(feature_type='mfcc', feature_dim=13, energy=True,
+                   delta1=False, delta2=False)
+        # delta2 implies delta1
+        self.check(feature_type='logfbank', feature_dim=40, energy=True,
+                   delta1=False, delta2=True)
+
+        with self.assertRaises(ValueError):
+            OnlineFeatureExtractor(feature_type='stft')
+
+    def check(self, feature_type, feature_dim, energy, delta1, delta2):
+        print('----- feature_type: %s, delta1: %s, delta2: %s -----' %
+              (feature_type, str(delta1), str(delta2)))
+
+        rng = np.random.RandomState(0)
+        extractor = OnlineFeatureExtractor(
+            feature_type=feature_type, feature_dim=feature_dim,
+            energy=energy, delta1=delta1, delta2=delta2, normalize=False)
+
+        # Shorter than a frame, around frame boundaries, and longer
+        for num_samples in [1, 50, 400, 401, 560, 561, 1000, 16033]:
+            audio = (rng.randn(num_samples) * 3000).astype(np.int16)
+            expected = extract_batch(audio, feature_type, feature_dim,
+                                     energy, delta1, delta2)
+
+            # Random chunkings including empty chunks
+            for _ in range(3):
+                feat_list = []
+                begin = 0
+                while begin < num_samples:
+                    chunk_size = rng.randint(0, 300)
+                    feat_list.append(extractor.accept_waveform(
+                        audio[begin:begin + chunk_size]))
+                    begin += chunk_size
+                feat_list.append(extractor.flush())
+                feat = np.concatenate(feat_list, axis=0)
+
+                self.assertEqual(feat.dtype, np.float32)
+                self.assertEqual(feat.shape, expected.shape)
+                self.assertTrue(np.allclose(feat, expected,
+                                            rtol=1e-4, atol=1e-3))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from os.path import join
+import shutil
+import sys
+import tempfile
+import unittest
+import wave
+import numpy as np
+
+sys.path.append('../../')
+try:
+    from input_pipeline.feature_extraction import wav2feature, iter_wav2feature
+except ImportError:
+    wav2feature = None
+
+
+def write_wav(wav_path, audio, samplerate=16000):
+    wav = wave.open(wav_path, 'wb')
+    wav.setnchannels(1)
+    wav.setsampwidth(2)
+    wav.setframerate(samplerate)
+    wav.writeframes(audio.astype(np.int16).tobytes())
+    wav.close()
+
+
+@unittest.skipIf(wav2feature is None, 'scipy is not available.')
+class TestWav2Feature(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        rng = np.random.RandomState(0)
+        self.wav_paths = []
+        for i in range(12):
+            wav_path = join(self.temp_dir, 'utt%03d.wav' % i)
+            write_wav(wav_path, rng.randn(rng.randint(800, 8000)) * 3000)
+            self.wav_paths.append(wav_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test(self):
+        print("wav2feature check.")
+
+        self.check(feature_type='logfbank', feature_dim=40)
+        self.check(feature_type='mfcc', feature_dim=13)
+
+        with self.assertRaises(ValueError):
+            wav2feature(self.wav_paths[0])
+        with self.assertRaises(ValueError):
+            list(iter_wav2feature(self.wav_paths, feature_type='stft'))
+
+    def check(self, feature_type, feature_dim):
+        print('----- feature_type: %s -----' % feature_type)
+
+        expected = [feat for _, feat in iter_wav2feature(
+            self.wav_paths, feature_type=feature_type,
+            feature_dim=feature_dim)]
+
+        # Features are yielded in the order of wav_paths with workers
+        for num_workers in [2, 3]:
+            indices = []
+            for i, feat in iter_wav2feature(
+                    self.wav_paths, feature_type=feature_type,
+                    feature_dim=feature_dim, num_workers=num_workers):
+                indices.append(i)
+                self.assertTrue(np.array_equal(feat, expected[i]))
+            self.assertEqual(indices, list(range(len(self.wav_paths))))
+
+        # Ragged output is the same as padded output
+        inputs, inputs_seq_len = wav2feature(
+            self.wav_paths, feature_type=feature_type,
+            feature_dim=feature_dim, num_workers=2)
+        feat_list, inputs_seq_len_ragged = wav2feature(
+            self.wav_paths, feature_type=feature_type,
+            feature_dim=feature_dim, ragged=True)
+        self.assertEqual(inputs.dtype, np.float32)
+        self.assertTrue(np.array_equal(inputs_seq_len,
+                                       inputs_seq_len_ragged))
+        self.assertEqual(inputs.shape[1], inputs_seq_len.max())
+        for i, feat in enumerate(feat_list):
+            self.assertEqual(len(feat), inputs_seq_len[i])
+            self.assertTrue(np.array_equal(inputs[i, :len(feat)], feat))
+            self.assertTrue(np.all(inputs[i, len(feat):] == 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
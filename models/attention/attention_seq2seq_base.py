@@ -55,6 +55,26 @@ class AttentionBase(object):
             tf.placeholder(tf.int32, shape=[None], name='inputs_seq_len'))
         self.labels_seq_len_pl_list.append(
             tf.placeholder(tf.int32, shape=[None], name='labels_seq_len'))
+        self._create_other_placeholders()
+
+    def create_input_tensors(self, inputs, labels, inputs_seq_len,
+                             labels_seq_len):
+        """Use tensors of a mini-batch (e.g. made by tf.data) in place of
+        placeholders of inputs and labels, and append them to list.
+        The other placeholders are created as usual.
+        Args:
+            inputs: A tensor of size `[B, T, input_size]`
+            labels: A tensor of size `[B, L]` padded with <EOS>
+            inputs_seq_len: A tensor of size `[B]`
+            labels_seq_len: A tensor of size `[B]`
+        """
+        self.inputs_pl_list.append(inputs)
+        self.labels_pl_list.append(tf.cast(labels, tf.int32))
+        self.inputs_seq_len_pl_list.append(tf.cast(inputs_seq_len, tf.int32))
+        self.labels_seq_len_pl_list.append(tf.cast(labels_seq_len, tf.int32))
+        self._create_other_placeholders()
+
+    def _create_other_placeholders(self):
         self.keep_prob_input_pl_list.append(
             tf.placeholder(tf.float32, name='keep_prob_input'))
         self.keep_prob_hidden_pl_list.append(
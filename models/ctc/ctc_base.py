@@ -91,11 +91,25 @@ class ctcBase(object):
         self.keep_prob_hidden_pl_list = []
         self.keep_prob_output_pl_list = []
 
-    def create_placeholders(self):
-        """Create placeholders and append them to list."""
+        # Splicing and frame stacking in the graph
+        self.raw_inputs = False
+        self.num_stack = 1
+        self.num_skip = 1
+
+    def create_placeholders(self, raw_inputs=False, num_stack=1, num_skip=1):
+        """Create placeholders and append them to list.
+        Args:
+            raw_inputs: if True, inputs are fed without splicing and frame
+                stacking as `[B, T, input_size / num_stack]`, and they are
+                stacked and spliced in the graph
+            num_stack: int, the number of frames to stack in the graph
+            num_skip: int, the number of frames to skip in the graph
+        """
+        input_dim = self._set_input_format(raw_inputs, num_stack, num_skip)
+
         self.inputs_pl_list.append(
             tf.placeholder(tf.float32,
-                           shape=[None, None, self.input_size * self.splice],
+                           shape=[None, None, input_dim],
                            name='input'))
         self.labels_pl_list.append(
             tf.SparseTensor(tf.placeholder(tf.int64, name='indices'),
@@ -103,6 +117,53 @@ class ctcBase(object):
                             tf.placeholder(tf.int64, name='shape')))
         self.inputs_seq_len_pl_list.append(
             tf.placeholder(tf.int64, shape=[None], name='inputs_seq_len'))
+        self._create_keep_prob_placeholders()
+
+    def create_input_tensors(self, inputs, labels, inputs_seq_len,
+                             raw_inputs=False, num_stack=1, num_skip=1):
+        """Use tensors of a mini-batch (e.g. made by tf.data) in place of
+        placeholders of inputs and labels, and append them to list.
+        Placeholders of dropout ratios are created as usual.
+        Args:
+            inputs: A tensor of size `[B, T, input_dim]`
+            labels: A SparseTensor of target labels
+            inputs_seq_len: A tensor of size `[B]`
+            raw_inputs: if True, inputs are not spliced and frame-stacked,
+                and they are stacked and spliced in the graph
+            num_stack: int, the number of frames to stack in the graph
+            num_skip: int, the number of frames to skip in the graph
+        """
+        self._set_input_format(raw_inputs, num_stack, num_skip)
+
+        self.inputs_pl_list.append(inputs)
+        self.labels_pl_list.append(labels)
+        self.inputs_seq_len_pl_list.append(
+            tf.cast(inputs_seq_len, tf.int64))
+        self._create_keep_prob_placeholders()
+
+    def _set_input_format(self, raw_inputs, num_stack, num_skip):
+        """Set whether inputs are spliced and frame-stacked in the graph.
+        Args:
+            raw_inputs: if True, inputs are stacked and spliced in the graph
+            num_stack: int, the number of frames to stack in the graph
+            num_skip: int, the number of frames to skip in the graph
+        Returns:
+            input_dim: int, the dimensions of input vectors to feed
+        """
+        if raw_inputs:
+            if self.input_size % num_stack != 0:
+                raise ValueError('input_size must be divisible by num_stack.')
+            if num_stack < num_skip:
+                raise ValueError('num_skip must be less than num_stack.')
+            input_dim = self.input_size // num_stack
+        else:
+            input_dim = self.input_size * self.splice
+        self.raw_inputs = raw_inputs
+        self.num_stack = int(num_stack)
+        self.num_skip = int(num_skip)
+        return input_dim
+
+    def _create_keep_prob_placeholders(self):
         self.keep_prob_input_pl_list.append(
             tf.placeholder(tf.float32, name='keep_prob_input'))
         self.keep_prob_hidden_pl_list.append(
@@ -110,6 +171,102 @@ class ctcBase(object):
         self.keep_prob_output_pl_list.append(
             tf.placeholder(tf.float32, name='keep_prob_output'))
 
+    def _preprocess_inputs(self, inputs, inputs_seq_len):
+        """Stack & skip frames and splice them in the graph. This gives the
+           same inputs as stack_frame and do_splice in
+           experiments.utils.data.inputs on the host.
+        Args:
+            inputs: A tensor of size `[B, T, input_size / num_stack]`
+            inputs_seq_len: A tensor of size `[B]`
+        Returns:
+            inputs: A tensor of size
+                `[B, ceil(T / num_skip), input_size * splice]`
+            inputs_seq_len: A tensor of size `[B]`
+        """
+        with tf.name_scope('preprocess_inputs'):
+            if self.num_stack > 1:
+                inputs = self._stack_frame(inputs, inputs_seq_len)
+                inputs_seq_len = self._stack_seq_len(inputs_seq_len)
+            if self.splice > 1:
+                inputs = self._splice(inputs, inputs_seq_len)
+        return inputs, inputs_seq_len
+
+    def _stack_seq_len(self, inputs_seq_len):
+        """Compute length of inputs after frame skipping.
+        Args:
+            inputs_seq_len: A tensor of size `[B]`
+        Returns:
+            A tensor of size `[B]`
+        """
+        if self.num_stack == 1:
+            return inputs_seq_len
+        return (inputs_seq_len + self.num_skip - 1) // self.num_skip
+
+    def _stack_frame(self, inputs, inputs_seq_len):
+        """Stack & skip frames. The i-th output frame is the concatenation of
+           input frames [i * num_skip, ..., i * num_skip + num_stack - 1],
+           and frames beyond the length are zero.
+        Args:
+            inputs: A tensor of size `[B, T, input_size / num_stack]`
+            inputs_seq_len: A tensor of size `[B]`
+        Returns:
+            A tensor of size `[B, ceil(T / num_skip), input_size]`
+        """
+        batch_size = tf.shape(inputs)[0]
+        max_time = tf.shape(inputs)[1]
+
+        # Zero frames beyond the length of each utterance
+        mask = tf.sequence_mask(inputs_seq_len, max_time, dtype=tf.float32)
+        inputs *= tf.expand_dims(mask, axis=2)
+
+        # Pad zero frames on the right side so that every window is in range
+        frame_num_decimated = (max_time + self.num_skip - 1) // self.num_skip
+        pad_len = ((frame_num_decimated - 1) * self.num_skip +
+                   self.num_stack - max_time)
+        inputs = tf.pad(inputs, [[0, 0], [0, pad_len], [0, 0]])
+
+        # Indices of frames in each window, `[T', num_stack]`
+        indices = (tf.expand_dims(tf.range(frame_num_decimated), axis=1) *
+                   self.num_skip +
+                   tf.expand_dims(tf.range(self.num_stack), axis=0))
+
+        # Gather windows as `[T', num_stack, B, input_size / num_stack]`
+        windows = tf.gather(tf.transpose(inputs, (1, 0, 2)), indices)
+        windows = tf.transpose(windows, (2, 0, 1, 3))
+        return tf.reshape(windows,
+                          shape=[batch_size, frame_num_decimated,
+                                 self.input_size])
+
+    def _splice(self, inputs, inputs_seq_len):
+        """Splice frames. The t-th output frame is the concatenation of
+           input frames [t - splice, ..., t - 1], where indices before the
+           head point to the first frame, and frames beyond the length are
+           zero.
+        Args:
+            inputs: A tensor of size `[B, T, input_size]`
+            inputs_seq_len: A tensor of size `[B]`
+        Returns:
+            A tensor of size `[B, T, input_size * splice]`
+        """
+        batch_size = tf.shape(inputs)[0]
+        max_time = tf.shape(inputs)[1]
+
+        # Indices of frames in each window, `[T, splice]`
+        indices = tf.maximum(
+            tf.expand_dims(tf.range(max_time), axis=1) +
+            tf.expand_dims(tf.range(self.splice) - self.splice, axis=0), 0)
+
+        # Gather windows as `[T, splice, B, input_size]`
+        windows = tf.gather(tf.transpose(inputs, (1, 0, 2)), indices)
+        windows = tf.transpose(windows, (2, 0, 1, 3))
+        inputs = tf.reshape(windows,
+                            shape=[batch_size, max_time,
+                                   self.input_size * self.splice])
+
+        # Zero frames beyond the length of each utterance
+        mask = tf.sequence_mask(inputs_seq_len, max_time, dtype=tf.float32)
+        return inputs * tf.expand_dims(mask, axis=2)
+
     def _add_noise_to_inputs(self, inputs, stddev=0.075):
         """Add gaussian noise to the inputs.
         Args:
@@ -155,6 +312,10 @@ class ctcBase(object):
             total_loss: operation for computing total ctc loss
             logits: A tensor of size `[T, B, input_size]`
         """
+        if self.raw_inputs:
+            inputs, inputs_seq_len = self._preprocess_inputs(
+                inputs, inputs_seq_len)
+
         # Build model graph
         logits = self._build(
             inputs, inputs_seq_len,
@@ -310,6 +471,10 @@ class ctcBase(object):
         if decode_type not in ['greedy', 'beam_search']:
             raise ValueError('decode_type is "greedy" or "beam_search".')
 
+        if self.raw_inputs:
+            # Length of inputs after frame skipping in the graph
+            inputs_seq_len = self._stack_seq_len(inputs_seq_len)
+
         if decode_type == 'greedy':
             decoded, _ = tf.nn.ctc_greedy_decoder(
                 logits, tf.cast(inputs_seq_len, tf.int32))
@@ -5,6 +5,8 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import numpy as np
+
 from experiments.utils.data.sparsetensor import list2sparsetensor
 from experiments.utils.data.labels.phone import num2phone, phone2num
 from experiments.utils.data.inputs.splicing import do_splice
@@ -55,14 +57,17 @@ def generate_data(label_type, model, batch_size=1, splice=1):
         inputs_seq_len: `[B, frame_num]`
         labels_seq_len: `[B]` (if model is attention)
     """
-    # Make input data
+    # Make input data. The same utterance is repeated in the batch, so the
+    # wav file is read only once.
     inputs, inputs_seq_len = wav2feature(
-        ['./sample/LDC93S1.wav'] * batch_size,
+        ['./sample/LDC93S1.wav'],
         feature_type='logfbank', feature_dim=40,
         energy=True, delta1=True, delta2=True)
+    inputs = np.repeat(inputs, batch_size, axis=0)
+    inputs_seq_len = np.repeat(inputs_seq_len, batch_size, axis=0)
 
     # Splice
-    inputs = do_splice(inputs, splice=splice)
+    inputs = do_splice(inputs, splice=splice, inputs_seq_len=inputs_seq_len)
 
     ctc_phone_map_file_path = '../../experiments/timit/metrics/mapping_files/ctc/phone61_to_num.txt'
     att_phone_map_file_path = '../../experiments/timit/metrics/mapping_files/attention/phone61_to_num.txt'
@@ -0,0 +1,130 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import sys
+import numpy as np
+import tensorflow as tf
+
+sys.path.append('../../')
+from models.ctc.ctc_base import ctcBase
+from experiments.utils.data.inputs.frame_stacking import stack_frame
+from experiments.utils.data.inputs.splicing import do_splice
+
+
+class TestCTCPreprocess(tf.test.TestCase):
+
+    def test(self):
+        print("Frame stacking & splicing in the graph check.")
+        # Lengths are not multiples of num_skip, and the batch is padded
+        # beyond the longest utterance
+        self.check(num_stack=1, num_skip=1, splice=5)
+        self.check(num_stack=2, num_skip=2, splice=1)
+        self.check(num_stack=3, num_skip=2, splice=3)
+        self.check(num_stack=4, num_skip=3, splice=5)
+        self.check(num_stack=4, num_skip=4, splice=1)
+        self.check(num_stack=3, num_skip=1, splice=3)
+
+    def check(self, num_stack, num_skip, splice, input_size=12,
+              frame_nums=(1, 7, 10, 13), pad_len=2):
+        print('----- num_stack: %d, num_skip: %d, splice: %d -----' %
+              (num_stack, num_skip, splice))
+
+        # Ragged utterances padded with non-zero values
+        rng = np.random.RandomState(0)
+        input_dim = input_size // num_stack
+        input_list = [rng.randn(frame_num, input_dim).astype(np.float32)
+                      for frame_num in frame_nums]
+        max_time = max(frame_nums) + pad_len
+        inputs = np.full((len(frame_nums), max_time, input_dim), 100,
+                         dtype=np.float32)
+        for i, x in enumerate(input_list):
+            inputs[i, :len(x)] = x
+        inputs_seq_len = np.array(frame_nums, dtype=np.int64)
+
+        # Frame stacking & splicing on the host
+        input_paths = ['utt%d.npy' % i for i in range(len(frame_nums))]
+        frame_num_dict = dict(('utt%d' % i, frame_num)
+                              for i, frame_num in enumerate(frame_nums))
+        stacked_list = stack_frame(input_list, input_paths, frame_num_dict,
+                                   num_stack, num_skip)
+        seq_len_host = np.array([len(x) for x in stacked_list])
+        inputs_host = np.zeros(
+            (len(frame_nums), seq_len_host.max(), input_size),
+            dtype=np.float32)
+        for i, x in enumerate(stacked_list):
+            inputs_host[i, :len(x)] = x
+        inputs_host = do_splice(inputs_host, splice=splice,
+                                inputs_seq_len=seq_len_host)
+
+        tf.reset_default_graph()
+        with tf.Graph().as_default():
+            network = ctcBase(input_size=input_size,
+                              num_unit=16,
+                              num_layer=1,
+                              num_classes=10,
+                              splice=splice,
+                              parameter_init=0.1,
+                              clip_grad=5.0,
+                              clip_activation=50,
+                              dropout_ratio_input=1.0,
+                              dropout_ratio_hidden=1.0,
+                              dropout_ratio_output=1.0,
+                              weight_decay=0,
+                              name='ctc')
+            network.create_placeholders(raw_inputs=True, num_stack=num_stack,
+                                        num_skip=num_skip)
+            inputs_pl = network.inputs_pl_list[0]
+            inputs_seq_len_pl = network.inputs_seq_len_pl_list[0]
+
+            # Each op alone and all ops
+            if num_stack > 1:
+                stacked_op = network._stack_frame(inputs_pl,
+                                                  inputs_seq_len_pl)
+                stacked_seq_len_op = network._stack_seq_len(inputs_seq_len_pl)
+            else:
+                spliced_op = network._splice(inputs_pl, inputs_seq_len_pl)
+            preprocessed_op, seq_len_op = network._preprocess_inputs(
+                inputs_pl, inputs_seq_len_pl)
+
+            feed_dict = {inputs_pl: inputs, inputs_seq_len_pl: inputs_seq_len}
+            with tf.Session() as sess:
+                if num_stack > 1:
+                    stacked, stacked_seq_len = sess.run(
+                        [stacked_op, stacked_seq_len_op],
+                        feed_dict=feed_dict)
+                    stacked_host = np.zeros(
+                        (len(frame_nums), stacked.shape[1], input_size),
+                        dtype=np.float32)
+                    for i, x in enumerate(stacked_list):
+                        stacked_host[i, :len(x)] = x
+                    self.assertAllEqual(stacked_seq_len, seq_len_host)
+                    self.assertAllClose(stacked, stacked_host)
+                else:
+                    # Splicing alone on the raw inputs
+                    spliced = sess.run(spliced_op, feed_dict=feed_dict)
+                    self.assertAllClose(spliced[:, :inputs_host.shape[1]],
+                                        inputs_host)
+                    self.assertAllEqual(spliced[:, inputs_host.shape[1]:],
+                                        np.zeros_like(
+                                            spliced[:, inputs_host.shape[1]:]))
+
+                preprocessed, seq_len = sess.run(
+                    [preprocessed_op, seq_len_op], feed_dict=feed_dict)
+
+        self.assertAllEqual(seq_len, seq_len_host)
+        self.assertEqual(preprocessed.shape[1],
+                         (max_time + num_skip - 1) // num_skip)
+        self.assertEqual(preprocessed.shape[2], input_size * splice)
+        self.assertAllClose(preprocessed[:, :inputs_host.shape[1]],
+                            inputs_host)
+        # Frames beyond the length are zero
+        tail = preprocessed[:, inputs_host.shape[1]:]
+        self.assertAllEqual(tail, np.zeros_like(tail))
+
+
+if __name__ == '__main__':
+    tf.test.main()